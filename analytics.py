@@ -0,0 +1,197 @@
+"""
+NumPy aggregates over the columnar snapshot written by snapshot.py.
+Columns are memory-mapped read-only, so a query only pages in the columns
+it touches and the OS page cache is shared between workers. Group-bys sort
+once by (key, value); counts, sums, min/max and percentiles then come from
+the group boundaries without a Python loop per group.
+"""
+import threading
+from pathlib import Path
+
+import numpy as np
+
+import snapshot
+
+GROUP_COLUMNS = ('character_id', 'gamemode', 'player_id', 'match_id', 'won')
+VALUE_COLUMNS = ('kills', 'deaths', 'assists', 'damage_dealt', 'healing_done', 'abilities_used', 'mmr_delta')
+DEFAULT_PERCENTILES = (50, 90, 99)
+MAX_BINS = 200
+
+class Snapshot:
+    """
+    Read-only view of one snapshot generation: a memmap per column, all
+    mapped up front so a rebuild unlinking the generation later can't pull
+    the files out from under a query (pages are only read when touched).
+    Rows past manifest['rows'] (an interrupted refresh) are never mapped.
+    """
+    def __init__(self, path=None):
+        self.path = Path(path or snapshot.snapshot_dir())
+        manifest = snapshot.read_manifest(self.path)
+        if manifest is None:
+            raise FileNotFoundError(f"No snapshot at {self.path} (run: flask --app app export-snapshot)")
+        self.manifest = manifest
+        self.rows = manifest['rows']
+        self.gamemodes = manifest['gamemodes']
+        columns_dir = snapshot.generation_dir(self.path, manifest)
+        self._columns = {
+            name: np.memmap(columns_dir / f'{name}.bin', dtype=dtype, mode='r', shape=(self.rows,))
+            if self.rows else np.empty(0, dtype=dtype)
+            for name, dtype in manifest['columns'].items()
+        }
+
+    def __len__(self):
+        return self.rows
+
+    def column(self, name):
+        col = self._columns.get(name)
+        if col is None:
+            raise ValueError(f"Unknown snapshot column '{name}'")
+        return col
+
+    def mask(self, character_id=None, gamemode=None, player_id=None, won=None, start=None, end=None):
+        """
+        Boolean row mask for the given filters (None means no filter).
+        start/end are epoch seconds, matched as start <= started_epoch < end.
+        """
+        keep = np.ones(self.rows, dtype=bool)
+        if gamemode is not None:
+            if gamemode not in self.gamemodes:
+                return np.zeros(self.rows, dtype=bool)
+            keep &= self.column('gamemode') == self.gamemodes.index(gamemode)
+        for name, value in (('character_id', character_id), ('player_id', player_id), ('won', won)):
+            if value is not None:
+                keep &= self.column(name) == value
+        if start is not None:
+            keep &= self.column('started_epoch') >= start
+        if end is not None:
+            keep &= self.column('started_epoch') < end
+        return keep
+
+    def _label(self, by, key):
+        return self.gamemodes[key] if by == 'gamemode' else int(key)
+
+    def _grouped(self, value, by, filters):
+        """
+        Filtered (keys, values) sorted by key then value, plus group starts.
+        """
+        if value not in VALUE_COLUMNS:
+            raise ValueError(f"Invalid value '{value}' (expected one of {', '.join(VALUE_COLUMNS)})")
+        if by is not None and by not in GROUP_COLUMNS:
+            raise ValueError(f"Invalid group '{by}' (expected one of {', '.join(GROUP_COLUMNS)})")
+        keep = self.mask(**filters)
+        values = self.column(value)[keep].astype(np.int64)
+        if by is None:
+            keys = np.zeros(len(values), dtype=np.int64)
+            values.sort()
+        elif len(values):
+            keys = self.column(by)[keep].astype(np.int64)
+            # Sort once on a packed (key, value) integer when it fits in int64,
+            # which is several times faster than lexsort.
+            key_min, value_min = keys.min(), values.min()
+            width = int(values.max()) - int(value_min) + 1
+            if (int(keys.max()) - int(key_min) + 1) * width < 2 ** 62:
+                packed = (keys - key_min) * width + (values - value_min)
+                packed.sort()
+                keys, values = packed // width + key_min, packed % width + value_min
+            else:
+                order = np.lexsort((values, keys))
+                keys, values = keys[order], values[order]
+        else:
+            keys = values
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else np.empty(0, dtype=np.int64)
+        return keys, values, starts
+
+    def aggregate(self, value, by=None, percentiles=DEFAULT_PERCENTILES, **filters):
+        """
+        Count, sum, mean, min, max and percentiles (linear interpolation, as
+        np.percentile) of a value column over the filtered rows, overall or
+        per distinct value of `by`. Returns a list of dicts ordered by key.
+        """
+        for q in percentiles:
+            if not 0 <= q <= 100:
+                raise ValueError(f"Invalid percentile {q} (expected 0-100)")
+        keys, values, starts = self._grouped(value, by, filters)
+        if not len(starts):
+            return []
+        ends = np.r_[starts[1:], len(values)]
+        counts = ends - starts
+        sums = np.add.reduceat(values, starts)
+        result = {
+            'count': counts,
+            'sum': sums,
+            'mean': np.round(sums / counts, 3),
+            'min': values[starts],
+            'max': values[ends - 1],
+        }
+        for q in percentiles:
+            position = starts + (counts - 1) * (q / 100)
+            lo = np.floor(position).astype(np.int64)
+            hi = np.minimum(lo + 1, ends - 1)
+            result[f'p{q:g}'] = np.round(values[lo] + (values[hi] - values[lo]) * (position - lo), 3)
+        groups = []
+        for i, start in enumerate(starts.tolist()):
+            group = {'key': self._label(by, keys[start])} if by is not None else {}
+            group.update({name: column[i].item() for name, column in result.items()})
+            groups.append(group)
+        return groups
+
+    def histogram(self, value, bins=20, by=None, **filters):
+        """
+        Distribution of a value column: `bins` equal-width bins spanning the
+        filtered values (one bin per integer when the span is smaller), with
+        counts overall or per distinct value of `by`.
+        Returns {'edges': [...], 'groups': [{'key', 'counts': [...]}, ...]}.
+        """
+        if not 1 <= bins <= MAX_BINS:
+            raise ValueError(f"bins must be between 1 and {MAX_BINS}")
+        keys, values, starts = self._grouped(value, by, filters)
+        if not len(values):
+            return {'edges': [], 'groups': []}
+        lo, hi = int(values.min()), int(values.max())
+        bins = min(bins, hi - lo + 1)
+        edges = np.linspace(lo, hi + 1, bins + 1)
+        index = np.minimum(np.searchsorted(edges, values, side='right') - 1, bins - 1)
+        group = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, len(values)]))
+        counts = np.bincount(group * bins + index, minlength=len(starts) * bins).reshape(len(starts), bins)
+        return {
+            'edges': np.round(edges, 3).tolist(),
+            'groups': [
+                {**({'key': self._label(by, keys[start])} if by is not None else {}), 'counts': row.tolist()}
+                for start, row in zip(starts.tolist(), counts)
+            ],
+        }
+
+    def info(self):
+        return {
+            'rows': self.rows,
+            'last_match_player_id': self.manifest['last_match_player_id'],
+            'refreshed_at': self.manifest['refreshed_at'],
+        }
+
+_lock = threading.Lock()
+_open = {}  # snapshot dir -> (manifest mtime, Snapshot)
+
+def load(path=None):
+    """
+    Return the Snapshot for a directory (default: the current database's),
+    reopened whenever a refresh has replaced its manifest.
+    """
+    path = Path(path or snapshot.snapshot_dir())
+    try:
+        mtime = (path / snapshot.MANIFEST).stat().st_mtime_ns
+    except FileNotFoundError:
+        mtime = None
+    with _lock:
+        entry = _open.get(path)
+        if entry is None or entry[0] != mtime:
+            try:
+                snap = Snapshot(path)
+            except FileNotFoundError:
+                if mtime is None:
+                    raise
+                # A rebuild replaced the generation between reading the
+                # manifest and mapping it; the new manifest is in place now
+                mtime = (path / snapshot.MANIFEST).stat().st_mtime_ns
+                snap = Snapshot(path)
+            entry = _open[path] = (mtime, snap)
+        return entry[1]
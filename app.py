@@ -2,11 +2,164 @@
 Flask application for CPS510 DBMS project.
 Provides dashboard with table management and CRUD operations.
 """
-from flask import Flask, render_template, request, jsonify
+import csv
+import functools
+import gzip
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import time
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+import click
+from flask import (Flask, Response, render_template, request, jsonify, stream_with_context,
+                   copy_current_request_context, g)
+from werkzeug.exceptions import HTTPException
+import analytics
 import db
+import lanes
+import maintenance
+import metrics
+import partitions
+import snapshot
 
 app = Flask(__name__)
 
+def page_args():
+    """
+    Read keyset pagination arguments (?cursor=...&limit=...) from the request.
+    """
+    return request.args.get('cursor'), request.args.get('limit', type=int)
+
+# ============= REQUEST METRICS =============
+
+# Registered before cache_and_compress so it runs after it (Flask runs
+# after_request handlers in reverse) and the timing includes compression.
+REQUEST_SECONDS = metrics.Histogram(
+    'http_request_duration_seconds', 'Time to build a response, by route.',
+    ('method', 'route', 'status'))
+
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request(response):
+    start = g.pop('request_start', None)
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        REQUEST_SECONDS.observe(time.perf_counter() - start, request.method, route, response.status_code)
+    return response
+
+# ============= RESPONSE CACHING & COMPRESSION =============
+
+# JSON GET responses get a strong ETag (If-None-Match -> 304) and are
+# compressed when larger than COMPRESS_MIN_BYTES. Routes pick their
+# Cache-Control with @cache_control; everything else must revalidate.
+COMPRESS_MIN_BYTES = 1024
+DEFAULT_CACHE_CONTROL = 'no-cache'
+REFERENCE_CACHE_CONTROL = 'public, max-age=60'
+FINISHED_MATCH_CACHE_CONTROL = 'public, max-age=86400, immutable'
+
+def cache_control(value):
+    """
+    Decorator: set the Cache-Control policy for a route.
+    """
+    def decorator(view):
+        view.cache_control = value
+        return view
+    return decorator
+
+def compress(body):
+    """
+    Compress a response body with the best encoding the client accepts.
+    Returns (encoding, data) or (None, body).
+    """
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br', brotli.compress(body, quality=5)
+    if accepted['gzip']:
+        return 'gzip', gzip.compress(body, compresslevel=6)
+    return None, body
+
+@app.after_request
+def cache_and_compress(response):
+    """
+    Add ETag / Cache-Control to JSON GET responses, answer conditional
+    requests with 304 and compress large bodies.
+    """
+    if (request.method != 'GET' or response.status_code != 200
+            or response.mimetype != 'application/json' or response.is_streamed):
+        return response
+    
+    if 'Cache-Control' not in response.headers:
+        view = app.view_functions.get(request.endpoint)
+        response.headers['Cache-Control'] = getattr(view, 'cache_control', DEFAULT_CACHE_CONTROL)
+    
+    body = response.get_data()
+    etag = hashlib.sha256(body).hexdigest()[:32]
+    encoding = None
+    if len(body) >= COMPRESS_MIN_BYTES:
+        encoding, body = compress(body)
+    response.vary.add('Accept-Encoding')
+    
+    # Strong ETags are per representation, so tag the encoding
+    response.set_etag(f'{etag}-{encoding}' if encoding else etag)
+    response.make_conditional(request)
+    if response.status_code == 304:
+        return response
+    
+    if encoding:
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+# ============= EXECUTOR LANES =============
+
+# Routes marked @in_lane run on a bounded worker pool from lanes.py instead
+# of the serving thread. Point lookups use lanes.QUICK and aggregates use
+# lanes.HEAVY, so a slow analytics query can't hold up a profile lookup.
+# A full lane answers 503 and a call that overruns its lane answers 504.
+# asgi.py dispatches each whole request onto its lane (lane_for), so there
+# the view runs directly; under a WSGI server the serving thread hands the
+# view to the lane and waits.
+
+def in_lane(lane):
+    """
+    Decorator: run a route on the given executor lane.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if lanes.current() is lane:
+                return view(*args, **kwargs)
+            try:
+                return lane.run(copy_current_request_context(view), *args, **kwargs)
+            except lanes.LaneBusy as e:
+                return jsonify({'ok': False, 'message': str(e)}), 503
+            except lanes.LaneTimeout as e:
+                return jsonify({'ok': False, 'message': str(e)}), 504
+        wrapper.lane = lane
+        return wrapper
+    return decorator
+
+def lane_for(environ):
+    """
+    The lane a WSGI request should run on: its route's @in_lane lane, or
+    lanes.DEFAULT for other routes and unmatched URLs.
+    """
+    try:
+        endpoint, _ = app.url_map.bind_to_environ(environ).match()
+    except HTTPException:
+        return lanes.DEFAULT
+    return getattr(app.view_functions.get(endpoint), 'lane', lanes.DEFAULT)
+
 @app.route('/')
 def index():
     """
@@ -54,6 +207,58 @@ def seed():
     except Exception as e:
         return jsonify({'ok': False, 'message': str(e)}), 500
 
+@app.route('/rollups/rebuild', methods=['POST'])
+@in_lane(lanes.HEAVY)
+def rebuild_rollups():
+    """
+    Recompute the rollup tables from match history (backfills).
+    """
+    try:
+        db.rebuild_rollups()
+        return jsonify({'ok': True, 'message': 'Rollups rebuilt successfully'})
+    except Exception as e:
+        return jsonify({'ok': False, 'message': str(e)}), 500
+
+@app.cli.command('rebuild-rollups')
+def rebuild_rollups_command():
+    """
+    Recompute the rollup tables from match history: flask --app app rebuild-rollups
+    """
+    db.rebuild_rollups()
+    print('Rollups rebuilt successfully')
+
+@app.cli.command('recalculate-mmr')
+@click.option('--dry-run', is_flag=True, help='Report the diff without writing anything.')
+@click.option('--since', default=None, help='Only replay matches started at or after this timestamp.')
+@click.option('--k', 'k_factor', type=int, default=None, help='Elo K-factor (default mmr.K_FACTOR).')
+def recalculate_mmr_command(dry_run, since, k_factor):
+    """
+    Replay match history and rewrite MMR: flask --app app recalculate-mmr [--dry-run]
+    """
+    import mmr
+    summary = mmr.recalculate(since=since, dry_run=dry_run,
+                              k_factor=mmr.K_FACTOR if k_factor is None else k_factor)
+    print(json.dumps(summary, indent=2))
+
+@app.cli.command('export-snapshot')
+@click.option('--rebuild', is_flag=True, help='Rewrite the snapshot instead of appending new rows.')
+def export_snapshot_command(rebuild):
+    """
+    Refresh the columnar match stats snapshot: flask --app app export-snapshot [--rebuild]
+    """
+    print(json.dumps(snapshot.refresh(rebuild=rebuild)))
+
+@app.cli.command('partition-matches')
+@click.option('--before', required=True, help='Move matches of every month before this one (YYYY-MM).')
+@click.option('--archive-before', default=None, help='Then archive partitions of months before this one (YYYY-MM).')
+def partition_matches_command(before, archive_before):
+    """
+    Move old months of matches to partition files: flask --app app partition-matches --before 2025-01
+    """
+    report = partitions.run(db.parse_month(before),
+                            db.parse_month(archive_before) if archive_before else None)
+    print(json.dumps(report, indent=2))
+
 @app.route('/tables', methods=['GET'])
 def tables():
     """
@@ -68,11 +273,133 @@ def tables():
 @app.route('/query/<table_name>', methods=['GET'])
 def query_table(table_name):
     """
-    Query all rows from a specific table.
+    Query one page of rows from a specific table.
+    Pass ?cursor=<next_cursor> to get the following page and ?limit=N for page size.
+    """
+    try:
+        cursor, limit = page_args()
+        page = db.select_all(table_name, cursor, limit)
+        return jsonify({'ok': True, **page})
+    except ValueError as e:
+        return jsonify({'ok': False, 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'ok': False, 'message': str(e)}), 500
+
+@app.route('/pool/stats', methods=['GET'])
+def pool_stats():
+    """
+    Get connection pool size and hit/miss counters.
+    """
+    try:
+        return jsonify({'ok': True, 'pool': db.pool_stats()})
+    except Exception as e:
+        return jsonify({'ok': False, 'message': str(e)}), 500
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    """
+    Get reference-data cache size and hit/miss counters.
+    """
+    try:
+        return jsonify({'ok': True, 'cache': db.cache_stats()})
+    except Exception as e:
+        return jsonify({'ok': False, 'message': str(e)}), 500
+
+@app.route('/writer/stats', methods=['GET'])
+def writer_stats():
+    """
+    Get write queue depth and group commit counters.
+    """
+    try:
+        return jsonify({'ok': True, 'writer': db.writer_stats()})
+    except Exception as e:
+        return jsonify({'ok': False, 'message': str(e)}), 500
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """
+    Prometheus metrics: per-route and per-query latency histograms, row
+    counts, slow queries, plus pool / cache / writer / lane gauges.
+    """
+    gauges = [
+        *metrics.gauge_lines('db_pool', 'Connection pool state.', db.pool_stats()),
+        *metrics.gauge_lines('db_cache', 'Reference-data cache state.', db.cache_stats()),
+        *metrics.gauge_lines('db_writer', 'Write queue state.', db.writer_stats()),
+        *metrics.gauge_lines('db_ownership', 'Item ownership index state.', db.ownership_stats()),
+    ]
+    for name, lane_stats in lanes.stats().items():
+        gauges += metrics.gauge_lines(f'lane_{name}', f'Executor lane {name} state.', lane_stats)
+    return Response(metrics.render(gauges), mimetype='text/plain; version=0.0.4')
+
+@app.route('/lanes/stats', methods=['GET'])
+def lane_stats():
+    """
+    Get executor lane queue depth and rejection/timeout counters.
+    """
+    try:
+        return jsonify({'ok': True, 'lanes': lanes.stats()})
+    except Exception as e:
+        return jsonify({'ok': False, 'message': str(e)}), 500
+
+# ============= EXPORT =============
+
+EXPORT_ROWS_PER_CHUNK = 500
+
+def ndjson_stream(rows):
+    """
+    Format an export row stream as newline-delimited JSON, one chunk per batch of rows.
+    """
+    columns = next(rows)
+    buf = []
+    for row in rows:
+        buf.append(json.dumps(dict(zip(columns, row)), default=str))
+        if len(buf) >= EXPORT_ROWS_PER_CHUNK:
+            yield '\n'.join(buf) + '\n'
+            buf = []
+    if buf:
+        yield '\n'.join(buf) + '\n'
+
+def csv_stream(rows):
+    """
+    Format an export row stream as CSV with a header line.
+    """
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(next(rows))
+    for i, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if i % EXPORT_ROWS_PER_CHUNK == 0:
+            yield out.getvalue()
+            out.seek(0)
+            out.truncate()
+    yield out.getvalue()
+
+EXPORT_FORMATS = {
+    'ndjson': (ndjson_stream, 'application/x-ndjson'),
+    'csv': (csv_stream, 'text/csv'),
+}
+
+@app.route('/export/<name>', methods=['GET'])
+def export(name):
+    """
+    Stream a table or joined view (entitlements, match_details) as
+    NDJSON (default) or CSV (?format=csv) using chunked transfer.
+    The query runs before the response starts, so failures get a JSON
+    error status instead of a truncated 200.
     """
     try:
-        rows = db.select_all(table_name)
-        return jsonify({'ok': True, 'rows': rows})
+        fmt = request.args.get('format', 'ndjson')
+        if fmt not in EXPORT_FORMATS:
+            return jsonify({'ok': False, 'message': f'Unknown format: {fmt}'}), 400
+        
+        rows = db.export_rows(name)
+        if rows is None:
+            return jsonify({'ok': False, 'message': f'Unknown table or view: {name}'}), 404
+        
+        formatter, mimetype = EXPORT_FORMATS[fmt]
+        response = Response(stream_with_context(formatter(rows)), mimetype=mimetype)
+        response.headers['Content-Disposition'] = f'attachment; filename={name}.{fmt}'
+        return response
     except Exception as e:
         return jsonify({'ok': False, 'message': str(e)}), 500
 
@@ -81,11 +408,15 @@ def query_table(table_name):
 @app.route('/players', methods=['GET'])
 def get_players():
     """
-    Get all players.
+    Get one page of players.
+    Pass ?cursor=<next_cursor> to get the following page and ?limit=N for page size.
     """
     try:
-        players = db.get_all_players()
-        return jsonify({'ok': True, 'players': players})
+        cursor, limit = page_args()
+        page = db.get_all_players(cursor, limit)
+        return jsonify({'ok': True, **page})
+    except ValueError as e:
+        return jsonify({'ok': False, 'message': str(e)}), 400
     except Exception as e:
         return jsonify({'ok': False, 'message': str(e)}), 500
 
@@ -133,6 +464,7 @@ def delete_player_route(player_id):
 # ============= GAME_ROLE CRUD =============
 
 @app.route('/roles', methods=['GET'])
+@cache_control(REFERENCE_CACHE_CONTROL)
 def get_roles():
     """
     Get all game roles.
@@ -187,15 +519,66 @@ def delete_role_route(role_id):
 @app.route('/matches', methods=['GET'])
 def get_matches():
     """
-    Get all matches.
+    Get one page of matches.
+    Pass ?cursor=<next_cursor> to get the following page and ?limit=N for page size.
+    """
+    try:
+        cursor, limit = page_args()
+        page = db.get_all_matches(cursor, limit)
+        return jsonify({'ok': True, **page})
+    except ValueError as e:
+        return jsonify({'ok': False, 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'ok': False, 'message': str(e)}), 500
+
+@app.route('/matches/bulk', methods=['POST'])
+def ingest_matches():
+    """
+    Write a batch of finished matches in one transaction.
+    Body: {"matches": [{"gamemode", "started_at", "ended_at", "teams": [...]}, ...]}
     """
     try:
-        matches = db.get_all_matches()
-        return jsonify({'ok': True, 'matches': matches})
+        data = request.get_json() or {}
+        matches = data.get('matches') if isinstance(data, dict) else data
+        if not matches:
+            return jsonify({'ok': False, 'message': 'No matches provided'}), 400
+        
+        match_ids = db.ingest_matches(matches)
+        return jsonify({
+            'ok': True,
+            'message': f'{len(match_ids)} matches ingested successfully',
+            'match_ids': match_ids
+        })
+    except (ValueError, sqlite3.IntegrityError) as e:
+        return jsonify({'ok': False, 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'ok': False, 'message': str(e)}), 500
+
+@app.route('/matches/details', methods=['GET'])
+@in_lane(lanes.QUICK)
+def get_match_details_batch():
+    """
+    Get details for many matches at once: ?ids=1,2,3 (up to 200).
+    Details are returned in the requested order; unknown IDs are listed in 'missing'.
+    """
+    try:
+        ids = [int(mid) for mid in request.args.get('ids', '').split(',') if mid.strip()]
+        if not ids:
+            return jsonify({'ok': False, 'message': 'ids required'}), 400
+        
+        details = db.get_match_details_batch(ids)
+        return jsonify({
+            'ok': True,
+            'matches': [details[mid] for mid in ids if mid in details],
+            'missing': [mid for mid in ids if mid not in details]
+        })
+    except ValueError as e:
+        return jsonify({'ok': False, 'message': str(e)}), 400
     except Exception as e:
         return jsonify({'ok': False, 'message': str(e)}), 500
 
 @app.route('/match/<int:match_id>/details', methods=['GET'])
+@in_lane(lanes.QUICK)
 def get_match_details(match_id):
     """
     Get detailed information about a specific match.
@@ -204,13 +587,18 @@ def get_match_details(match_id):
         details = db.get_match_details(match_id)
         if not details:
             return jsonify({'ok': False, 'message': 'Match not found'}), 404
-        return jsonify({'ok': True, **details})
+        response = jsonify({'ok': True, **details})
+        if details['match']['ended_at']:
+            # Finished matches never change
+            response.headers['Cache-Control'] = FINISHED_MATCH_CACHE_CONTROL
+        return response
     except Exception as e:
         return jsonify({'ok': False, 'message': str(e)}), 500
 
 # ============= ITEM & ENTITLEMENT ROUTES =============
 
 @app.route('/items', methods=['GET'])
+@cache_control(REFERENCE_CACHE_CONTROL)
 def get_items():
     """
     Get all items.
@@ -224,11 +612,15 @@ def get_items():
 @app.route('/entitlements', methods=['GET'])
 def get_entitlements():
     """
-    Get all entitlements with player and item details.
+    Get one page of entitlements with player and item details.
+    Pass ?cursor=<next_cursor> to get the following page and ?limit=N for page size.
     """
     try:
-        entitlements = db.get_all_entitlements()
-        return jsonify({'ok': True, 'entitlements': entitlements})
+        cursor, limit = page_args()
+        page = db.get_all_entitlements(cursor, limit)
+        return jsonify({'ok': True, **page})
+    except ValueError as e:
+        return jsonify({'ok': False, 'message': str(e)}), 400
     except Exception as e:
         return jsonify({'ok': False, 'message': str(e)}), 500
 
@@ -248,12 +640,98 @@ def grant_entitlement():
         
         db.grant_entitlement(player_id, item_id, quantity)
         return jsonify({'ok': True, 'message': f'Item granted to player successfully'})
+    except ValueError as e:
+        return jsonify({'ok': False, 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'ok': False, 'message': str(e)}), 500
+
+@app.route('/entitlement/grant/bulk', methods=['POST'])
+def grant_entitlement_bulk():
+    """
+    Grant an item to many players (event rewards).
+    Body: {"item_id", "quantity", "source", "cursor",
+           "player_ids": [...]} or {..., "min_mmr", "max_mmr"}
+    Streams NDJSON progress, one line per committed chunk, then a final
+    line with "done": true. If a chunk fails the last line has "ok": false;
+    send its next_cursor back as "cursor" to resume.
+    """
+    try:
+        data = request.get_json() or {}
+        if not data.get('item_id'):
+            return jsonify({'ok': False, 'message': 'Item ID is required'}), 400
+        
+        progress = db.grant_entitlement_bulk(
+            data['item_id'],
+            quantity=data.get('quantity', 1),
+            player_ids=data.get('player_ids'),
+            min_mmr=data.get('min_mmr'),
+            max_mmr=data.get('max_mmr'),
+            source=data.get('source', 'event_reward'),
+            cursor=data.get('cursor'),
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({'ok': False, 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'ok': False, 'message': str(e)}), 500
+    
+    def stream():
+        last = {'processed': 0, 'granted': 0, 'next_cursor': data.get('cursor')}
+        try:
+            for last in progress:
+                yield json.dumps({'ok': True, **last}) + '\n'
+            yield json.dumps({'ok': True, 'done': True, **last}) + '\n'
+        except Exception as e:
+            yield json.dumps({'ok': False, 'message': str(e), **last}) + '\n'
+    
+    return Response(stream_with_context(stream()), mimetype='application/x-ndjson')
+
+@app.route('/player/<int:player_id>/inventory', methods=['GET'])
+@in_lane(lanes.QUICK)
+def get_player_inventory(player_id):
+    """
+    Get the items a player owns, from the in-memory ownership index.
+    """
+    try:
+        inventory = db.get_player_inventory(player_id)
+        if inventory is None:
+            return jsonify({'ok': False, 'message': 'Player not found'}), 404
+        return jsonify({'ok': True, **inventory})
+    except Exception as e:
+        return jsonify({'ok': False, 'message': str(e)}), 500
+
+@app.route('/player/<int:player_id>/inventory/check', methods=['POST'])
+@in_lane(lanes.QUICK)
+def check_player_inventory(player_id):
+    """
+    Check which of a list of items a player owns.
+    Expected JSON: {"item_ids": [1, 2, 3, ...]} (up to 1000)
+    Returns {"owned": [...], "not_owned": [...]}.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        result = db.check_item_ownership(player_id, data.get('item_ids'))
+        if result is None:
+            return jsonify({'ok': False, 'message': 'Player not found'}), 404
+        return jsonify({'ok': True, **result})
+    except ValueError as e:
+        return jsonify({'ok': False, 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'ok': False, 'message': str(e)}), 500
+
+@app.route('/inventory/stats', methods=['GET'])
+def inventory_stats():
+    """
+    Get ownership index size, hit rate and LRU evictions.
+    """
+    try:
+        return jsonify({'ok': True, 'inventory': db.ownership_stats()})
     except Exception as e:
         return jsonify({'ok': False, 'message': str(e)}), 500
 
 # ============= PLAYER PROFILE ROUTES =============
 
 @app.route('/player/search', methods=['GET'])
+@in_lane(lanes.QUICK)
 def search_players():
     """
     Search for players by name or email.
@@ -268,7 +746,45 @@ def search_players():
     except Exception as e:
         return jsonify({'ok': False, 'message': str(e)}), 500
 
+@app.route('/player/autocomplete', methods=['GET'])
+@in_lane(lanes.QUICK)
+def autocomplete_players():
+    """
+    Suggest players whose display name starts with ?prefix=.
+    """
+    try:
+        prefix = request.args.get('prefix', '').strip()
+        limit = max(1, min(request.args.get('limit', 10, type=int), 50))
+        players = db.autocomplete_players(prefix, limit)
+        return jsonify({'ok': True, 'players': players})
+    except Exception as e:
+        return jsonify({'ok': False, 'message': str(e)}), 500
+
+@app.route('/players/profiles', methods=['GET'])
+@in_lane(lanes.QUICK)
+def get_player_profiles():
+    """
+    Get profiles for many players at once: ?ids=1,2,3 (up to 500).
+    Profiles are returned in the requested order; unknown IDs are listed in 'missing'.
+    """
+    try:
+        ids = [int(pid) for pid in request.args.get('ids', '').split(',') if pid.strip()]
+        if not ids:
+            return jsonify({'ok': False, 'message': 'ids required'}), 400
+        
+        profiles = db.get_player_profiles(ids)
+        return jsonify({
+            'ok': True,
+            'profiles': [profiles[pid] for pid in ids if pid in profiles],
+            'missing': [pid for pid in ids if pid not in profiles]
+        })
+    except ValueError as e:
+        return jsonify({'ok': False, 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'ok': False, 'message': str(e)}), 500
+
 @app.route('/player/<int:player_id>/profile', methods=['GET'])
+@in_lane(lanes.QUICK)
 def get_player_profile(player_id):
     """
     Get detailed player profile with stats and match history.
@@ -281,20 +797,224 @@ def get_player_profile(player_id):
     except Exception as e:
         return jsonify({'ok': False, 'message': str(e)}), 500
 
+# ============= LEADERBOARD ROUTES =============
+
+@app.route('/leaderboard', methods=['GET'])
+@in_lane(lanes.QUICK)
+def get_leaderboard():
+    """
+    Get one page of the MMR leaderboard, highest first, with each player's rank.
+    Pass ?cursor=<next_cursor> to get the following page and ?limit=N for page size.
+    """
+    try:
+        cursor, limit = page_args()
+        page = db.get_leaderboard(cursor, limit)
+        return jsonify({'ok': True, **page})
+    except ValueError as e:
+        return jsonify({'ok': False, 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'ok': False, 'message': str(e)}), 500
+
+@app.route('/player/<int:player_id>/rank', methods=['GET'])
+@in_lane(lanes.QUICK)
+def get_player_rank(player_id):
+    """
+    Get a player's MMR rank, the number of ranked players and their percentile.
+    """
+    try:
+        rank = db.get_player_rank(player_id)
+        if not rank:
+            return jsonify({'ok': False, 'message': 'Player not found'}), 404
+        return jsonify({'ok': True, **rank})
+    except Exception as e:
+        return jsonify({'ok': False, 'message': str(e)}), 500
+
+# ============= ANALYTICS ROUTES =============
+
+@app.route('/analytics/timeseries', methods=['GET'])
+@in_lane(lanes.QUICK)
+def get_match_timeseries():
+    """
+    Get matches per bucket with average match length, win rate and gamemode mix.
+    Query params: start, end (epoch seconds or ISO 8601, UTC; default the last
+    30 days), bucket=hour|day (default day), gamemode.
+    """
+    try:
+        timeseries = db.get_match_timeseries(
+            request.args.get('start'),
+            request.args.get('end'),
+            request.args.get('bucket', 'day'),
+            request.args.get('gamemode'),
+        )
+        return jsonify({'ok': True, **timeseries})
+    except ValueError as e:
+        return jsonify({'ok': False, 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'ok': False, 'message': str(e)}), 500
+
+def snapshot_filters():
+    """
+    Read the row filters shared by the snapshot analytics routes from the query string.
+    """
+    args = request.args
+    return {
+        'gamemode': args.get('gamemode'),
+        'character_id': args.get('character_id', type=int),
+        'player_id': args.get('player_id', type=int),
+        'won': {'1': 1, 'true': 1, '0': 0, 'false': 0}.get(args.get('won', '').lower()),
+        'start': db.parse_timestamp(args['start']) if args.get('start') else None,
+        'end': db.parse_timestamp(args['end']) if args.get('end') else None,
+    }
+
+@app.route('/analytics/aggregate', methods=['GET'])
+@in_lane(lanes.HEAVY)
+def get_snapshot_aggregate():
+    """
+    Aggregate a per-player stat from the columnar snapshot, e.g. average damage by character.
+    Query params: value (kills, damage_dealt, ...), by (character_id, gamemode, ...),
+    percentiles=50,90,99, and filters gamemode, character_id, player_id, won, start, end.
+    """
+    try:
+        snap = analytics.load()
+        percentiles = [float(q) for q in request.args.get('percentiles', '50,90,99').split(',') if q]
+        groups = snap.aggregate(request.args.get('value', 'damage_dealt'), request.args.get('by'),
+                                percentiles, **snapshot_filters())
+        return jsonify({'ok': True, 'snapshot': snap.info(), 'groups': groups})
+    except FileNotFoundError as e:
+        return jsonify({'ok': False, 'message': str(e)}), 404
+    except ValueError as e:
+        return jsonify({'ok': False, 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'ok': False, 'message': str(e)}), 500
+
+@app.route('/analytics/histogram', methods=['GET'])
+@in_lane(lanes.HEAVY)
+def get_snapshot_histogram():
+    """
+    Distribution of a per-player stat from the columnar snapshot, e.g. kills by gamemode.
+    Query params: value, bins (default 20), by, and the /analytics/aggregate filters.
+    """
+    try:
+        snap = analytics.load()
+        histogram = snap.histogram(request.args.get('value', 'kills'), request.args.get('bins', 20, type=int),
+                                   request.args.get('by'), **snapshot_filters())
+        return jsonify({'ok': True, 'snapshot': snap.info(), **histogram})
+    except FileNotFoundError as e:
+        return jsonify({'ok': False, 'message': str(e)}), 404
+    except ValueError as e:
+        return jsonify({'ok': False, 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'ok': False, 'message': str(e)}), 500
+
+@app.route('/analytics/snapshot/refresh', methods=['POST'])
+@in_lane(lanes.HEAVY)
+def refresh_snapshot():
+    """
+    Append new match rows to the columnar snapshot (?rebuild=1 rewrites it).
+    """
+    try:
+        result = snapshot.refresh(rebuild=request.args.get('rebuild') in ('1', 'true'))
+        return jsonify({'ok': True, **result})
+    except Exception as e:
+        return jsonify({'ok': False, 'message': str(e)}), 500
+
+# ============= MAINTENANCE ROUTES =============
+
+@app.route('/admin/maintenance', methods=['GET'])
+def get_maintenance_status():
+    """
+    Get maintenance scheduler state, database page/freelist info and recent run reports.
+    """
+    try:
+        return jsonify({'ok': True, **maintenance.status()})
+    except Exception as e:
+        return jsonify({'ok': False, 'message': str(e)}), 500
+
+@app.route('/admin/maintenance/run', methods=['POST'])
+@in_lane(lanes.HEAVY)
+def run_maintenance():
+    """
+    Run maintenance now and return what each step did and how long it took.
+    ?steps=analyze,optimize,checkpoint,vacuum (default) or vacuum_full (one-off
+    conversion of an older database to incremental auto-vacuum; holds the write lock).
+    """
+    try:
+        steps = request.args.get('steps')
+        steps = [s.strip() for s in steps.split(',') if s.strip()] if steps else maintenance.SCHEDULED_STEPS
+        report = maintenance.run(steps)
+        return jsonify({'ok': True, **report})
+    except ValueError as e:
+        return jsonify({'ok': False, 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'ok': False, 'message': str(e)}), 500
+
+# ============= PARTITION ROUTES =============
+
+@app.route('/admin/partitions', methods=['GET'])
+def get_partition_status():
+    """
+    List match partitions (oldest first) with their match counts, files and sizes.
+    """
+    try:
+        return jsonify({'ok': True, **partitions.status()})
+    except Exception as e:
+        return jsonify({'ok': False, 'message': str(e)}), 500
+
+@app.route('/admin/partitions/run', methods=['POST'])
+@in_lane(lanes.HEAVY)
+def run_partitioning():
+    """
+    Move matches of every month before ?before=YYYY-MM to partition files,
+    then archive partitions before ?archive_before=YYYY-MM (optional).
+    """
+    try:
+        before = request.args.get('before')
+        if not before:
+            return jsonify({'ok': False, 'message': 'before is required (YYYY-MM)'}), 400
+        archive_before = request.args.get('archive_before')
+        report = partitions.run(db.parse_month(before),
+                                db.parse_month(archive_before) if archive_before else None)
+        return jsonify({'ok': True, **report})
+    except ValueError as e:
+        return jsonify({'ok': False, 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'ok': False, 'message': str(e)}), 500
+
+@app.route('/admin/partitions/<month>/archive', methods=['POST'])
+@in_lane(lanes.HEAVY)
+def archive_partition(month):
+    """
+    Freeze one month's partition (YYYY-MM) as a read-only archive.
+    """
+    try:
+        partition = partitions.archive(db.parse_month(month))
+        if partition is None:
+            return jsonify({'ok': False, 'message': f'No partition for {month}'}), 404
+        return jsonify({'ok': True, 'partition': partition})
+    except ValueError as e:
+        return jsonify({'ok': False, 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'ok': False, 'message': str(e)}), 500
+
 # ============= GAME DATA ROUTES =============
 
 @app.route('/characters', methods=['GET'])
+@in_lane(lanes.QUICK)
+@cache_control(REFERENCE_CACHE_CONTROL)
 def get_characters():
     """
-    Get all characters with their role and stats.
+    Get all characters with their role, stats, win rate, pick rate and average K/D/A.
+    Pass ?gamemode=<name> to restrict the rates to one gamemode.
     """
     try:
-        characters = db.get_all_characters()
+        characters = db.get_all_characters(request.args.get('gamemode'))
         return jsonify({'ok': True, 'characters': characters})
     except Exception as e:
         return jsonify({'ok': False, 'message': str(e)}), 500
 
 @app.route('/character/<int:character_id>', methods=['GET'])
+@in_lane(lanes.QUICK)
+@cache_control(REFERENCE_CACHE_CONTROL)
 def get_character_details(character_id):
     """
     Get detailed character information with abilities.
@@ -308,6 +1028,7 @@ def get_character_details(character_id):
         return jsonify({'ok': False, 'message': str(e)}), 500
 
 @app.route('/items/all', methods=['GET'])
+@cache_control(REFERENCE_CACHE_CONTROL)
 def get_all_items():
     """
     Get all items with categories and rarities.
@@ -319,4 +1040,8 @@ def get_all_items():
         return jsonify({'ok': False, 'message': str(e)}), 500
 
 if __name__ == '__main__':
+    # The reloader re-runs this file in a child process that serves the
+    # requests; start the scheduler only there, not in the watching parent
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        maintenance.start()
     app.run(debug=True, port=5000)
@@ -0,0 +1,90 @@
+"""
+ASGI entry point for async serving.
+Each request runs the Flask app on its route's executor lane (lanes.py,
+chosen by app.lane_for) and the event loop awaits it, so slow analytics
+only ever occupy heavy-lane workers while point lookups keep a low p99.
+Responses, including streamed exports, are sent from the lane thread.
+The database maintenance scheduler (maintenance.py) runs alongside in a
+background thread. LaneInstance overrides asgiref internals, so
+requirements.txt pins asgiref to the tested release series.
+
+Usage: uvicorn asgi:asgi_app --port 5000
+"""
+import json
+
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+
+import lanes
+import maintenance
+from app import app, lane_for
+
+class LaneWsgiToAsgi(WsgiToAsgi):
+    """
+    asgiref's WSGI adapter, but running each request on a lane instead of
+    asgiref's single thread-sensitive thread.
+    """
+    async def __call__(self, scope, receive, send):
+        await LaneInstance(self.wsgi_application, self.duplicate_header_limit)(scope, receive, send)
+
+class LaneInstance(WsgiToAsgiInstance):
+    async def __call__(self, scope, receive, send):
+        self.send = send
+        self.abandoned = False
+        await super().__call__(scope, receive, send)
+
+    async def run_wsgi_app(self, body):
+        try:
+            environ = self.build_environ(self.scope, body)
+        except ValueError:
+            await self._send_error(400, "Too many duplicate headers")
+            return
+        try:
+            await lane_for(environ).run_async(self._run, environ)
+        except lanes.LaneBusy as e:
+            await self._send_error(503, str(e))
+        except lanes.LaneTimeout as e:
+            # The lane thread keeps running; stop it sending anything more
+            self.abandoned = True
+            if not self.response_started:
+                await self._send_error(504, str(e))
+            else:
+                await self.send({'type': 'http.response.body'})
+
+    def _run(self, environ):
+        """
+        Run the WSGI app on the lane thread and send its response.
+        """
+        output = self.wsgi_application(environ, self.start_response)
+        try:
+            bytes_sent = 0
+            for chunk in output:
+                if self.abandoned:
+                    return
+                if not self.response_started:
+                    self.response_started = True
+                    self.sync_send(self.response_start)
+                if self.response_content_length is not None:
+                    chunk = chunk[:self.response_content_length - bytes_sent]
+                self.sync_send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                bytes_sent += len(chunk)
+                if bytes_sent == self.response_content_length:
+                    break
+            if self.abandoned:
+                return
+            if not self.response_started:
+                self.response_started = True
+                self.sync_send(self.response_start)
+            self.sync_send({'type': 'http.response.body'})
+        finally:
+            if hasattr(output, 'close'):
+                output.close()
+
+    async def _send_error(self, status, message):
+        self.response_started = True
+        await self.send({'type': 'http.response.start', 'status': status,
+                         'headers': [(b'content-type', b'application/json')]})
+        await self.send({'type': 'http.response.body',
+                         'body': json.dumps({'ok': False, 'message': message}).encode()})
+
+asgi_app = LaneWsgiToAsgi(app)
+maintenance.start()
@@ -0,0 +1,331 @@
+"""
+Route-level load benchmark.
+Builds (or reuses) a database per scale, drives every route in app.py
+through the Flask test client from a pool of worker threads and reports
+throughput and p50/p95/p99 latency per route. Results are saved as JSON
+so runs can be diffed across commits. Routes run against a temporary copy
+of each cached database, so every run starts from the same data.
+
+Usage:
+    python bench.py                              # 1k and 100k match_player rows
+    python bench.py --scales 1k 100k 10m --concurrency 16 --requests 500
+    python bench.py --routes profile search --out results.json
+"""
+import argparse
+import json
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import db
+import snapshot
+from app import app
+
+SCALES = {'1k': 1_000, '100k': 100_000, '10m': 10_000_000}
+DATA_DIR = Path("bench_data")
+RESULTS_DIR = Path("bench_results")
+INGEST_BATCH = 2000
+PLAYERS_PER_MATCH = 10
+
+# ============= DATA GENERATION =============
+
+def _synthetic_matches(count, player_ids, character_ids, start):
+    """
+    Generate `count` finished 5v5 matches for db.ingest_matches.
+    """
+    matches = []
+    for _ in range(count):
+        players = random.sample(player_ids, PLAYERS_PER_MATCH)
+        started = start + timedelta(seconds=random.randrange(365 * 86400))
+        blue_wins = random.random() < 0.5
+        teams = []
+        for label, win, team_players in (('Blue', blue_wins, players[:5]), ('Red', not blue_wins, players[5:])):
+            characters = random.sample(character_ids, len(team_players))
+            teams.append({
+                'team_label': label,
+                'result': 'win' if win else 'loss',
+                'players': [{
+                    'player_id': pid,
+                    'character_id': cid,
+                    'stats': {
+                        'kills': random.randrange(20),
+                        'deaths': random.randrange(15),
+                        'assists': random.randrange(25),
+                        'damage_dealt': random.randrange(40000),
+                        'healing_done': random.randrange(10000),
+                        'abilities_used': random.randrange(300),
+                        'mmr_delta': random.randrange(-25, 26),
+                    },
+                } for pid, cid in zip(team_players, characters)],
+            })
+        matches.append({
+            'gamemode': random.choice(('Ranked', 'Casual', 'ARAM')),
+            'started_at': started.strftime('%Y-%m-%d %H:%M:%S'),
+            'ended_at': (started + timedelta(minutes=random.randrange(15, 45))).strftime('%Y-%m-%d %H:%M:%S'),
+            'teams': teams,
+        })
+    return matches
+
+def build_database(path, match_player_rows):
+    """
+    Create a database with schema, seed data and roughly match_player_rows
+    synthetic match_player rows. Existing files are reused.
+    """
+    db.close_pool()
+    db.DB_FILE = str(path)
+    if path.exists():
+        return
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    random.seed(510)
+    db.create_all()
+    db.seed_all()
+
+    players = max(1000, match_player_rows // 50)
+    db.exec_query(
+        "INSERT INTO player (display_name, email, password_hash, rank_mmr) VALUES (?, ?, ?, ?);",
+        [(f"bench_{i}", f"bench_{i}@example.com", "x", random.randint(0, 3000)) for i in range(players)],
+        many=True,
+    )
+    player_ids = [r['player_id'] for r in db.exec_query("SELECT player_id FROM player;", fetch=True)]
+    character_ids = [r['character_id'] for r in db.exec_query("SELECT character_id FROM game_character;", fetch=True)]
+
+    existing = db.exec_query("SELECT COUNT(*) AS n FROM match_player;", fetch=True)[0]['n']
+    remaining = max(0, match_player_rows - existing) // PLAYERS_PER_MATCH
+    start = datetime.now(timezone.utc) - timedelta(days=365)
+    started = time.perf_counter()
+    while remaining:
+        batch = min(INGEST_BATCH, remaining)
+        db.ingest_matches(_synthetic_matches(batch, player_ids, character_ids, start))
+        remaining -= batch
+        print(f"  {path.name}: {remaining * PLAYERS_PER_MATCH:,} rows to go "
+              f"({time.perf_counter() - started:.0f}s)", end='\r', file=sys.stderr)
+    print(file=sys.stderr)
+    db.exec_script("ANALYZE;")
+
+def use_copy(path, workdir):
+    """
+    Copy a cached database and its snapshot into workdir and point
+    db.DB_FILE at the copy. Routes that write (upserts, grants, match
+    ingest) then never change the cached file.
+    """
+    db.close_pool()
+    copy = Path(workdir) / path.name
+    source, target = sqlite3.connect(path), sqlite3.connect(copy)
+    try:
+        source.backup(target)
+    finally:
+        source.close()
+        target.close()
+    if snapshot.snapshot_dir(path).exists():
+        shutil.copytree(snapshot.snapshot_dir(path), snapshot.snapshot_dir(copy))
+    db.DB_FILE = str(copy)
+    return copy
+
+# ============= ROUTES =============
+
+class Ids:
+    """
+    Random valid IDs and names from the benchmark database.
+    """
+    def __init__(self):
+        def ids(query):
+            return [next(iter(r.values())) for r in db.exec_query(query, fetch=True)]
+        self.players = ids("SELECT player_id FROM player;")
+        self.matches = ids("SELECT match_id FROM match_game;")
+        self.characters = ids("SELECT character_id FROM game_character;")
+        self.items = ids("SELECT item_id FROM item;")
+        self.names = ids("SELECT display_name FROM player ORDER BY random() LIMIT 1000;")
+        self._counter = iter(range(10 ** 12))
+        self._lock = threading.Lock()
+
+    def player(self):
+        return random.choice(self.players)
+
+    def match(self):
+        return random.choice(self.matches)
+
+    def unique(self):
+        with self._lock:
+            return next(self._counter)
+
+# name -> (method, url(ids), json body(ids) or None).
+# Destructive admin routes (/drop, /create, /seed, deletes, rebuilds) and
+# whole-table exports are left out; see SKIPPED_RULES.
+ROUTES = {
+    'tables': ('GET', lambda ids: '/tables', None),
+    'query_table': ('GET', lambda ids: '/query/match_player?limit=100', None),
+    'pool_stats': ('GET', lambda ids: '/pool/stats', None),
+    'cache_stats': ('GET', lambda ids: '/cache/stats', None),
+    'writer_stats': ('GET', lambda ids: '/writer/stats', None),
+    'lane_stats': ('GET', lambda ids: '/lanes/stats', None),
+    'metrics': ('GET', lambda ids: '/metrics', None),
+    'maintenance_status': ('GET', lambda ids: '/admin/maintenance', None),
+    'partitions': ('GET', lambda ids: '/admin/partitions', None),
+    'players': ('GET', lambda ids: '/players?limit=100', None),
+    'roles': ('GET', lambda ids: '/roles', None),
+    'matches': ('GET', lambda ids: '/matches?limit=100', None),
+    'match_details': ('GET', lambda ids: f'/match/{ids.match()}/details', None),
+    'match_details_batch': ('GET', lambda ids: '/matches/details?ids=' + ','.join(
+        str(ids.match()) for _ in range(20)), None),
+    'items': ('GET', lambda ids: '/items', None),
+    'items_all': ('GET', lambda ids: '/items/all', None),
+    'entitlements': ('GET', lambda ids: '/entitlements?limit=100', None),
+    'search': ('GET', lambda ids: f'/player/search?q={random.choice(ids.names)[:4]}', None),
+    'autocomplete': ('GET', lambda ids: f'/player/autocomplete?prefix={random.choice(ids.names)[:2]}', None),
+    'profile': ('GET', lambda ids: f'/player/{ids.player()}/profile', None),
+    'profiles_batch': ('GET', lambda ids: '/players/profiles?ids=' + ','.join(
+        str(ids.player()) for _ in range(20)), None),
+    'leaderboard': ('GET', lambda ids: '/leaderboard?limit=100', None),
+    'player_rank': ('GET', lambda ids: f'/player/{ids.player()}/rank', None),
+    'inventory': ('GET', lambda ids: f'/player/{ids.player()}/inventory', None),
+    'inventory_check': ('POST', lambda ids: f'/player/{ids.player()}/inventory/check', lambda ids: {
+        'item_ids': random.sample(ids.items, min(len(ids.items), 50))}),
+    'inventory_stats': ('GET', lambda ids: '/inventory/stats', None),
+    'snapshot_aggregate': ('GET', lambda ids: '/analytics/aggregate?value=damage_dealt&by=character_id', None),
+    'snapshot_histogram': ('GET', lambda ids: '/analytics/histogram?value=kills&by=gamemode', None),
+    'timeseries_90d': ('GET', lambda ids: '/analytics/timeseries?start=' + str(int(time.time()) - 90 * 86400), None),
+    'characters': ('GET', lambda ids: '/characters', None),
+    'characters_ranked': ('GET', lambda ids: '/characters?gamemode=Ranked', None),
+    'character': ('GET', lambda ids: f'/character/{random.choice(ids.characters)}', None),
+    'player_upsert': ('POST', lambda ids: '/player/upsert', lambda ids: {
+        'display_name': f'bench_new_{ids.unique()}',
+        'email': f'bench_new_{ids.unique()}@example.com',
+        'password_hash': 'x',
+    }),
+    'role_upsert': ('POST', lambda ids: '/role/upsert', lambda ids: {
+        'name': f'bench_role_{ids.unique()}', 'description': 'benchmark'}),
+    'entitlement_grant': ('POST', lambda ids: '/entitlement/grant', lambda ids: {
+        'player_id': ids.player(), 'item_id': random.choice(ids.items)}),
+    'entitlement_grant_bulk': ('POST', lambda ids: '/entitlement/grant/bulk', lambda ids: {
+        'item_id': random.choice(ids.items), 'player_ids': [ids.player() for _ in range(100)]}),
+    'matches_bulk': ('POST', lambda ids: '/matches/bulk', lambda ids: {
+        'matches': _synthetic_matches(10, ids.players, ids.characters, datetime.now(timezone.utc))}),
+}
+
+SKIPPED_RULES = {
+    '/', '/player', '/static/<path:filename>', '/drop', '/create', '/seed',
+    '/rollups/rebuild', '/player/delete/<int:player_id>', '/role/delete/<int:role_id>',
+    '/export/<name>', '/analytics/snapshot/refresh', '/admin/maintenance/run',
+    '/admin/partitions/run', '/admin/partitions/<month>/archive',
+}
+
+def uncovered_rules(ids):
+    """
+    Return app routes that are neither benchmarked nor listed in SKIPPED_RULES.
+    """
+    adapter = app.url_map.bind('localhost')
+    covered = {adapter.match(url(ids).split('?')[0], method=method)[0] for method, url, _b in ROUTES.values()}
+    return sorted(rule.rule for rule in app.url_map.iter_rules()
+                  if rule.endpoint not in covered and rule.rule not in SKIPPED_RULES)
+
+# ============= RUNNER =============
+
+def percentile(sorted_values, pct):
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def bench_route(name, ids, requests, concurrency):
+    """
+    Send `requests` requests to one route from `concurrency` threads.
+    """
+    method, url, body = ROUTES[name]
+    local = threading.local()
+
+    def one(_):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = app.test_client()
+        path = url(ids)
+        payload = body(ids) if body else None
+        start = time.perf_counter()
+        response = client.open(path, method=method, json=payload)
+        response.get_data()
+        return time.perf_counter() - start, response.status_code
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(min(concurrency, requests))))  # warm-up
+        started = time.perf_counter()
+        samples = list(pool.map(one, range(requests)))
+        wall = time.perf_counter() - started
+
+    latencies = sorted(s for s, _status in samples)
+    errors = sum(1 for _s, status in samples if status >= 400)
+    ms = lambda v: round(v * 1000, 3)
+    return {
+        'method': method,
+        'requests': requests,
+        'errors': errors,
+        'throughput_rps': round(requests / wall, 1),
+        'mean_ms': ms(statistics.fmean(latencies)),
+        'p50_ms': ms(percentile(latencies, 50)),
+        'p95_ms': ms(percentile(latencies, 95)),
+        'p99_ms': ms(percentile(latencies, 99)),
+        'max_ms': ms(latencies[-1]),
+    }
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True, cwd=Path(__file__).parent).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--scales', nargs='+', default=['1k', '100k'], choices=SCALES)
+    parser.add_argument('--routes', nargs='+', default=list(ROUTES), choices=ROUTES)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=200, help='requests per route')
+    parser.add_argument('--out', type=Path, help='results file (default bench_results/<timestamp>.json)')
+    args = parser.parse_args(argv)
+
+    results = {
+        'commit': git_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'concurrency': args.concurrency,
+        'requests_per_route': args.requests,
+        'scales': {},
+    }
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    for scale in args.scales:
+        path = DATA_DIR / f"bench_{scale}.db"
+        print(f"== {scale} ({SCALES[scale]:,} match_player rows): {path}", file=sys.stderr)
+        build_database(path, SCALES[scale])
+        snapshot.refresh()
+        with tempfile.TemporaryDirectory(dir=DATA_DIR, prefix='run_') as workdir:
+            use_copy(path, workdir)
+            ids = Ids()
+            for rule in uncovered_rules(ids):
+                print(f"warning: {rule} is not benchmarked (add it to ROUTES or SKIPPED_RULES)", file=sys.stderr)
+            db.clear_cache()
+            scale_results = results['scales'][scale] = {}
+            print(f"{'route':<24}{'rps':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'errors':>8}")
+            for name in args.routes:
+                r = scale_results[name] = bench_route(name, ids, args.requests, args.concurrency)
+                print(f"{name:<24}{r['throughput_rps']:>10}{r['p50_ms']:>10}{r['p95_ms']:>10}"
+                      f"{r['p99_ms']:>10}{r['errors']:>8}")
+            db.close_pool()
+
+    out = args.out or RESULTS_DIR / f"{results['timestamp'].replace(':', '')}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(results, indent=2))
+    print(f"Results written to {out}", file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,36 @@
+"""
+Query plan regression check.
+Builds a scratch database from schema + indexes + seed data, runs every
+hot-path query in db.HOT_PATHS through EXPLAIN QUERY PLAN and exits
+non-zero if any of them falls back to a full-table SCAN.
+
+Usage: python check_plans.py
+"""
+import sys
+import tempfile
+from pathlib import Path
+
+import db
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        db.close_pool()
+        db.DB_FILE = str(Path(tmp) / "plans.db")
+        db.create_all()
+        db.seed_all()
+        failures = db.check_query_plans()
+        db.close_pool()
+
+    if not failures:
+        print(f"OK: {len(db.HOT_PATHS)} hot paths checked, no full-table scans")
+        return 0
+
+    for failure in failures:
+        print(f"SCAN in {failure['function']}:")
+        print(f"  {' '.join(failure['sql'].split())}")
+        for detail in failure['plan']:
+            print(f"    {detail}")
+    return 1
+
+if __name__ == '__main__':
+    sys.exit(main())
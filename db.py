@@ -1,56 +1,572 @@
 """
 Database helper functions for SQLite operations.
 """
+import base64
+import functools
+import json
+import logging
+import queue
+import re
+import shutil
 import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import ExitStack, contextmanager
+from datetime import datetime, timezone
 from pathlib import Path
 
+import metrics
+from inventory import OwnershipIndex
+from leaderboard import MmrIndex
+
 DB_FILE = "school.db"
 
-def get_conn():
+# Connection pool settings. Idle connections are kept per database file and
+# handed to one thread at a time, so they can be reused across requests.
+POOL_MAX_IDLE = 8
+STATEMENT_CACHE_SIZE = 256
+
+# Keyset pagination defaults for list endpoints.
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+_MIN_KEY = -(2 ** 63)
+_MAX_KEY = 2 ** 63 - 1
+
+# Applied once when a pooled connection is opened. auto_vacuum must come
+# before journal_mode: it only takes effect on a new, empty database (or at
+# the next VACUUM), and switching to WAL writes the header.
+CONNECTION_PRAGMAS = (
+    "PRAGMA auto_vacuum = INCREMENTAL;",
+    "PRAGMA foreign_keys = ON;",
+    "PRAGMA journal_mode = WAL;",
+    "PRAGMA synchronous = NORMAL;",
+    "PRAGMA cache_size = -65536;",
+    "PRAGMA mmap_size = 268435456;",
+    "PRAGMA busy_timeout = 5000;",
+)
+
+# journal_mode and auto_vacuum are persistent and need the write lock, so
+# read-only connections skip them (the database is already in WAL mode).
+READONLY_SKIP_PRAGMAS = ("PRAGMA auto_vacuum = INCREMENTAL;", "PRAGMA journal_mode = WAL;")
+
+# Idle connections keyed by (DB_FILE, readonly).
+_pool = {}
+_pool_lock = threading.Lock()
+_pool_stats = {'hits': 0, 'misses': 0, 'in_use': 0}
+
+# Table whitelist for the generic table browser and exports:
+# DB_FILE -> {table: (page key, stored column list)}.
+# Cleared by exec_script, which is the only path that runs DDL.
+_table_cache = {}
+
+# Optional sqlite3 trace callback installed on new connections
+# (used by check_query_plans to capture every statement a function runs).
+_trace_hook = None
+
+def get_conn(readonly=False, db_file=None):
     """
-    Returns a SQLite connection with row_factory and foreign keys enabled.
+    Returns a new SQLite connection with row_factory, foreign keys,
+    WAL mode and the other connection pragmas applied.
+    readonly=True opens the file with a mode=ro URI, so the connection
+    can never take the write lock; a database file that doesn't exist
+    yet is created first, as a writable open would. db_file defaults to
+    DB_FILE. Prefer pooled_conn() unless you need a private connection.
     """
-    conn = sqlite3.connect(DB_FILE)
+    db_file = db_file or DB_FILE
+    if readonly:
+        path = Path(db_file).resolve()
+        if not path.exists():
+            get_conn(db_file=db_file).close()
+        uri = path.as_uri() + "?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False,
+                               cached_statements=STATEMENT_CACHE_SIZE)
+    else:
+        conn = sqlite3.connect(db_file, check_same_thread=False,
+                               cached_statements=STATEMENT_CACHE_SIZE)
     conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA foreign_keys = ON;")
+    for pragma in CONNECTION_PRAGMAS:
+        if not (readonly and pragma in READONLY_SKIP_PRAGMAS):
+            conn.execute(pragma)
+    if _trace_hook is not None:
+        conn.set_trace_callback(_trace_hook)
     return conn
 
-def exec_script(sql):
+def _acquire_conn(readonly=False):
+    """
+    Take an idle connection for the current DB_FILE, or open a new one.
+    """
+    with _pool_lock:
+        idle = _pool.get((DB_FILE, readonly))
+        _pool_stats['in_use'] += 1
+        if idle:
+            _pool_stats['hits'] += 1
+            return idle.pop()
+        _pool_stats['misses'] += 1
+    try:
+        return get_conn(readonly)
+    except Exception:
+        with _pool_lock:
+            _pool_stats['in_use'] -= 1
+        raise
+
+def _release_conn(conn, pool_key):
+    """
+    Return a connection to the pool, closing it if the pool is full.
+    """
+    with _pool_lock:
+        _pool_stats['in_use'] -= 1
+        idle = _pool.setdefault(pool_key, [])
+        if len(idle) < POOL_MAX_IDLE:
+            idle.append(conn)
+            return
+    conn.close()
+
+@contextmanager
+def pooled_conn(readonly=False):
+    """
+    Borrow a pooled connection for the duration of a with-block.
+    Commits on success if a transaction is open, rolls back on error.
+    Request-path writes should go through submit_write() instead.
+    """
+    pool_key = (DB_FILE, readonly)
+    conn = _acquire_conn(readonly)
+    try:
+        yield conn
+        if conn.in_transaction:
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        _release_conn(conn, pool_key)
+
+def close_pool():
     """
-    Execute a multi-statement SQL script (DDL/DML).
+    Close all idle pooled connections (e.g. after drop_all or when DB_FILE changes).
+    The writer thread closes its connection once it has finished queued writes.
     """
-    with get_conn() as conn:
-        conn.executescript(sql)
-        conn.commit()
+    with _pool_lock:
+        conns = [c for idle in _pool.values() for c in idle]
+        _pool.clear()
+    for conn in conns:
+        conn.close()
+    if _writer is not None:
+        _write_queue.put(None)
 
-def exec_query(query, params=(), fetch=False, many=False):
+def pool_stats():
+    """
+    Return pool size and hit/miss counters.
+    """
+    with _pool_lock:
+        idle = sum(len(c) for c in _pool.values())
+        return {
+            'idle': idle,
+            'in_use': _pool_stats['in_use'],
+            'max_idle': POOL_MAX_IDLE,
+            'hits': _pool_stats['hits'],
+            'misses': _pool_stats['misses'],
+        }
+
+# ============= INSTRUMENTATION =============
+
+# exec_query, fetch_all and exec_script record per-query latency, rows
+# returned and dict-conversion time, labelled with the `name` passed at the
+# call site ('<function>' or '<function>.<query>' when a function runs
+# several), so each query gets its own series. Calls without a name fall
+# back to the calling function. Statements slower than SLOW_QUERY_SECONDS
+# are written to SLOW_QUERY_LOG together with their EXPLAIN QUERY PLAN output.
+SLOW_QUERY_SECONDS = 0.1
+SLOW_QUERY_LOG = "slow_queries.log"
+
+QUERY_SECONDS = metrics.Histogram(
+    'db_query_duration_seconds', 'Time to execute a query and fetch its rows.', ('query',))
+QUERY_ROWS = metrics.Counter(
+    'db_query_rows_total', 'Rows returned by queries.', ('query',))
+ROW_CONVERT_SECONDS = metrics.Counter(
+    'db_row_convert_seconds_total', 'Time spent turning sqlite rows into dicts.', ('query',))
+SLOW_QUERIES = metrics.Counter(
+    'db_slow_queries_total', 'Queries slower than SLOW_QUERY_SECONDS.', ('query',))
+
+# Generic helpers that run queries on behalf of the function we fall back to
+_HELPER_FRAMES = {'exec_query', 'exec_script', 'fetch_all', 'fetch_page', 'wrapper', '_record_query'}
+
+_slow_log = logging.getLogger('db.slow_queries')
+_slow_log_lock = threading.Lock()
+
+def _slow_query_logger():
+    """
+    Return the slow query logger, attaching its file handler on first use
+    (under a lock, so concurrent slow queries can't attach two).
+    """
+    if not _slow_log.handlers:
+        with _slow_log_lock:
+            if not _slow_log.handlers:
+                handler = logging.FileHandler(SLOW_QUERY_LOG)
+                handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+                _slow_log.setLevel(logging.INFO)
+                _slow_log.addHandler(handler)
+    return _slow_log
+
+def _query_name():
+    """
+    Name of the first db.py function up the stack that isn't a query helper.
+    """
+    frame = sys._getframe(1)
+    while frame is not None and frame.f_code.co_name in _HELPER_FRAMES:
+        frame = frame.f_back
+    return frame.f_code.co_name if frame is not None else 'unknown'
+
+def _record_query(name, sql, params, seconds, rows=0, convert_seconds=0.0, conn=None):
+    """
+    Record one query's metrics and log it if slow. Pass conn to include
+    the EXPLAIN QUERY PLAN output (single read statements only).
+    """
+    QUERY_SECONDS.observe(seconds, name)
+    QUERY_ROWS.inc(name, amount=rows)
+    ROW_CONVERT_SECONDS.inc(name, amount=convert_seconds)
+    if seconds < SLOW_QUERY_SECONDS:
+        return
+    
+    SLOW_QUERIES.inc(name)
+    plan = []
+    if conn is not None:
+        try:
+            plan = explain_query_plan(conn, sql, params)
+        except sqlite3.Error as e:
+            plan = [f"(no plan: {e})"]
+    _slow_query_logger().info("%.1fms %s rows=%d sql=%s params=%r%s",
+                              seconds * 1000, name, rows, ' '.join(sql.split()), params,
+                              ''.join(f"\n    {line}" for line in plan))
+
+def exec_script(sql, name=None):
+    """
+    Execute a multi-statement SQL script (DDL/DML) with the writer paused.
+    """
+    name = name or _query_name()
+    start = time.perf_counter()
+    try:
+        with writer_paused(), pooled_conn() as conn:
+            conn.executescript(sql)
+            conn.commit()
+    finally:
+        _table_cache.pop(DB_FILE, None)
+        bump_generation()
+        _record_query(name, sql, (), time.perf_counter() - start)
+
+def exec_query(query, params=(), fetch=False, many=False, name=None):
     """
     Execute a single query.
-    - fetch=True: return all rows as list of dicts
-    - fetch=False: just commit (INSERT/UPDATE/DELETE)
+    - fetch=True: return all rows as list of dicts (read-only connection)
+    - fetch=False: run on the writer thread and commit (INSERT/UPDATE/DELETE)
     - many=True: use executemany
+    - name: metrics label (default: the calling function)
     """
-    with get_conn() as conn:
+    name = name or _query_name()
+    start = time.perf_counter()
+    if not fetch:
+        def write(conn):
+            if many:
+                conn.executemany(query, params)
+            else:
+                conn.execute(query, params)
+        submit_write(write)
+        _record_query(name, query, params, time.perf_counter() - start)
+        return None
+    
+    with pooled_conn(readonly=True) as conn:
         cur = conn.cursor()
         if many:
             cur.executemany(query, params)
         else:
             cur.execute(query, params)
-        conn.commit()
+        rows = cur.fetchall()
+        fetched = time.perf_counter()
+        result = [dict(row) for row in rows]
+        converted = time.perf_counter()
+        _record_query(name, query, params, fetched - start, len(result), converted - fetched,
+                      None if many else conn)
+        return result
+
+@contextmanager
+def read_transaction():
+    """
+    Borrow a pooled read-only connection inside a read transaction, so every
+    query in the with-block sees the same snapshot even while writers commit (WAL).
+    """
+    with pooled_conn(readonly=True) as conn:
+        conn.execute("BEGIN;")
+        yield conn
+
+def fetch_all(conn, query, params=(), name=None):
+    """
+    Run a query on an open connection and return all rows as list of dicts.
+    """
+    name = name or _query_name()
+    start = time.perf_counter()
+    rows = conn.execute(query, params).fetchall()
+    fetched = time.perf_counter()
+    result = [dict(row) for row in rows]
+    _record_query(name, query, params, fetched - start, len(result), time.perf_counter() - fetched, conn)
+    return result
+
+@contextmanager
+def write_transaction():
+    """
+    Borrow a pooled connection inside BEGIN IMMEDIATE ... COMMIT, with the
+    writer paused. Takes the write lock up front so multi-statement writes
+    are atomic and never fail half-way with a lock upgrade error. Used for
+    admin work outside the request path; request writes use submit_write().
+    """
+    with writer_paused(), pooled_conn() as conn:
+        conn.execute("BEGIN IMMEDIATE;")
+        yield conn
+
+# ============= WRITE QUEUE =============
+
+# SQLite allows one writer at a time, so request-path writes are queued to
+# a single writer thread. It drains whatever is queued (up to
+# WRITE_BATCH_MAX jobs) into one BEGIN IMMEDIATE ... COMMIT, so concurrent
+# writers share one fsync instead of fighting over the lock. Each job runs
+# under its own SAVEPOINT: a failing job is rolled back and its error
+# re-raised in the caller without affecting the rest of the group.
+#
+# Writes that can't be queued (scripts, bulk loads, admin transactions)
+# run under writer_paused() instead. The writer holds the same gate for
+# each group, so it waits in-process for them rather than in SQLite's
+# busy handler, which gives up after busy_timeout and would fail every
+# job in the group with "database is locked".
+WRITE_BATCH_MAX = 64
+WRITE_TIMEOUT_SECONDS = 30
+
+_write_queue = queue.Queue()
+_writer = None
+_writer_lock = threading.Lock()
+_write_gate = threading.RLock()
+_gate_holder = threading.local()
+_writer_stats = {'jobs': 0, 'failed': 0, 'commits': 0, 'max_batch': 0, 'rows_changed': 0}
+
+def _start_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = threading.Thread(target=_writer_loop, name='db-writer', daemon=True)
+            _writer.start()
+
+def _run_group(conn, jobs):
+    """
+    Run a group of (fn, args, future) jobs in one transaction and resolve their futures.
+    """
+    results = []
+    changes_before = conn.total_changes
+    try:
+        with _write_gate:
+            conn.execute("BEGIN IMMEDIATE;")
+            for fn, args, future in jobs:
+                conn.execute("SAVEPOINT write_job;")
+                try:
+                    result = fn(conn, *args)
+                except Exception as e:
+                    conn.execute("ROLLBACK TO write_job;")
+                    conn.execute("RELEASE write_job;")
+                    results.append((future, None, e))
+                else:
+                    conn.execute("RELEASE write_job;")
+                    results.append((future, result, None))
+            conn.commit()
+        _writer_stats['rows_changed'] += conn.total_changes - changes_before
+    except Exception as e:
+        if conn.in_transaction:
+            conn.rollback()
+        results = [(future, None, e) for _fn, _args, future in jobs]
+    
+    _writer_stats['commits'] += 1
+    _writer_stats['jobs'] += len(jobs)
+    _writer_stats['max_batch'] = max(_writer_stats['max_batch'], len(jobs))
+    for future, result, error in results:
+        if error is None:
+            future.set_result(result)
+        else:
+            _writer_stats['failed'] += 1
+            future.set_exception(error)
+
+def _writer_loop():
+    conn, conn_file = None, None
+    while True:
+        batch = [_write_queue.get()]
+        while len(batch) < WRITE_BATCH_MAX:
+            try:
+                batch.append(_write_queue.get_nowait())
+            except queue.Empty:
+                break
         
-        if fetch:
-            rows = cur.fetchall()
-            return [dict(row) for row in rows]
-        return None
+        # Jobs are (db_file, fn, args, future); None asks to close the connection
+        group = []
+        for job in batch:
+            if job is not None and job[0] == conn_file:
+                group.append(job[1:])
+                continue
+            if group:
+                _run_group(conn, group)
+                group = []
+            if conn is not None:
+                conn.close()
+                conn, conn_file = None, None
+            if job is None:
+                continue
+            try:
+                conn, conn_file = get_conn(db_file=job[0]), job[0]
+            except Exception as e:
+                job[3].set_exception(e)
+                continue
+            group.append(job[1:])
+        if group:
+            _run_group(conn, group)
+
+def submit_write(fn, *args, timeout=WRITE_TIMEOUT_SECONDS):
+    """
+    Run fn(conn, *args) on the writer thread as part of the next group
+    commit. Blocks until the group has committed (or `timeout` seconds,
+    None for no limit) and returns fn's result, or re-raises its
+    exception (its changes are rolled back).
+    """
+    if threading.current_thread() is _writer:
+        raise RuntimeError("submit_write() called from inside a write job")
+    if getattr(_gate_holder, 'depth', 0):
+        raise RuntimeError("submit_write() called with the writer paused")
+    _start_writer()
+    future = Future()
+    _write_queue.put((DB_FILE, fn, args, future))
+    return future.result(timeout=timeout)
+
+@contextmanager
+def writer_paused():
+    """
+    Hold off the writer thread (after its current group) for a with-block
+    that writes on its own connection. Re-entrant; submit_write() can't be
+    called inside it.
+    """
+    if threading.current_thread() is _writer:
+        raise RuntimeError("writer_paused() called from inside a write job")
+    with _write_gate:
+        _gate_holder.depth = getattr(_gate_holder, 'depth', 0) + 1
+        try:
+            yield
+        finally:
+            _gate_holder.depth -= 1
+
+def writer_stats():
+    """
+    Return write queue depth and group commit counters.
+    """
+    return {'queued': _write_queue.qsize(), 'batch_max': WRITE_BATCH_MAX, **_writer_stats}
+
+# ============= QUERY CACHE =============
+
+# Memoized reference-data reads. Entries expire after CACHE_TTL_SECONDS
+# (which bounds staleness for writes made by other processes) and are
+# evicted least-recently-used beyond CACHE_MAX_ENTRIES. Within this
+# process, write paths call bump_generation(<tables>) and any entry that
+# read one of those tables is treated as stale.
+CACHE_MAX_ENTRIES = 256
+CACHE_TTL_SECONDS = 300
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_cache_stats = {'hits': 0, 'misses': 0, 'stale': 0, 'evictions': 0}
+# (DB_FILE, table) -> write generation; (DB_FILE, None) is the schema-wide epoch
+_generations = {}
+
+def bump_generation(*tables):
+    """
+    Record a write to the given tables (no tables = every table, e.g. DDL or seeding),
+    invalidating cached reads that depend on them.
+    """
+    with _cache_lock:
+        for table in tables or (None,):
+            key = (DB_FILE, table)
+            _generations[key] = _generations.get(key, 0) + 1
+
+def _generation_snapshot(tables):
+    return tuple(_generations.get((DB_FILE, t), 0) for t in (None, *tables))
+
+def cached(*tables, ttl=CACHE_TTL_SECONDS):
+    """
+    Decorator: memoize a read-only query function whose result depends on `tables`.
+    Cached values are shared between callers and must not be mutated.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (DB_FILE, func.__name__, args, tuple(sorted(kwargs.items())))
+            now = time.monotonic()
+            with _cache_lock:
+                generations = _generation_snapshot(tables)
+                entry = _cache.get(key)
+                if entry is not None:
+                    expires_at, entry_generations, value = entry
+                    if expires_at > now and entry_generations == generations:
+                        _cache.move_to_end(key)
+                        _cache_stats['hits'] += 1
+                        return value
+                    _cache_stats['stale'] += 1
+                _cache_stats['misses'] += 1
+            
+            value = func(*args, **kwargs)
+            with _cache_lock:
+                # Only store if no write happened while we were reading
+                if generations == _generation_snapshot(tables):
+                    _cache[key] = (now + ttl, generations, value)
+                    _cache.move_to_end(key)
+                    while len(_cache) > CACHE_MAX_ENTRIES:
+                        _cache.popitem(last=False)
+                        _cache_stats['evictions'] += 1
+            return value
+        return wrapper
+    return decorator
+
+def clear_cache():
+    """
+    Drop every cached entry.
+    """
+    with _cache_lock:
+        _cache.clear()
+
+def cache_stats():
+    """
+    Return cache size and hit/miss/stale/eviction counters.
+    """
+    with _cache_lock:
+        lookups = _cache_stats['hits'] + _cache_stats['misses']
+        return {
+            'entries': len(_cache),
+            'max_entries': CACHE_MAX_ENTRIES,
+            'ttl_seconds': CACHE_TTL_SECONDS,
+            **_cache_stats,
+            'hit_rate': round(_cache_stats['hits'] / lookups, 3) if lookups else None,
+        }
 
 def drop_all():
     """
     Drop all tables in safe dependency order (children first).
-    Temporarily disable foreign keys for safety.
+    Temporarily disable foreign keys for safety. Match partition files
+    are deleted along with the catalog that lists them.
     """
     script = """
     PRAGMA foreign_keys = OFF;
     
+    DROP TABLE IF EXISTS match_partition_match;
+    DROP TABLE IF EXISTS match_partition_player;
+    DROP TABLE IF EXISTS match_partition;
+    DROP TABLE IF EXISTS rollup_control;
+    DROP TABLE IF EXISTS match_hourly_rollup;
+    DROP TABLE IF EXISTS gamemode_rollup;
+    DROP TABLE IF EXISTS character_gamemode_rollup;
+    DROP TABLE IF EXISTS player_character_rollup;
+    DROP TABLE IF EXISTS player_stats_rollup;
+    DROP TABLE IF EXISTS player_fts;
     DROP TABLE IF EXISTS txn;
     DROP TABLE IF EXISTS entitlement;
     DROP TABLE IF EXISTS match_player_stats;
@@ -66,16 +582,96 @@ def drop_all():
     
     PRAGMA foreign_keys = ON;
     """
-    exec_script(script)
+    exec_script(script, name='drop_all')
+    # Pooled connections may still have partitions attached
+    close_pool()
+    shutil.rmtree(partition_dir(), ignore_errors=True)
+
+SCHEMA_FILES = ("schema_sqlite.sql", "rollups_sqlite.sql", "search_sqlite.sql")
+
+# Columns added to existing tables since they were first created:
+# (table, column, definition). create_all() adds any an older database lacks.
+ADDED_COLUMNS = (
+    ('match_game', 'started_epoch', "INTEGER GENERATED ALWAYS AS (unixepoch(started_at)) VIRTUAL"),
+    ('match_game', 'ended_epoch', "INTEGER GENERATED ALWAYS AS (unixepoch(ended_at)) VIRTUAL"),
+)
+
+def _add_missing_columns():
+    """
+    ALTER in any ADDED_COLUMNS missing from existing tables.
+    Returns True if anything was added.
+    """
+    with pooled_conn() as conn:
+        missing = []
+        for table, column, definition in ADDED_COLUMNS:
+            existing = {row['name'] for row in conn.execute(f"PRAGMA table_xinfo({table});")}
+            if existing and column not in existing:
+                missing.append(f"ALTER TABLE {table} ADD COLUMN {column} {definition};\n")
+    if missing:
+        exec_script("".join(missing), name='_add_missing_columns')
+    return bool(missing)
+
+def _drop_changed_triggers(schema_sql):
+    """
+    Drop triggers whose definition in schema_sql differs from the one in
+    the database, so the script's CREATE TRIGGER IF NOT EXISTS installs
+    the new version.
+    """
+    normalize = lambda sql: ' '.join(sql.replace("IF NOT EXISTS ", "", 1).rstrip(';').split())
+    wanted = {m.group(1): normalize(m.group(0)) for m in
+              re.finditer(r"CREATE TRIGGER IF NOT EXISTS (\w+)\b.*?\bEND;", schema_sql, re.S)}
+    if not wanted:
+        return
+    with pooled_conn() as conn:
+        existing = conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger';").fetchall()
+    changed = [name for name, sql in existing if name in wanted and normalize(sql) != wanted[name]]
+    if changed:
+        exec_script("".join(f"DROP TRIGGER IF EXISTS {name};\n" for name in changed),
+                    name='_drop_changed_triggers')
 
 def create_all():
     """
-    Create all tables by reading schema_sqlite.sql.
+    Create all tables by reading SCHEMA_FILES in order (base schema,
+    rollup tables and triggers, search index), then apply the secondary
+    indexes from indexes_sqlite.sql. An older database is upgraded in
+    place: missing columns are added, changed triggers replaced, existing
+    players indexed for search if the index is new and the rollups
+    rebuilt to fill any new rollup tables.
+    """
+    upgraded = _add_missing_columns()
+    for name in SCHEMA_FILES:
+        schema_path = Path(__file__).parent / name
+        with open(schema_path, 'r') as f:
+            schema_sql = f.read()
+        _drop_changed_triggers(schema_sql)
+        exec_script(schema_sql, name='create_all')
+    create_indexes()
+    rebuild_search_index(only_if_empty=True)
+    if upgraded:
+        rebuild_rollups()
+
+def _read_index_sql():
+    index_path = Path(__file__).parent / "indexes_sqlite.sql"
+    with open(index_path, 'r') as f:
+        return f.read()
+
+def index_names():
+    """
+    Names of the managed secondary indexes declared in indexes_sqlite.sql.
+    """
+    return re.findall(r"CREATE INDEX IF NOT EXISTS (\w+)", _read_index_sql())
+
+def create_indexes():
+    """
+    Create the managed secondary indexes (idempotent).
+    """
+    exec_script(_read_index_sql(), name='create_indexes')
+
+def drop_indexes():
+    """
+    Drop the managed secondary indexes (e.g. before a bulk load).
     """
-    schema_path = Path(__file__).parent / "schema_sqlite.sql"
-    with open(schema_path, 'r') as f:
-        schema_sql = f.read()
-    exec_script(schema_sql)
+    exec_script("".join(f"DROP INDEX IF EXISTS {name};\n" for name in index_names()), name='drop_indexes')
 
 def seed_all():
     """
@@ -84,52 +680,347 @@ def seed_all():
     seed_path = Path(__file__).parent / "seed_sqlite.sql"
     with open(seed_path, 'r') as f:
         seed_sql = f.read()
-    exec_script(seed_sql)
+    exec_script(seed_sql, name='seed_all')
 
-def get_tables():
+# Rollup table -> (key columns, value columns, aggregate over one schema's
+# match tables). rebuild_rollups() runs each over the main file and adds
+# the totals from any match partitions.
+ROLLUP_SOURCES = {
+    'player_stats_rollup': (
+        ('player_id',),
+        ('total_matches', 'wins', 'losses', 'stat_rows',
+         'sum_kills', 'sum_deaths', 'sum_assists', 'sum_damage', 'sum_healing'),
+        """
+        SELECT 
+            mp.player_id,
+            COUNT(*),
+            SUM(mp.result = 'win'),
+            SUM(mp.result = 'loss'),
+            COUNT(mps.match_player_id),
+            COALESCE(SUM(mps.kills), 0),
+            COALESCE(SUM(mps.deaths), 0),
+            COALESCE(SUM(mps.assists), 0),
+            COALESCE(SUM(mps.damage_dealt), 0),
+            COALESCE(SUM(mps.healing_done), 0)
+        FROM {schema}.match_player mp
+        LEFT JOIN {schema}.match_player_stats mps ON mp.match_player_id = mps.match_player_id
+        GROUP BY mp.player_id
+        """),
+    'player_character_rollup': (
+        ('player_id', 'character_id'),
+        ('times_played', 'wins'),
+        """
+        SELECT player_id, character_id, COUNT(*), SUM(result = 'win')
+        FROM {schema}.match_player
+        GROUP BY player_id, character_id
+        """),
+    'character_gamemode_rollup': (
+        ('character_id', 'gamemode'),
+        ('picks', 'wins', 'losses', 'stat_rows', 'sum_kills', 'sum_deaths', 'sum_assists', 'sum_damage'),
+        """
+        SELECT 
+            mp.character_id,
+            mg.gamemode,
+            COUNT(*),
+            SUM(mp.result = 'win'),
+            SUM(mp.result = 'loss'),
+            COUNT(mps.match_player_id),
+            COALESCE(SUM(mps.kills), 0),
+            COALESCE(SUM(mps.deaths), 0),
+            COALESCE(SUM(mps.assists), 0),
+            COALESCE(SUM(mps.damage_dealt), 0)
+        FROM {schema}.match_player mp
+        JOIN {schema}.match_game mg ON mp.match_id = mg.match_id
+        LEFT JOIN {schema}.match_player_stats mps ON mp.match_player_id = mps.match_player_id
+        GROUP BY mp.character_id, mg.gamemode
+        """),
+    'gamemode_rollup': (
+        ('gamemode',),
+        ('matches',),
+        """
+        SELECT gamemode, COUNT(*) FROM {schema}.match_game GROUP BY gamemode
+        """),
+    'match_hourly_rollup': (
+        ('hour_start', 'gamemode'),
+        ('matches', 'ended_matches', 'sum_duration', 'player_rows', 'wins'),
+        """
+        SELECT 
+            mg.started_epoch - mg.started_epoch % 3600,
+            mg.gamemode,
+            COUNT(*),
+            COUNT(mg.ended_epoch),
+            COALESCE(SUM(mg.ended_epoch - mg.started_epoch), 0),
+            COALESCE(SUM(p.player_rows), 0),
+            COALESCE(SUM(p.wins), 0)
+        FROM {schema}.match_game mg
+        LEFT JOIN (
+            SELECT match_id, COUNT(*) AS player_rows, SUM(result = 'win') AS wins
+            FROM {schema}.match_player
+            GROUP BY match_id
+        ) AS p ON p.match_id = mg.match_id
+        WHERE mg.started_epoch IS NOT NULL
+        GROUP BY 1, 2
+        """),
+}
+
+def _rollup_upsert(table):
+    """
+    INSERT for one rollup row that adds to an existing row's values.
+    """
+    keys, values, _select = ROLLUP_SOURCES[table]
+    columns = keys + values
+    return f"""
+    INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})
+    ON CONFLICT({', '.join(keys)}) DO UPDATE SET
+        {', '.join(f'{v} = {v} + excluded.{v}' for v in values)};
+    """
+
+def _partition_rollups(partitions):
+    """
+    Run each rollup aggregate over the partition files and sum the results:
+    {table: {key tuple: [values]}}.
     """
-    Get list of all table names in the database.
+    totals = {table: {} for table in ROLLUP_SOURCES}
+    for partition in partitions:
+        schema = partition_schema(partition['month'])
+        with partition_read([partition]) as conn:
+            for table, (keys, _values, select) in ROLLUP_SOURCES.items():
+                rows = totals[table]
+                for row in conn.execute(select.format(schema=schema)):
+                    key, values = tuple(row[:len(keys)]), row[len(keys):]
+                    current = rows.get(key)
+                    if current is None:
+                        rows[key] = list(values)
+                    else:
+                        for i, value in enumerate(values):
+                            current[i] += value
+    return totals
+
+# Rollup key columns whose rows the main file drops along with the row
+# they describe; partitions can still hold matches of deleted players or
+# characters.
+_ROLLUP_KEY_IDS = {
+    'player_id': "SELECT player_id FROM player;",
+    'character_id': "SELECT character_id FROM game_character;",
+}
+
+def _rebuild_rollup(conn, table, partition_totals):
     """
+    Write job: replace one rollup table with its aggregate over the main
+    file plus partition_totals ({key tuple: [values]}).
+    """
+    keys, values, select = ROLLUP_SOURCES[table]
+    conn.execute(f"DELETE FROM {table};")
+    conn.execute(f"INSERT INTO {table} ({', '.join(keys + values)}) {select.format(schema='main')};")
+    if not partition_totals:
+        return
+    checks = [(i, {r[0] for r in conn.execute(_ROLLUP_KEY_IDS[k])})
+              for i, k in enumerate(keys) if k in _ROLLUP_KEY_IDS]
+    conn.executemany(_rollup_upsert(table), (
+        (*key, *totals) for key, totals in partition_totals.items()
+        if all(key[i] in ids for i, ids in checks)))
+
+def rebuild_rollups():
+    """
+    Recompute all rollup tables from match history, including matches
+    moved to partition files. Use after backfills or any load that
+    bypassed the rollup triggers. Each table is replaced in its own write
+    job: it is exact as of that commit and the triggers keep it exact
+    afterwards, so concurrent writes only ever wait for one table.
+    """
+    with partition_lock:
+        partition_totals = _partition_rollups(get_partitions())
+        for table in ROLLUP_SOURCES:
+            submit_write(_rebuild_rollup, table, partition_totals[table], timeout=None)
+    bump_generation(*ROLLUP_SOURCES)
+
+# ============= PAGINATION =============
+
+def encode_cursor(key):
+    """
+    Encode the last key of a page (an integer, or a tuple of integers for
+    composite keys) as an opaque next_cursor token.
+    """
+    text = ','.join(map(str, key)) if isinstance(key, tuple) else str(key)
+    return base64.urlsafe_b64encode(text.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor, parts=1):
+    """
+    Decode a cursor token back to an integer key, or a tuple of `parts`
+    integers. Raises ValueError if invalid.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = tuple(int(v) for v in base64.urlsafe_b64decode(padded.encode()).decode().split(','))
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    if len(values) != parts:
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return values[0] if parts == 1 else values
+
+def encode_key_cursor(values):
+    """
+    Encode a composite key that may mix integers and text (a WITHOUT ROWID
+    table's primary key) as an opaque next_cursor token.
+    """
+    return base64.urlsafe_b64encode(json.dumps(list(values)).encode()).decode().rstrip('=')
+
+def decode_key_cursor(cursor, parts):
+    """
+    Decode an encode_key_cursor() token back to a tuple of `parts` values.
+    Raises ValueError if invalid.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = tuple(json.loads(base64.urlsafe_b64decode(padded.encode()).decode()))
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    if len(values) != parts or not all(type(v) in (int, str) for v in values):
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return values
+
+def page_size(limit):
+    """
+    Clamp a caller-supplied page size to 1..MAX_PAGE_SIZE.
+    """
+    if limit is None:
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(int(limit), MAX_PAGE_SIZE))
+
+def fetch_page(query, key, cursor=None, limit=None, descending=False, params=(), name=None):
+    """
+    Run a keyset-paginated query.
+    The query must contain a single '?' for the key bound (placed before
+    `params`) and end with ORDER BY <key> ... LIMIT ?.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    limit = page_size(limit)
+    if cursor is None:
+        bound = _MAX_KEY if descending else _MIN_KEY
+    else:
+        bound = decode_cursor(cursor)
+    rows = exec_query(query, (bound, *params, limit + 1), fetch=True, name=name)
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1][key])
+
+_WITHOUT_ROWID = re.compile(r"\)\s*WITHOUT\s+ROWID\s*;?\s*$", re.IGNORECASE)
+
+def _load_tables():
+    """
+    Read the table whitelist with each table's pagination key (a tuple of
+    columns) and stored columns. Tables with a single INTEGER PRIMARY KEY
+    page on it, WITHOUT ROWID tables on their primary key columns, others
+    on rowid. Generated columns (match_game's epochs) are left out, so
+    rows keep the shape they had before those columns were added.
+    """
+    tables = {}
     query = """
-    SELECT name FROM sqlite_master 
+    SELECT name, sql FROM sqlite_master 
     WHERE type='table' 
     AND name NOT LIKE 'sqlite_%'
     ORDER BY name;
     """
-    rows = exec_query(query, fetch=True)
-    return [row['name'] for row in rows] if rows else []
+    with pooled_conn(readonly=True) as conn:
+        rows = conn.execute(query).fetchall()
+        # Hide virtual tables (e.g. player_fts) and their shadow tables
+        virtual = [r['name'] for r in rows if (r['sql'] or '').startswith('CREATE VIRTUAL TABLE')]
+        for row in rows:
+            name = row['name']
+            if any(name == v or name.startswith(v + '_') for v in virtual):
+                continue
+            columns = conn.execute(f"PRAGMA table_info({name});").fetchall()
+            pk = sorted((c for c in columns if c['pk']), key=lambda c: c['pk'])
+            if _WITHOUT_ROWID.search(row['sql'] or ''):
+                key = tuple(c['name'] for c in pk)
+            elif len(pk) == 1 and pk[0]['type'].upper() == 'INTEGER':
+                key = (pk[0]['name'],)
+            else:
+                key = ('rowid',)
+            tables[name] = (key, ', '.join(c['name'] for c in columns))
+    return tables
 
-def select_all(table_name):
+def _table_whitelist():
+    tables = _table_cache.get(DB_FILE)
+    if tables is None:
+        tables = _load_tables()
+        _table_cache[DB_FILE] = tables
+    return tables
+
+def get_tables():
     """
-    Select all rows from a given table.
-    WARNING: table_name is not parameterized - use only with trusted input.
+    Get list of all table names in the database (cached until the next DDL).
+    """
+    return sorted(_table_whitelist())
+
+def select_all(table_name, cursor=None, limit=None):
+    """
+    Select one page of rows from a given table, ordered by its primary key.
+    Returns {'rows': [...], 'next_cursor': token or None}.
+    WARNING: table_name is not parameterized - it is checked against the whitelist.
     """
     # Validate table name exists to prevent SQL injection
-    tables = get_tables()
-    if table_name not in tables:
-        return []
+    entry = _table_whitelist().get(table_name)
+    if entry is None:
+        return {'rows': [], 'next_cursor': None}
     
-    query = f"SELECT * FROM {table_name} LIMIT 100;"
-    return exec_query(query, fetch=True)
+    key, columns = entry
+    if len(key) > 1:
+        return _select_page_composite(table_name, key, columns, cursor, limit)
+    query = f"""
+    SELECT {key[0]} AS _page_key, {columns} FROM {table_name}
+    WHERE {key[0]} > ?
+    ORDER BY {key[0]}
+    LIMIT ?;
+    """
+    rows, next_cursor = fetch_page(query, '_page_key', cursor, limit, name='select_all')
+    for row in rows:
+        row.pop('_page_key', None)
+    return {'rows': rows, 'next_cursor': next_cursor}
+
+def _select_page_composite(table_name, key, columns, cursor, limit):
+    """
+    One page of a WITHOUT ROWID table, keyset-paged on its primary key
+    columns with a row-value comparison (see encode_key_cursor).
+    """
+    limit = page_size(limit)
+    key_list = ', '.join(key)
+    where, bound = "", ()
+    if cursor is not None:
+        bound = decode_key_cursor(cursor, len(key))
+        where = f"WHERE ({key_list}) > ({', '.join('?' * len(key))})"
+    rows = exec_query(f"SELECT {columns} FROM {table_name} {where} ORDER BY {key_list} LIMIT ?;",
+                      (*bound, limit + 1), fetch=True, name='select_all')
+    if len(rows) <= limit:
+        return {'rows': rows, 'next_cursor': None}
+    rows = rows[:limit]
+    return {'rows': rows, 'next_cursor': encode_key_cursor(rows[-1][k] for k in key)}
 
 # ============= PLAYER CRUD =============
 
-def get_all_players():
-    """Get all players."""
-    return exec_query("SELECT * FROM player ORDER BY player_id;", fetch=True)
+def get_all_players(cursor=None, limit=None):
+    """Get one page of players ordered by ID."""
+    query = "SELECT * FROM player WHERE player_id > ? ORDER BY player_id LIMIT ?;"
+    players, next_cursor = fetch_page(query, 'player_id', cursor, limit, name='get_all_players')
+    return {'players': players, 'next_cursor': next_cursor}
 
 def get_player_by_id(player_id):
     """Get a single player by ID."""
-    rows = exec_query("SELECT * FROM player WHERE player_id = ?;", (player_id,), fetch=True)
+    rows = exec_query("SELECT * FROM player WHERE player_id = ?;", (player_id,), fetch=True,
+                      name='get_player_by_id')
     return rows[0] if rows else None
 
 def insert_player(display_name, email, password_hash, rank_mmr=1000):
-    """Insert a new player."""
+    """Insert a new player and return their ID."""
     query = """
     INSERT INTO player (display_name, email, password_hash, rank_mmr)
     VALUES (?, ?, ?, ?);
     """
-    exec_query(query, (display_name, email, password_hash, rank_mmr))
+    player_id = submit_write(lambda conn: conn.execute(query, (display_name, email, password_hash, rank_mmr)).lastrowid)
+    bump_generation('player')
+    _update_mmr_index(player_id, rank_mmr)
+    return player_id
 
 def update_player(player_id, display_name, email, password_hash, rank_mmr):
     """Update an existing player."""
@@ -138,90 +1029,576 @@ def update_player(player_id, display_name, email, password_hash, rank_mmr):
     SET display_name = ?, email = ?, password_hash = ?, rank_mmr = ?
     WHERE player_id = ?;
     """
-    exec_query(query, (display_name, email, password_hash, rank_mmr, player_id))
+    exec_query(query, (display_name, email, password_hash, rank_mmr, player_id), name='update_player')
+    bump_generation('player')
+    _update_mmr_index(player_id, rank_mmr)
 
 def delete_player(player_id):
     """Delete a player by ID."""
-    exec_query("DELETE FROM player WHERE player_id = ?;", (player_id,))
+    exec_query("DELETE FROM player WHERE player_id = ?;", (player_id,), name='delete_player')
+    bump_generation('player', 'entitlement', 'txn', 'player_stats_rollup', 'player_character_rollup')
+    _update_mmr_index(player_id, None)
+    _ownership_forget(player_id)
 
 # ============= GAME_ROLE CRUD =============
 
+@cached('game_role')
 def get_all_roles():
     """Get all game roles."""
-    return exec_query("SELECT * FROM game_role ORDER BY role_id;", fetch=True)
+    return exec_query("SELECT * FROM game_role ORDER BY role_id;", fetch=True, name='get_all_roles')
 
 def get_role_by_id(role_id):
     """Get a single role by ID."""
-    rows = exec_query("SELECT * FROM game_role WHERE role_id = ?;", (role_id,), fetch=True)
+    rows = exec_query("SELECT * FROM game_role WHERE role_id = ?;", (role_id,), fetch=True,
+                      name='get_role_by_id')
     return rows[0] if rows else None
 
 def insert_role(name, description=""):
     """Insert a new game role."""
     query = "INSERT INTO game_role (name, description) VALUES (?, ?);"
-    exec_query(query, (name, description))
+    exec_query(query, (name, description), name='insert_role')
+    bump_generation('game_role')
 
 def update_role(role_id, name, description):
     """Update an existing game role."""
     query = "UPDATE game_role SET name = ?, description = ? WHERE role_id = ?;"
-    exec_query(query, (name, description, role_id))
+    exec_query(query, (name, description, role_id), name='update_role')
+    bump_generation('game_role')
 
 def delete_role(role_id):
     """Delete a game role by ID."""
-    exec_query("DELETE FROM game_role WHERE role_id = ?;", (role_id,))
+    exec_query("DELETE FROM game_role WHERE role_id = ?;", (role_id,), name='delete_role')
+    bump_generation('game_role')
+
+# ============= MATCH PARTITIONS =============
+
+# Whole months of match history can be moved out of DB_FILE into one
+# SQLite file per month (partitions.py), listed in match_partition. The
+# main file always holds current matches and is always read; the routed
+# reads below (match_partition_match for match IDs, match_partition_player
+# for player history) ATTACH only the partitions a query needs, read-only
+# (immutable once archived), and leave them attached to the pooled
+# connection for the next request. SQLite allows few attached files per
+# connection (SQLITE_LIMIT_ATTACHED), so the oldest attachment not
+# needed by the current query is detached first.
+
+# Held by partition moves and rollup rebuilds, which read partitions and
+# the main file as one.
+partition_lock = threading.RLock()
+
+def partition_dir(db_file=None):
+    """
+    Directory holding the match partitions of a database file (default DB_FILE).
+    """
+    return Path(db_file or DB_FILE).with_suffix('.partitions')
+
+def partition_file(month, db_file=None):
+    return partition_dir(db_file) / f"matches_{month // 100:04d}_{month % 100:02d}.db"
+
+def partition_schema(month):
+    """
+    Schema name a partition is attached as (p202401).
+    """
+    return f"p{int(month)}"
+
+def parse_month(value):
+    """
+    Parse 'YYYY-MM' into a YYYYMM month number. Raises ValueError if invalid.
+    """
+    match = re.fullmatch(r"(\d{4})-(\d{2})", str(value).strip())
+    if not match or not 1 <= int(match.group(2)) <= 12:
+        raise ValueError(f"Invalid month: {value!r} (expected YYYY-MM)")
+    return int(match.group(1)) * 100 + int(match.group(2))
+
+def format_month(month):
+    return f"{month // 100:04d}-{month % 100:02d}"
+
+def month_bounds(month):
+    """
+    [start, end) of a YYYYMM month in epoch seconds (UTC).
+    """
+    year, mon = divmod(month, 100)
+    start = datetime(year, mon, 1, tzinfo=timezone.utc)
+    end = datetime(year + mon // 12, mon % 12 + 1, 1, tzinfo=timezone.utc)
+    return int(start.timestamp()), int(end.timestamp())
+
+@cached('match_partition')
+def get_partitions():
+    """
+    Catalog rows of all match partitions, newest month first.
+    """
+    return exec_query("SELECT * FROM match_partition ORDER BY month DESC;", fetch=True, name='get_partitions')
+
+def _attach_partitions(conn, partitions):
+    """
+    Attach partitions (catalog rows) to a read-only connection outside a
+    transaction, detaching older attachments to stay within the limit.
+    """
+    attached = [row['name'] for row in conn.execute("PRAGMA database_list;") if row['name'] not in ('main', 'temp')]
+    wanted = {partition_schema(p['month']): p for p in partitions}
+    limit = conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+    if len(wanted) > limit:
+        raise ValueError(f"Too many partitions for one query: {len(wanted)} (max {limit})")
+    for name, partition in wanted.items():
+        if name in attached:
+            continue
+        path = partition_file(partition['month'])
+        if not path.exists():
+            raise FileNotFoundError(f"Match partition {format_month(partition['month'])} is missing: {path}")
+        while len(attached) >= limit:
+            spare = next(n for n in attached if n not in wanted)
+            conn.execute(f"DETACH DATABASE {spare};")
+            attached.remove(spare)
+        uri = path.resolve().as_uri() + ("?mode=ro&immutable=1" if partition['archived'] else "?mode=ro")
+        conn.execute(f"ATTACH DATABASE ? AS {name};", (uri,))
+        attached.append(name)
+
+@contextmanager
+def partition_read(partitions):
+    """
+    Borrow a pooled read-only connection with the given partitions
+    (rows from get_partitions()) attached as p<YYYYMM>, inside a read
+    transaction. The main file's tables stay reachable unqualified.
+    """
+    with pooled_conn(readonly=True) as conn:
+        _attach_partitions(conn, partitions)
+        conn.execute("BEGIN;")
+        yield conn
+
+def _match_partitions(match_ids):
+    """
+    Group moved match_ids by the partition holding them (match_partition_match).
+    Returns [(catalog row, [match_id, ...])], newest partition first.
+    """
+    rows = exec_query("""
+    SELECT match_id, month FROM match_partition_match
+    WHERE match_id IN (SELECT value FROM json_each(?));
+    """, (json.dumps([int(mid) for mid in match_ids]),), fetch=True, name='_match_partitions')
+    by_month = {}
+    for row in rows:
+        by_month.setdefault(row['month'], []).append(row['match_id'])
+    return [(p, by_month[p['month']]) for p in get_partitions() if p['month'] in by_month]
 
 # ============= MATCH QUERIES =============
 
-def get_all_matches():
-    """Get all matches."""
-    return exec_query("SELECT * FROM match_game ORDER BY match_id DESC;", fetch=True)
+MATCH_PAGE_QUERY = """
+SELECT match_id, gamemode, started_at, ended_at FROM {schema}.match_game
+WHERE match_id < ?
+ORDER BY match_id DESC
+LIMIT ?;
+"""
 
-def get_match_details(match_id):
-    """Get detailed match information with teams and players."""
-    # Get match info
-    match_query = "SELECT * FROM match_game WHERE match_id = ?;"
-    matches = exec_query(match_query, (match_id,), fetch=True)
-    
-    if not matches:
-        return None
+def get_all_matches(cursor=None, limit=None):
+    """
+    Get one page of matches, newest first. Partitions are read newest
+    first, only while they can still hold IDs that belong on the page.
+    """
+    partitions = get_partitions()
+    if not partitions:
+        matches, next_cursor = fetch_page(MATCH_PAGE_QUERY.format(schema='main'), 'match_id',
+                                          cursor, limit, descending=True, name='get_all_matches')
+        return {'matches': matches, 'next_cursor': next_cursor}
     
-    # Get players in match with their character and stats
-    players_query = """
+    limit = page_size(limit)
+    bound = _MAX_KEY if cursor is None else decode_cursor(cursor)
+    rows = exec_query(MATCH_PAGE_QUERY.format(schema='main'), (bound, limit + 1), fetch=True,
+                      name='get_all_matches')
+    for partition in sorted(partitions, key=lambda p: p['max_match_id'], reverse=True):
+        if len(rows) > limit and rows[limit]['match_id'] > partition['max_match_id']:
+            break
+        if partition['min_match_id'] >= bound:
+            continue
+        with partition_read([partition]) as conn:
+            rows += fetch_all(conn, MATCH_PAGE_QUERY.format(schema=partition_schema(partition['month'])),
+                              (bound, limit + 1), name='get_all_matches.partition')
+        # A match mid-move can be in both files; keep the first copy (main)
+        rows = sorted({r['match_id']: r for r in reversed(rows)}.values(),
+                      key=lambda r: r['match_id'], reverse=True)[:limit + 1]
+    if len(rows) <= limit:
+        return {'matches': rows, 'next_cursor': None}
+    rows = rows[:limit]
+    return {'matches': rows, 'next_cursor': encode_cursor(rows[-1]['match_id'])}
+
+MAX_BATCH_MATCHES = 200
+
+def _get_match_details(conn, match_ids, schema='main'):
+    """
+    Fetch details for many matches with one join over match_id IN json_each(?),
+    grouped in Python into {match_id: {'match', 'teams', 'players'}}.
+    Each team lists its players' match_player_ids; players carry team_label.
+    schema selects the match tables (an attached partition); player and
+    character names always come from the main file.
+    """
+    query = f"""
     SELECT 
+        mg.match_id,
+        mg.gamemode,
+        mg.started_at,
+        mg.ended_at,
+        t.team_id,
+        t.team_label,
         mp.match_player_id,
         mp.player_id,
         p.display_name,
         mp.character_id,
         gc.name as character_name,
         mp.result,
-        t.team_label,
         mps.kills,
         mps.deaths,
         mps.assists,
         mps.damage_dealt,
         mps.healing_done
-    FROM match_player mp
-    JOIN player p ON mp.player_id = p.player_id
-    JOIN game_character gc ON mp.character_id = gc.character_id
-    JOIN team t ON mp.team_id = t.team_id
-    LEFT JOIN match_player_stats mps ON mp.match_player_id = mps.match_player_id
-    WHERE mp.match_id = ?
-    ORDER BY t.team_label, p.display_name;
+    FROM {schema}.match_game mg
+    LEFT JOIN {schema}.team t ON t.match_id = mg.match_id
+    LEFT JOIN {schema}.match_player mp ON mp.team_id = t.team_id
+    LEFT JOIN main.player p ON mp.player_id = p.player_id
+    LEFT JOIN main.game_character gc ON mp.character_id = gc.character_id
+    LEFT JOIN {schema}.match_player_stats mps ON mp.match_player_id = mps.match_player_id
+    WHERE mg.match_id IN (SELECT value FROM json_each(?))
+    ORDER BY mg.match_id, t.team_label, p.display_name;
+    """
+    ids = json.dumps([int(mid) for mid in match_ids])
+    details = {}
+    teams = {}
+    for row in conn.execute(query, (ids,)):
+        match_id = row['match_id']
+        entry = details.get(match_id)
+        if entry is None:
+            entry = details[match_id] = {
+                'match': {k: row[k] for k in ('match_id', 'gamemode', 'started_at', 'ended_at')},
+                'teams': [],
+                'players': []
+            }
+        if row['team_id'] is None:
+            continue
+        team = teams.get(row['team_id'])
+        if team is None:
+            team = teams[row['team_id']] = {
+                'team_id': row['team_id'], 'team_label': row['team_label'], 'match_player_ids': []
+            }
+            entry['teams'].append(team)
+        if row['match_player_id'] is None:
+            continue
+        team['match_player_ids'].append(row['match_player_id'])
+        entry['players'].append({
+            k: row[k] for k in (
+                'match_player_id', 'player_id', 'display_name', 'character_id',
+                'character_name', 'result', 'team_label', 'kills', 'deaths',
+                'assists', 'damage_dealt', 'healing_done')
+        })
+    return details
+
+def _partition_match_details(match_ids):
+    """
+    Look up matches missing from the main file in the partitions holding them.
+    """
+    details = {}
+    for partition, ids in _match_partitions(match_ids):
+        with partition_read([partition]) as conn:
+            details.update(_get_match_details(conn, ids, partition_schema(partition['month'])))
+    return details
+
+def get_match_details(match_id):
+    """Get detailed match information with teams and players."""
+    with read_transaction() as conn:
+        details = _get_match_details(conn, [match_id]).get(int(match_id))
+    if details is None and get_partitions():
+        details = _partition_match_details([match_id]).get(int(match_id))
+    return details
+
+def get_match_details_batch(match_ids):
     """
-    players = exec_query(players_query, (match_id,), fetch=True)
+    Get details for up to MAX_BATCH_MATCHES matches in one query.
+    Returns {match_id: details}; unknown IDs are left out.
+    """
+    if len(match_ids) > MAX_BATCH_MATCHES:
+        raise ValueError(f"Too many matches: {len(match_ids)} (max {MAX_BATCH_MATCHES})")
+    with read_transaction() as conn:
+        details = _get_match_details(conn, match_ids)
+    missing = [mid for mid in match_ids if int(mid) not in details]
+    if missing and get_partitions():
+        details.update(_partition_match_details(missing))
+    return details
+
+# ============= MATCH INGESTION =============
+
+MAX_INGEST_BATCH = 5000
+# Tables written (directly or by rollup maintenance) when matches change
+MATCH_TABLES = (
+    'match_game', 'team', 'match_player', 'match_player_stats',
+    'player_stats_rollup', 'player_character_rollup',
+    'character_gamemode_rollup', 'gamemode_rollup', 'match_hourly_rollup',
+)
+STAT_COLUMNS = ('kills', 'deaths', 'assists', 'damage_dealt', 'healing_done', 'abilities_used', 'mmr_delta')
+
+# Match table -> catalog column holding the highest ID moved to a partition
+PARTITIONED_MAX_IDS = {
+    'match_game': 'max_match_id',
+    'team': 'max_team_id',
+    'match_player': 'max_match_player_id',
+    'match_player_stats': 'max_match_player_id',
+}
+
+def next_id(conn, table, key):
+    """
+    Next free ID for explicit-ID inserts: one past the table's maximum,
+    and past any IDs of the table already moved to match partitions.
+    """
+    partitioned = PARTITIONED_MAX_IDS.get(table)
+    if partitioned is None:
+        return conn.execute(f"SELECT COALESCE(MAX({key}), 0) + 1 FROM {table};").fetchone()[0]
+    return conn.execute(f"""
+    SELECT MAX(COALESCE((SELECT MAX({key}) FROM {table}), 0),
+               COALESCE((SELECT MAX({partitioned}) FROM match_partition), 0)) + 1;
+    """).fetchone()[0]
+
+def _apply_rollup_deltas(conn, match_rows, player_rows, stat_rows):
+    """
+    Aggregate a batch's contribution to the rollup tables in Python and
+    apply it with one upsert per rollup row (instead of per-row triggers).
+    Row layouts are the ones built by ingest_matches.
+    """
+    gamemode_of = {m[0]: m[1] for m in match_rows}
+    stats_of = {s[0]: s[1:6] for s in stat_rows}  # kills, deaths, assists, damage, healing
+    gamemodes = {}
+    players = {}
+    player_chars = {}
+    char_modes = {}
+    for mp_id, match_id, _team_id, player_id, character_id, result in player_rows:
+        win = result == 'win'
+        kills, deaths, assists, damage, healing = stats_of[mp_id]
+        
+        p = players.get(player_id)
+        if p is None:
+            p = players[player_id] = [0] * 9
+        p[0] += 1
+        p[1] += win
+        p[2] += not win
+        p[3] += 1
+        p[4] += kills
+        p[5] += deaths
+        p[6] += assists
+        p[7] += damage
+        p[8] += healing
+        
+        pc = player_chars.get((player_id, character_id))
+        if pc is None:
+            pc = player_chars[(player_id, character_id)] = [0, 0]
+        pc[0] += 1
+        pc[1] += win
+        
+        key = (character_id, gamemode_of[match_id])
+        cm = char_modes.get(key)
+        if cm is None:
+            cm = char_modes[key] = [0] * 8
+        cm[0] += 1
+        cm[1] += win
+        cm[2] += not win
+        cm[3] += 1
+        cm[4] += kills
+        cm[5] += deaths
+        cm[6] += assists
+        cm[7] += damage
+    for gamemode in gamemode_of.values():
+        gamemodes[gamemode] = gamemodes.get(gamemode, 0) + 1
     
-    return {
-        'match': matches[0],
-        'players': players
-    }
+    conn.executemany("""
+    INSERT INTO gamemode_rollup (gamemode, matches) VALUES (?, ?)
+    ON CONFLICT(gamemode) DO UPDATE SET matches = matches + excluded.matches;
+    """, gamemodes.items())
+    conn.executemany("""
+    INSERT INTO player_stats_rollup (
+        player_id, total_matches, wins, losses, stat_rows,
+        sum_kills, sum_deaths, sum_assists, sum_damage, sum_healing)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(player_id) DO UPDATE SET
+        total_matches = total_matches + excluded.total_matches,
+        wins = wins + excluded.wins,
+        losses = losses + excluded.losses,
+        stat_rows = stat_rows + excluded.stat_rows,
+        sum_kills = sum_kills + excluded.sum_kills,
+        sum_deaths = sum_deaths + excluded.sum_deaths,
+        sum_assists = sum_assists + excluded.sum_assists,
+        sum_damage = sum_damage + excluded.sum_damage,
+        sum_healing = sum_healing + excluded.sum_healing;
+    """, ((pid, *v) for pid, v in players.items()))
+    conn.executemany("""
+    INSERT INTO player_character_rollup (player_id, character_id, times_played, wins)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT(player_id, character_id) DO UPDATE SET
+        times_played = times_played + excluded.times_played,
+        wins = wins + excluded.wins;
+    """, ((*k, *v) for k, v in player_chars.items()))
+    conn.executemany("""
+    INSERT INTO character_gamemode_rollup (
+        character_id, gamemode, picks, wins, losses, stat_rows,
+        sum_kills, sum_deaths, sum_assists, sum_damage)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(character_id, gamemode) DO UPDATE SET
+        picks = picks + excluded.picks,
+        wins = wins + excluded.wins,
+        losses = losses + excluded.losses,
+        stat_rows = stat_rows + excluded.stat_rows,
+        sum_kills = sum_kills + excluded.sum_kills,
+        sum_deaths = sum_deaths + excluded.sum_deaths,
+        sum_assists = sum_assists + excluded.sum_assists,
+        sum_damage = sum_damage + excluded.sum_damage;
+    """, ((*k, *v) for k, v in char_modes.items()))
+    # Hourly buckets come from the epochs SQLite derives from the inserted
+    # timestamps, aggregated in place over the batch's ID range
+    conn.execute("""
+    INSERT INTO match_hourly_rollup (
+        hour_start, gamemode, matches, ended_matches, sum_duration, player_rows, wins)
+    SELECT
+        mg.started_epoch - mg.started_epoch % 3600,
+        mg.gamemode,
+        COUNT(*),
+        COUNT(mg.ended_epoch),
+        COALESCE(SUM(mg.ended_epoch - mg.started_epoch), 0),
+        COALESCE(SUM(p.player_rows), 0),
+        COALESCE(SUM(p.wins), 0)
+    FROM match_game mg
+    LEFT JOIN (
+        SELECT match_id, COUNT(*) AS player_rows, SUM(result = 'win') AS wins
+        FROM match_player
+        WHERE match_id BETWEEN ?1 AND ?2
+        GROUP BY match_id
+    ) AS p ON p.match_id = mg.match_id
+    WHERE mg.match_id BETWEEN ?1 AND ?2 AND mg.started_epoch IS NOT NULL
+    GROUP BY 1, 2
+    ON CONFLICT(hour_start, gamemode) DO UPDATE SET
+        matches = matches + excluded.matches,
+        ended_matches = ended_matches + excluded.ended_matches,
+        sum_duration = sum_duration + excluded.sum_duration,
+        player_rows = player_rows + excluded.player_rows,
+        wins = wins + excluded.wins;
+    """, (min(gamemode_of, default=0), max(gamemode_of, default=-1)))
+
+# Batches with at least this many player rows drop the bypassed rollup
+# insert triggers for the duration of the write job (see _write_matches)
+INGEST_DROP_TRIGGERS_ROWS = 1000
+_BYPASSED_INSERT_TRIGGER = re.compile(
+    r"\bINSERT\s+ON\s+\w+\s+WHEN\s+\(SELECT bypass FROM rollup_control\) = 0", re.IGNORECASE)
+
+def _drop_bypassed_triggers(conn):
+    """
+    Drop the match tables' insert triggers that rollup_control.bypass turns
+    off, and return their CREATE statements. Run inside a write job, so a
+    failing job's savepoint rollback restores them.
+    """
+    triggers = conn.execute(f"""
+    SELECT name, sql FROM sqlite_master
+    WHERE type = 'trigger' AND tbl_name IN ({', '.join('?' * 4)});
+    """, ('match_game', 'team', 'match_player', 'match_player_stats')).fetchall()
+    dropped = [(name, sql) for name, sql in triggers if _BYPASSED_INSERT_TRIGGER.search(sql)]
+    for name, _sql in dropped:
+        conn.execute(f"DROP TRIGGER {name};")
+    return [sql for _name, sql in dropped]
+
+def _write_matches(conn, matches):
+    """
+    Write job for ingest_matches: allocate IDs and insert every row.
+    Rollup triggers are bypassed and the batch's deltas applied in bulk.
+    SQLite still runs a trigger program per row when its WHEN clause is
+    false, over half the insert time, so large batches drop those triggers
+    and recreate them before the job ends. Other connections re-prepare
+    their statements once after the schema change.
+    """
+    match_id = next_id(conn, 'match_game', 'match_id')
+    team_id = next_id(conn, 'team', 'team_id')
+    mp_id = next_id(conn, 'match_player', 'match_player_id')
+    
+    match_rows, team_rows, player_rows, stat_rows = [], [], [], []
+    match_ids = []
+    for i, match in enumerate(matches):
+        gamemode = match.get('gamemode')
+        teams = match.get('teams')
+        if not gamemode or not teams:
+            raise ValueError(f"Match {i}: gamemode and teams are required")
+        started_at = match.get('started_at')
+        match_rows.append((match_id, gamemode, started_at, match.get('ended_at')))
+        match_ids.append(match_id)
+        
+        for team in teams:
+            label = team.get('team_label')
+            if not label:
+                raise ValueError(f"Match {i}: team_label is required")
+            team_rows.append((team_id, match_id, label))
+            
+            for player in team.get('players', []):
+                if 'player_id' not in player or 'character_id' not in player:
+                    raise ValueError(f"Match {i}: player_id and character_id are required")
+                result = player.get('result', team.get('result'))
+                if result not in ('win', 'loss'):
+                    raise ValueError(f"Match {i}: result must be 'win' or 'loss'")
+                player_rows.append((mp_id, match_id, team_id, player['player_id'], player['character_id'], result))
+                stats = player.get('stats') or {}
+                stat_rows.append((
+                    mp_id,
+                    stats.get('kills', 0),
+                    stats.get('deaths', 0),
+                    stats.get('assists', 0),
+                    stats.get('damage_dealt', 0),
+                    stats.get('healing_done', 0),
+                    stats.get('abilities_used', 0),
+                    stats.get('mmr_delta', 0),
+                ))
+                mp_id += 1
+            team_id += 1
+        match_id += 1
+    
+    conn.execute("UPDATE rollup_control SET bypass = 1;")
+    triggers = _drop_bypassed_triggers(conn) if len(player_rows) >= INGEST_DROP_TRIGGERS_ROWS else []
+    conn.executemany("""
+    INSERT INTO match_game (match_id, gamemode, started_at, ended_at)
+    VALUES (?, ?, COALESCE(?, CURRENT_TIMESTAMP), ?);
+    """, match_rows)
+    conn.executemany("INSERT INTO team (team_id, match_id, team_label) VALUES (?, ?, ?);", team_rows)
+    conn.executemany("""
+    INSERT INTO match_player (match_player_id, match_id, team_id, player_id, character_id, result)
+    VALUES (?, ?, ?, ?, ?, ?);
+    """, player_rows)
+    conn.executemany(f"""
+    INSERT INTO match_player_stats (match_player_id, {', '.join(STAT_COLUMNS)})
+    VALUES ({', '.join('?' * (len(STAT_COLUMNS) + 1))});
+    """, stat_rows)
+    _apply_rollup_deltas(conn, match_rows, player_rows, stat_rows)
+    for sql in triggers:
+        conn.execute(sql)
+    conn.execute("UPDATE rollup_control SET bypass = 0;")
+    return match_ids
+
+def ingest_matches(matches):
+    """
+    Write a batch of finished matches in a single transaction.
+    Each match is a dict:
+        {'gamemode': 'Ranked', 'started_at': '...', 'ended_at': '...',
+         'teams': [{'team_label': 'Blue', 'result': 'win',
+                    'players': [{'player_id': 1, 'character_id': 2,
+                                 'result': 'win', 'stats': {'kills': 3, ...}}]}]}
+    A player's result defaults to their team's result; missing stats default to 0.
+    IDs for match_game, team and match_player are allocated up front from
+    the current maxima (on the writer thread), so every table is written
+    with one executemany and no per-row round trips. The rollup insert
+    triggers are bypassed and the batch's rollup deltas applied in bulk.
+    Returns the list of new match IDs. Raises ValueError on malformed input.
+    """
+    if len(matches) > MAX_INGEST_BATCH:
+        raise ValueError(f"Batch too large: {len(matches)} matches (max {MAX_INGEST_BATCH})")
+    
+    match_ids = submit_write(_write_matches, matches)
+    bump_generation(*MATCH_TABLES)
+    return match_ids
 
 # ============= ITEM & ENTITLEMENT QUERIES =============
 
+@cached('item')
 def get_all_items():
     """Get all items."""
-    return exec_query("SELECT * FROM item ORDER BY item_id;", fetch=True)
+    return exec_query("SELECT * FROM item ORDER BY item_id;", fetch=True, name='get_all_items')
 
-def get_all_entitlements():
-    """Get all entitlements with player and item details."""
+def get_all_entitlements(cursor=None, limit=None):
+    """Get one page of entitlements with player and item details, newest first."""
     query = """
     SELECT 
         e.entitlement_id,
@@ -235,69 +1612,321 @@ def get_all_entitlements():
     FROM entitlement e
     JOIN player p ON e.player_id = p.player_id
     JOIN item i ON e.item_id = i.item_id
-    ORDER BY e.entitlement_id DESC;
+    WHERE e.entitlement_id < ?
+    ORDER BY e.entitlement_id DESC
+    LIMIT ?;
     """
-    return exec_query(query, fetch=True)
+    entitlements, next_cursor = fetch_page(query, 'entitlement_id', cursor, limit, descending=True,
+                                           name='get_all_entitlements')
+    return {'entitlements': entitlements, 'next_cursor': next_cursor}
 
-def grant_entitlement(player_id, item_id, quantity=1):
-    """Grant an item to a player (create entitlement and transaction)."""
-    # Insert entitlement
-    ent_query = """
+def _write_grant(conn, player_id, item_id, quantity):
+    conn.execute("""
     INSERT INTO entitlement (player_id, item_id, quantity, status)
     VALUES (?, ?, ?, 'active');
-    """
-    exec_query(ent_query, (player_id, item_id, quantity))
-    
-    # Log transaction
-    txn_query = """
+    """, (player_id, item_id, quantity))
+    conn.execute("""
     INSERT INTO txn (player_id, item_id, currency, amount, quantity, source)
     VALUES (?, ?, 'GC', 0, ?, 'admin_grant');
+    """, (player_id, item_id, quantity))
+
+def grant_entitlement(player_id, item_id, quantity=1):
+    """Grant an item to a player (create entitlement and transaction atomically)."""
+    quantity = int(quantity)
+    if quantity < 0:
+        raise ValueError("quantity can't be negative")
+    submit_write(_write_grant, player_id, item_id, quantity)
+    bump_generation('entitlement', 'txn')
+    _ownership_granted([player_id], item_id, quantity)
+
+BULK_GRANT_CHUNK = 5000
+
+def _write_bulk_grant(conn, player_ids_json, item_id, quantity, source):
+    """
+    Write job for one chunk of a bulk grant: upsert the entitlements and log
+    one txn row per player. Unknown player IDs are skipped.
+    Returns the number of entitlements written.
+    """
+    granted = conn.execute("""
+    INSERT INTO entitlement (player_id, item_id, quantity, status)
+    SELECT p.player_id, ?, ?, 'active'
+    FROM player p
+    WHERE p.player_id IN (SELECT value FROM json_each(?))
+    ON CONFLICT(player_id, item_id) DO UPDATE SET
+        quantity = quantity + excluded.quantity,
+        status = 'active';
+    """, (item_id, quantity, player_ids_json)).rowcount
+    conn.execute("""
+    INSERT INTO txn (player_id, item_id, currency, amount, quantity, source)
+    SELECT p.player_id, ?, 'GC', 0, ?, ?
+    FROM player p
+    WHERE p.player_id IN (SELECT value FROM json_each(?));
+    """, (item_id, quantity, source, player_ids_json))
+    return granted
+
+def grant_entitlement_bulk(item_id, quantity=1, player_ids=None, min_mmr=None, max_mmr=None,
+                           source='event_reward', cursor=None, chunk_size=BULK_GRANT_CHUNK):
+    """
+    Grant an item to many players: either an explicit player_ids list or
+    everyone with min_mmr <= rank_mmr <= max_mmr.
+    Players are processed in player_id order, chunk_size per transaction.
+    Existing entitlements are topped up (upsert on uq_nonconsumable) and
+    every grant gets a matching txn row.
+    Arguments are validated up front (ValueError); the returned generator
+    does the work and yields a progress dict after each committed chunk:
+        {'processed', 'granted', 'total', 'next_cursor'}
+    Pass next_cursor back as cursor to resume an interrupted grant.
+    """
+    quantity = int(quantity)
+    if quantity < 1:
+        raise ValueError("quantity must be at least 1")
+    if player_ids is None and min_mmr is None and max_mmr is None:
+        raise ValueError("player_ids or a rank range (min_mmr/max_mmr) is required")
+    if not exec_query("SELECT 1 FROM item WHERE item_id = ?;", (item_id,), fetch=True,
+                      name='grant_entitlement_bulk.item'):
+        raise ValueError(f"Item {item_id} not found")
+    after = decode_cursor(cursor) if cursor is not None else _MIN_KEY
+    
+    if player_ids is not None:
+        ids = sorted({int(pid) for pid in player_ids if int(pid) > after})
+        chunks = (ids[i:i + chunk_size] for i in range(0, len(ids), chunk_size))
+        total = len(ids)
+    else:
+        rank_range = (_MIN_KEY if min_mmr is None else int(min_mmr),
+                      _MAX_KEY if max_mmr is None else int(max_mmr))
+        total = exec_query("""
+        SELECT COUNT(*) AS n FROM player
+        WHERE player_id > ? AND rank_mmr BETWEEN ? AND ?;
+        """, (after, *rank_range), fetch=True, name='grant_entitlement_bulk.count')[0]['n']
+        chunks = _rank_range_chunks(rank_range, after, chunk_size)
+    
+    def run():
+        processed = granted = 0
+        for chunk in chunks:
+            granted += submit_write(_write_bulk_grant, json.dumps(chunk), item_id, quantity, source)
+            bump_generation('entitlement', 'txn')
+            _ownership_granted(chunk, item_id, quantity)
+            processed += len(chunk)
+            yield {
+                'processed': processed,
+                'granted': granted,
+                'total': total,
+                'next_cursor': encode_cursor(chunk[-1]),
+            }
+    return run()
+
+def _rank_range_chunks(rank_range, after, chunk_size):
+    """
+    Yield player_id lists for players in a rank range, keyset-paged by player_id.
+    """
+    query = """
+    SELECT player_id FROM player
+    WHERE player_id > ? AND rank_mmr BETWEEN ? AND ?
+    ORDER BY player_id
+    LIMIT ?;
+    """
+    while True:
+        ids = [row['player_id'] for row in exec_query(query, (after, *rank_range, chunk_size), fetch=True,
+                                                      name='_rank_range_chunks')]
+        if not ids:
+            return
+        yield ids
+        after = ids[-1]
+
+# ============= ITEM OWNERSHIP =============
+
+# "Which of these items does the player own?" is answered from an in-memory
+# OwnershipIndex per database file. Players are loaded on first lookup and
+# evicted LRU beyond OWNERSHIP_MAX_PLAYERS. Grants and player deletes in
+# this process update it in place; DDL, seeding and bulk loads (the
+# schema-wide epoch) start a fresh index, and OWNERSHIP_TTL_SECONDS bounds
+# staleness for writes from other processes. An item is owned while its
+# entitlement is active with a positive quantity.
+OWNERSHIP_MAX_PLAYERS = 100_000
+OWNERSHIP_TTL_SECONDS = CACHE_TTL_SECONDS
+MAX_OWNERSHIP_CHECK = 1000
+
+_ownership_indexes = {}  # DB_FILE -> (epoch, OwnershipIndex)
+_ownership_lock = threading.Lock()
+
+def _ownership_index():
+    """
+    Return the current OwnershipIndex for DB_FILE, starting a new one after DDL.
+    """
+    db_file = DB_FILE
+    epoch = _generations.get((db_file, None), 0)
+    entry = _ownership_indexes.get(db_file)
+    if entry is None or entry[0] != epoch:
+        with _ownership_lock:
+            entry = _ownership_indexes.get(db_file)
+            if entry is None or entry[0] != epoch:
+                entry = _ownership_indexes[db_file] = (epoch, OwnershipIndex(OWNERSHIP_MAX_PLAYERS))
+    return entry[1]
+
+def _owned_items(player_id):
+    """
+    Return (index, bitset) for a player, loading them on a miss.
+    The bitset is None if the player doesn't exist.
+    """
+    index = _ownership_index()
+    mask = index.lookup(player_id, OWNERSHIP_TTL_SECONDS)
+    if mask is None:
+        token = index.write_token()
+        rows = exec_query("""
+        SELECT p.player_id, e.item_id
+        FROM player p
+        LEFT JOIN entitlement e
+          ON e.player_id = p.player_id AND e.status = 'active' AND e.quantity > 0
+        WHERE p.player_id = ?;
+        """, (player_id,), fetch=True, name='_owned_items')
+        if not rows:
+            return index, None
+        mask = index.store(player_id, [r['item_id'] for r in rows if r['item_id'] is not None], token)
+    return index, mask
+
+def _ownership_granted(player_ids, item_id, quantity):
+    """
+    Mark an item owned for cached players after a grant wrote it as active
+    with `quantity`. Same rule as the load in _owned_items: a zero-quantity
+    entitlement isn't owned.
     """
-    exec_query(txn_query, (player_id, item_id, quantity))
+    if quantity <= 0:
+        return
+    entry = _ownership_indexes.get(DB_FILE)
+    if entry is not None:
+        entry[1].grant(player_ids, item_id)
+
+def _ownership_forget(player_id):
+    entry = _ownership_indexes.get(DB_FILE)
+    if entry is not None:
+        entry[1].forget(player_id)
+
+def get_player_inventory(player_id):
+    """
+    Get the items a player owns (with item details), or None if the player
+    doesn't exist.
+    """
+    index, mask = _owned_items(player_id)
+    if mask is None:
+        return None
+    item_ids = index.items(mask)
+    items_by_id = {item['item_id']: item for item in get_all_items()}
+    return {
+        'player_id': player_id,
+        'item_ids': item_ids,
+        'items': [items_by_id[i] for i in item_ids if i in items_by_id],
+    }
+
+def check_item_ownership(player_id, item_ids):
+    """
+    Split item_ids into the ones a player owns and the ones they don't.
+    Returns None if the player doesn't exist; raises ValueError on bad input.
+    """
+    if not isinstance(item_ids, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in item_ids):
+        raise ValueError("item_ids must be a list of integers")
+    if len(item_ids) > MAX_OWNERSHIP_CHECK:
+        raise ValueError(f"Too many item_ids: {len(item_ids)} (max {MAX_OWNERSHIP_CHECK})")
+    index, mask = _owned_items(player_id)
+    if mask is None:
+        return None
+    owned = index.owned(mask, item_ids)
+    owned_set = set(owned)
+    return {
+        'player_id': player_id,
+        'owned': owned,
+        'not_owned': [i for i in item_ids if i not in owned_set],
+    }
+
+def ownership_stats():
+    """
+    Return cached player count, hit rate and evictions of the ownership index.
+    """
+    return _ownership_index().stats()
 
 # ============= PLAYER PROFILE QUERIES =============
 
+SEARCH_MIN_TRIGRAM = 3
+
+def _fts_phrase(term):
+    """Quote a search term as a single FTS5 phrase."""
+    return '"' + term.replace('"', '""') + '"'
+
+def _like_escape(term):
+    """Escape LIKE wildcards in a literal term, for use with ESCAPE '\\'."""
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def rebuild_search_index(only_if_empty=False):
+    """
+    Reindex every player in player_fts. With only_if_empty, skip it unless
+    the index holds no rows while player does (a new index on an existing
+    database), so create_all() on a populated database stays cheap.
+    """
+    if only_if_empty and not exec_query("""
+    SELECT NOT EXISTS (SELECT 1 FROM player_fts_docsize)
+       AND EXISTS (SELECT 1 FROM player) AS stale;
+    """, fetch=True, name='rebuild_search_index.check')[0]['stale']:
+        return
+    exec_query("INSERT INTO player_fts (player_fts) VALUES ('rebuild');", name='rebuild_search_index')
+
 def search_players(search_term):
-    """Search for players by display name or email."""
+    """
+    Search for players by display name or email (substring, case-insensitive).
+    Uses the player_fts trigram index; terms shorter than a trigram fall
+    back to LIKE over the players in rank order, which stops once 20 match.
+    """
+    if len(search_term) < SEARCH_MIN_TRIGRAM:
+        pattern = f"%{_like_escape(search_term)}%"
+        return exec_query(f"""
+        SELECT player_id, display_name, email, rank_mmr, created_at
+        FROM player {PLAN_CHECK_EXEMPT}
+        WHERE display_name LIKE ? ESCAPE '\\' OR email LIKE ? ESCAPE '\\'
+        ORDER BY rank_mmr DESC
+        LIMIT 20;
+        """, (pattern, pattern), fetch=True, name='search_players.like')
+    
     query = """
-    SELECT player_id, display_name, email, rank_mmr, created_at
-    FROM player
-    WHERE display_name LIKE ? OR email LIKE ?
-    ORDER BY rank_mmr DESC
+    SELECT p.player_id, p.display_name, p.email, p.rank_mmr, p.created_at
+    FROM player_fts f
+    JOIN player p ON p.player_id = f.rowid
+    WHERE player_fts MATCH ?
+    ORDER BY p.rank_mmr DESC
     LIMIT 20;
     """
-    term = f"%{search_term}%"
-    return exec_query(query, (term, term), fetch=True)
+    return exec_query(query, (_fts_phrase(search_term),), fetch=True, name='search_players.fts')
 
-def get_player_profile(player_id):
-    """Get detailed player profile with statistics."""
-    # Get basic player info
-    player_query = "SELECT * FROM player WHERE player_id = ?;"
-    player = exec_query(player_query, (player_id,), fetch=True)
-    
-    if not player:
-        return None
-    
-    # Get match statistics
-    stats_query = """
-    SELECT 
-        COUNT(DISTINCT mp.match_id) as total_matches,
-        SUM(CASE WHEN mp.result = 'win' THEN 1 ELSE 0 END) as wins,
-        SUM(CASE WHEN mp.result = 'loss' THEN 1 ELSE 0 END) as losses,
-        CAST(AVG(mps.kills) AS INTEGER) as avg_kills,
-        CAST(AVG(mps.deaths) AS INTEGER) as avg_deaths,
-        CAST(AVG(mps.assists) AS INTEGER) as avg_assists,
-        CAST(AVG(mps.damage_dealt) AS INTEGER) as avg_damage,
-        CAST(AVG(mps.healing_done) AS INTEGER) as avg_healing
-    FROM match_player mp
-    LEFT JOIN match_player_stats mps ON mp.match_player_id = mps.match_player_id
-    WHERE mp.player_id = ?;
+def autocomplete_players(prefix, limit=10, details=False):
     """
-    stats = exec_query(stats_query, (player_id,), fetch=True)
-    
-    # Get recent matches
-    matches_query = """
+    Players whose display name starts with prefix (case-insensitive).
+    LIKE 'prefix%' folds case the way NOCASE does (ASCII only), so SQLite
+    answers it as a range scan on idx_player_display_name_nocase.
+    """
+    if not prefix:
+        return []
+    columns = "player_id, display_name, email, rank_mmr, created_at" if details else "player_id, display_name"
+    query = f"""
+    SELECT {columns}
+    FROM player
+    WHERE display_name LIKE ? ESCAPE '\\'
+    ORDER BY display_name COLLATE NOCASE
+    LIMIT ?;
+    """
+    return exec_query(query, (_like_escape(prefix) + '%', limit), fetch=True, name='autocomplete_players')
+
+EMPTY_PLAYER_STATS = {
+    'total_matches': 0, 'wins': 0, 'losses': 0,
+    'avg_kills': None, 'avg_deaths': None, 'avg_assists': None,
+    'avg_damage': None, 'avg_healing': None,
+}
+
+MAX_BATCH_PROFILES = 500
+RECENT_MATCHES = 10
+
+# A player's most recent matches from one schema's match tables (main or a
+# partition); names come from the main file's game_character.
+RECENT_MATCHES_QUERY = """
+SELECT * FROM (
     SELECT 
+        mp.player_id,
         mg.match_id,
         mg.gamemode,
         mg.started_at,
@@ -307,43 +1936,352 @@ def get_player_profile(player_id):
         mps.deaths,
         mps.assists,
         mps.damage_dealt,
-        mps.mmr_delta
-    FROM match_player mp
-    JOIN match_game mg ON mp.match_id = mg.match_id
-    JOIN game_character gc ON mp.character_id = gc.character_id
-    LEFT JOIN match_player_stats mps ON mp.match_player_id = mps.match_player_id
-    WHERE mp.player_id = ?
-    ORDER BY mg.started_at DESC
-    LIMIT 10;
+        mps.mmr_delta,
+        ROW_NUMBER() OVER (PARTITION BY mp.player_id ORDER BY mg.started_at DESC) as rn
+    FROM {schema}.match_player mp
+    JOIN {schema}.match_game mg ON mp.match_id = mg.match_id
+    JOIN main.game_character gc ON mp.character_id = gc.character_id
+    LEFT JOIN {schema}.match_player_stats mps ON mp.match_player_id = mps.match_player_id
+    WHERE mp.player_id IN (SELECT value FROM json_each(?))
+)
+WHERE rn <= ?
+ORDER BY player_id, rn;
+"""
+
+def _get_profiles(conn, player_ids):
+    """
+    Build profiles for many players with one set-based query per section
+    (WHERE player_id IN json_each(?)), grouped in Python.
+    Returns {player_id: profile} for the players that exist.
     """
-    matches = exec_query(matches_query, (player_id,), fetch=True)
+    ids = json.dumps([int(pid) for pid in player_ids])
     
-    # Get favorite characters
-    characters_query = """
+    # Get basic player info
+    players_query = """
+    SELECT * FROM player
+    WHERE player_id IN (SELECT value FROM json_each(?));
+    """
+    profiles = {
+        p['player_id']: {'player': p, 'stats': dict(EMPTY_PLAYER_STATS), 'matches': [], 'characters': []}
+        for p in fetch_all(conn, players_query, (ids,), name='_get_profiles.players')
+    }
+    if not profiles:
+        return profiles
+    
+    # Get match statistics (maintained incrementally in player_stats_rollup)
+    stats_query = """
     SELECT 
-        gc.name as character_name,
-        COUNT(*) as times_played,
-        SUM(CASE WHEN mp.result = 'win' THEN 1 ELSE 0 END) as wins
-    FROM match_player mp
-    JOIN game_character gc ON mp.character_id = gc.character_id
-    WHERE mp.player_id = ?
-    GROUP BY gc.character_id
-    ORDER BY times_played DESC
-    LIMIT 5;
+        player_id,
+        total_matches,
+        wins,
+        losses,
+        CASE WHEN stat_rows > 0 THEN sum_kills / stat_rows END as avg_kills,
+        CASE WHEN stat_rows > 0 THEN sum_deaths / stat_rows END as avg_deaths,
+        CASE WHEN stat_rows > 0 THEN sum_assists / stat_rows END as avg_assists,
+        CASE WHEN stat_rows > 0 THEN sum_damage / stat_rows END as avg_damage,
+        CASE WHEN stat_rows > 0 THEN sum_healing / stat_rows END as avg_healing
+    FROM player_stats_rollup
+    WHERE player_id IN (SELECT value FROM json_each(?));
     """
-    characters = exec_query(characters_query, (player_id,), fetch=True)
+    for row in fetch_all(conn, stats_query, (ids,), name='_get_profiles.stats'):
+        profiles[row.pop('player_id')]['stats'] = row
+    
+    # Get the most recent matches per player
+    for row in fetch_all(conn, RECENT_MATCHES_QUERY.format(schema='main'), (ids, RECENT_MATCHES),
+                         name='_get_profiles.recent_matches'):
+        del row['rn']
+        profiles[row.pop('player_id')]['matches'].append(row)
     
+    # Get the 5 favorite characters per player (player_character_rollup)
+    characters_query = """
+    SELECT * FROM (
+        SELECT 
+            pcr.player_id,
+            gc.name as character_name,
+            pcr.times_played,
+            pcr.wins,
+            ROW_NUMBER() OVER (PARTITION BY pcr.player_id ORDER BY pcr.times_played DESC) as rn
+        FROM player_character_rollup pcr
+        JOIN game_character gc ON pcr.character_id = gc.character_id
+        WHERE pcr.player_id IN (SELECT value FROM json_each(?)) AND pcr.times_played > 0
+    )
+    WHERE rn <= 5
+    ORDER BY player_id, rn;
+    """
+    for row in fetch_all(conn, characters_query, (ids,), name='_get_profiles.characters'):
+        del row['rn']
+        profiles[row.pop('player_id')]['characters'].append(row)
+    
+    return profiles
+
+def _add_partition_history(profiles):
+    """
+    Complete profiles' recent matches from match partitions. Each player's
+    partitions (match_partition_player) are read newest month first, all
+    players due for the same month in one query, until the player's
+    RECENT_MATCHES-th newest match is newer than the next month to read.
+    """
+    ids = json.dumps(list(profiles))
+    months_of = {}
+    for row in exec_query("""
+    SELECT player_id, month FROM match_partition_player
+    WHERE player_id IN (SELECT value FROM json_each(?))
+    ORDER BY player_id, month DESC;
+    """, (ids,), fetch=True, name='_add_partition_history.months'):
+        months_of.setdefault(row['player_id'], []).append(row['month'])
+    partitions = {p['month']: p for p in get_partitions()}
+    
+    def done(player_id):
+        months = months_of[player_id]
+        matches = profiles[player_id]['matches']
+        return (not months or len(matches) >= RECENT_MATCHES
+                and matches[RECENT_MATCHES - 1]['started_at'] >= _format_epoch(month_bounds(months[0])[1]))
+    
+    pending = {pid for pid in months_of if not done(pid)}
+    while pending:
+        month = max(months_of[pid][0] for pid in pending)
+        players = [pid for pid in pending if months_of[pid][0] == month]
+        partition = partitions.get(month)
+        if partition is not None:
+            with partition_read([partition]) as conn:
+                rows = fetch_all(conn, RECENT_MATCHES_QUERY.format(schema=partition_schema(month)),
+                                 (json.dumps(players), RECENT_MATCHES),
+                                 name='_add_partition_history.recent_matches')
+            for row in rows:
+                del row['rn']
+                profiles[row.pop('player_id')]['matches'].append(row)
+        for pid in players:
+            matches = {m['match_id']: m for m in reversed(profiles[pid]['matches'])}
+            profiles[pid]['matches'] = sorted(matches.values(), key=lambda m: m['started_at'],
+                                              reverse=True)[:RECENT_MATCHES]
+            months_of[pid].pop(0)
+            if done(pid):
+                pending.discard(pid)
+
+def get_player_profile(player_id):
+    """Get detailed player profile with statistics (one consistent snapshot)."""
+    with read_transaction() as conn:
+        profile = _get_profiles(conn, [player_id]).get(int(player_id))
+    if profile is not None and get_partitions():
+        _add_partition_history({profile['player']['player_id']: profile})
+    return profile
+
+def get_player_profiles(player_ids):
+    """
+    Get profiles for up to MAX_BATCH_PROFILES players from one read snapshot.
+    Returns {player_id: profile}; unknown IDs are left out.
+    """
+    if len(player_ids) > MAX_BATCH_PROFILES:
+        raise ValueError(f"Too many players: {len(player_ids)} (max {MAX_BATCH_PROFILES})")
+    with read_transaction() as conn:
+        profiles = _get_profiles(conn, player_ids)
+    if profiles and get_partitions():
+        _add_partition_history(profiles)
+    return profiles
+
+# ============= LEADERBOARD =============
+
+# Ranks come from an in-memory MmrIndex per database file, loaded on first
+# use. Player writes in this process update it in place; DDL, seeding and
+# bulk loads (the schema-wide epoch) force a reload, and
+# LEADERBOARD_TTL_SECONDS bounds staleness for writes from other processes.
+# Regions and per-gamemode MMR don't exist in the schema, so there is one
+# global ladder.
+LEADERBOARD_TTL_SECONDS = CACHE_TTL_SECONDS
+
+_mmr_indexes = {}  # DB_FILE -> (epoch, loaded_at, MmrIndex)
+_mmr_index_lock = threading.Lock()
+
+def _mmr_index():
+    """
+    Return the current MmrIndex for DB_FILE, (re)loading it if stale.
+    """
+    db_file = DB_FILE
+    epoch = _generations.get((db_file, None), 0)
+    entry = _mmr_indexes.get(db_file)
+    if entry and entry[0] == epoch and entry[1] + LEADERBOARD_TTL_SECONDS > time.monotonic():
+        return entry[2]
+    with _mmr_index_lock:
+        entry = _mmr_indexes.get(db_file)
+        if entry and entry[0] == epoch and entry[1] + LEADERBOARD_TTL_SECONDS > time.monotonic():
+            return entry[2]
+        loaded_at = time.monotonic()
+        with pooled_conn(readonly=True) as conn:
+            index = MmrIndex(conn.execute(
+                f"SELECT player_id, rank_mmr FROM player {PLAN_CHECK_EXEMPT};"))
+        _mmr_indexes[db_file] = (epoch, loaded_at, index)
+        return index
+
+def _update_mmr_index(player_id, rank_mmr):
+    """
+    Apply a committed MMR change (None = player deleted) to a loaded index.
+    """
+    entry = _mmr_indexes.get(DB_FILE)
+    if entry is None:
+        return
+    if rank_mmr is None:
+        entry[2].remove(player_id)
+    else:
+        entry[2].set(player_id, int(rank_mmr))
+
+def refresh_player_ranks(player_ids=None):
+    """
+    Re-read rank_mmr for the given players into the rank index (call after
+    changing MMR outside update_player). None reloads the whole index on
+    next use, e.g. after a bulk recalculation.
+    """
+    if DB_FILE not in _mmr_indexes:
+        return
+    if player_ids is None:
+        _mmr_indexes.pop(DB_FILE, None)
+        return
+    rows = exec_query("""
+    SELECT j.value AS player_id, p.rank_mmr
+    FROM json_each(?) j
+    LEFT JOIN player p ON p.player_id = j.value;
+    """, (json.dumps(list(player_ids)),), fetch=True, name='refresh_player_ranks')
+    for row in rows:
+        _update_mmr_index(row['player_id'], row['rank_mmr'])
+
+def get_leaderboard(cursor=None, limit=None):
+    """
+    Get one page of the MMR leaderboard, highest first (ties by newest player).
+    Each row carries its competition rank. Returns
+    {'players': [...], 'total_players': n, 'next_cursor': token or None}.
+    """
+    limit = page_size(limit)
+    mmr, player_id = (_MAX_KEY, _MAX_KEY) if cursor is None else decode_cursor(cursor, parts=2)
+    rows = exec_query("""
+    SELECT player_id, display_name, rank_mmr
+    FROM player
+    WHERE (rank_mmr, player_id) < (?, ?)
+    ORDER BY rank_mmr DESC, player_id DESC
+    LIMIT ?;
+    """, (mmr, player_id, limit + 1), fetch=True, name='get_leaderboard')
+    index = _mmr_index()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor((rows[-1]['rank_mmr'], rows[-1]['player_id']))
+    for row in rows:
+        row['rank'] = index.rank_of_mmr(row['rank_mmr'])
+    return {'players': rows, 'total_players': len(index), 'next_cursor': next_cursor}
+
+def get_player_rank(player_id):
+    """
+    Get a player's MMR rank and percentile (share of players below them),
+    or None if the player doesn't exist.
+    """
+    rank = _mmr_index().rank(player_id)
+    return {'player_id': player_id, **rank} if rank else None
+
+# ============= MATCH ANALYTICS =============
+
+TIMESERIES_BUCKETS = {'hour': 3600, 'day': 86400}
+TIMESERIES_DEFAULT_DAYS = 30
+TIMESERIES_MAX_DAYS = 366
+
+def parse_timestamp(value):
+    """
+    Parse epoch seconds or an ISO 8601 date/time (UTC unless it carries an
+    offset) into epoch seconds. Raises ValueError if invalid.
+    """
+    text = str(value).strip()
+    if text.lstrip('-').isdigit():
+        return int(text)
+    try:
+        parsed = datetime.fromisoformat(text.replace('Z', '+00:00'))
+    except ValueError:
+        raise ValueError(f"Invalid timestamp: {value!r}")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+def _format_epoch(epoch):
+    """Epoch seconds -> 'YYYY-MM-DD HH:MM:SS' (UTC, the started_at format)."""
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+def _timeseries_point(matches, ended_matches, sum_duration, player_rows, wins):
     return {
-        'player': player[0],
-        'stats': stats[0] if stats else {},
         'matches': matches,
-        'characters': characters
+        'avg_duration_seconds': round(sum_duration / ended_matches, 1) if ended_matches else None,
+        'win_rate': round(100 * wins / player_rows, 1) if player_rows else None,
+    }
+
+def get_match_timeseries(start=None, end=None, bucket='day', gamemode=None):
+    """
+    Matches per hour or day over [start, end), with average match length
+    and player win rate, overall and per gamemode. start/end are epoch
+    seconds or ISO timestamps; end defaults to now and start to
+    TIMESERIES_DEFAULT_DAYS before end. Both are widened to whole buckets
+    (UTC). Reads only match_hourly_rollup, never raw match rows.
+    Raises ValueError on a bad bucket, timestamp or range.
+    """
+    if bucket not in TIMESERIES_BUCKETS:
+        raise ValueError(f"Invalid bucket '{bucket}' (expected one of {', '.join(TIMESERIES_BUCKETS)})")
+    step = TIMESERIES_BUCKETS[bucket]
+    end = parse_timestamp(end) if end is not None else int(time.time())
+    start = parse_timestamp(start) if start is not None else end - TIMESERIES_DEFAULT_DAYS * 86400
+    start -= start % step
+    end += -end % step
+    if start >= end:
+        raise ValueError("start must be before end")
+    if end - start > TIMESERIES_MAX_DAYS * 86400:
+        raise ValueError(f"Range too large (max {TIMESERIES_MAX_DAYS} days)")
+    return _match_timeseries(start, end, step, gamemode)
+
+@cached('match_hourly_rollup')
+def _match_timeseries(start, end, step, gamemode):
+    rows = exec_query("""
+    SELECT 
+        hour_start - hour_start % ? AS bucket_start,
+        gamemode,
+        SUM(matches) AS matches,
+        SUM(ended_matches) AS ended_matches,
+        SUM(sum_duration) AS sum_duration,
+        SUM(player_rows) AS player_rows,
+        SUM(wins) AS wins
+    FROM match_hourly_rollup
+    WHERE hour_start >= ? AND hour_start < ?
+      AND (? IS NULL OR gamemode = ?)
+    GROUP BY bucket_start, gamemode;
+    """, (step, start, end, gamemode, gamemode), fetch=True, name='_match_timeseries')
+    
+    # Dense series: every bucket in range, zero-filled
+    fields = ('matches', 'ended_matches', 'sum_duration', 'player_rows', 'wins')
+    buckets = {t: ([0] * 5, {}) for t in range(start, end, step)}
+    totals = ([0] * 5, {})
+    for row in rows:
+        values = [row[f] for f in fields]
+        for total, by_mode in (buckets[row['bucket_start']], totals):
+            mode_total = by_mode.setdefault(row['gamemode'], [0] * 5)
+            for i, v in enumerate(values):
+                total[i] += v
+                mode_total[i] += v
+    
+    def point(total, by_mode):
+        return {
+            **_timeseries_point(*total),
+            'gamemodes': {mode: _timeseries_point(*v) for mode, v in sorted(by_mode.items())},
+        }
+    return {
+        'start': _format_epoch(start),
+        'end': _format_epoch(end),
+        'bucket_seconds': step,
+        'gamemode': gamemode,
+        'series': [{'bucket_start': _format_epoch(t), **point(*v)} for t, v in buckets.items()],
+        'totals': point(*totals),
     }
 
 # ============= GAME DATA QUERIES =============
 
-def get_all_characters():
-    """Get all characters with their roles and stats."""
+@cached('game_character', 'game_role', 'character_gamemode_rollup', 'gamemode_rollup')
+def get_all_characters(gamemode=None):
+    """
+    Get all characters with their roles, stats and play rates.
+    Win rate, pick rate and average K/D/A come from character_gamemode_rollup,
+    optionally restricted to one gamemode. Pick rate is picks per match (%).
+    """
     query = """
     SELECT 
         gc.character_id,
@@ -351,13 +2289,46 @@ def get_all_characters():
         gr.name as role_name,
         gc.base_health,
         gc.attack_power,
-        gc.attack_speed
+        gc.attack_speed,
+        COALESCE(SUM(cgr.picks), 0) as picks,
+        ROUND(100.0 * SUM(cgr.wins) / NULLIF(SUM(cgr.picks), 0), 1) as win_rate,
+        ROUND(100.0 * SUM(cgr.picks) / NULLIF(m.matches, 0), 1) as pick_rate,
+        SUM(cgr.sum_kills) / NULLIF(SUM(cgr.stat_rows), 0) as avg_kills,
+        SUM(cgr.sum_deaths) / NULLIF(SUM(cgr.stat_rows), 0) as avg_deaths,
+        SUM(cgr.sum_assists) / NULLIF(SUM(cgr.stat_rows), 0) as avg_assists
     FROM game_character gc
     JOIN game_role gr ON gc.role_id = gr.role_id
+    LEFT JOIN character_gamemode_rollup cgr
+        ON cgr.character_id = gc.character_id AND (?1 IS NULL OR cgr.gamemode = ?1)
+    CROSS JOIN (
+        SELECT SUM(matches) as matches FROM gamemode_rollup
+        WHERE ?1 IS NULL OR gamemode = ?1
+    ) m
+    GROUP BY gc.character_id
     ORDER BY gr.name, gc.name;
     """
-    return exec_query(query, fetch=True)
+    return exec_query(query, (gamemode,), fetch=True, name='get_all_characters')
 
+def _character_stats(rows, **extra):
+    """
+    Combine character_gamemode_rollup rows into times played, wins/losses
+    and integer K/D/A/damage averages.
+    """
+    stat_rows = sum(r['stat_rows'] for r in rows)
+    def avg(column):
+        return sum(r[column] for r in rows) // stat_rows if stat_rows else None
+    return {
+        **extra,
+        'times_played': sum(r['times_played'] for r in rows),
+        'wins': sum(r['wins'] for r in rows),
+        'losses': sum(r['losses'] for r in rows),
+        'avg_kills': avg('sum_kills'),
+        'avg_deaths': avg('sum_deaths'),
+        'avg_assists': avg('sum_assists'),
+        'avg_damage': avg('sum_damage'),
+    }
+
+@cached('game_character', 'game_role', 'ability', 'character_ability', 'character_gamemode_rollup')
 def get_character_details(character_id):
     """Get detailed character information with abilities."""
     # Get character info
@@ -374,7 +2345,7 @@ def get_character_details(character_id):
     JOIN game_role gr ON gc.role_id = gr.role_id
     WHERE gc.character_id = ?;
     """
-    character = exec_query(char_query, (character_id,), fetch=True)
+    character = exec_query(char_query, (character_id,), fetch=True, name='get_character_details.character')
     
     if not character:
         return None
@@ -398,27 +2369,299 @@ def get_character_details(character_id):
             WHEN 'tertiary' THEN 3 
         END;
     """
-    abilities = exec_query(abilities_query, (character_id,), fetch=True)
+    abilities = exec_query(abilities_query, (character_id,), fetch=True,
+                           name='get_character_details.abilities')
     
-    # Get play statistics
-    stats_query = """
+    # Get play statistics per gamemode (maintained in character_gamemode_rollup)
+    gamemodes_query = """
     SELECT 
-        COUNT(DISTINCT mp.match_id) as times_played,
-        SUM(CASE WHEN mp.result = 'win' THEN 1 ELSE 0 END) as wins,
-        SUM(CASE WHEN mp.result = 'loss' THEN 1 ELSE 0 END) as losses,
-        CAST(AVG(mps.kills) AS INTEGER) as avg_kills,
-        CAST(AVG(mps.deaths) AS INTEGER) as avg_deaths,
-        CAST(AVG(mps.assists) AS INTEGER) as avg_assists,
-        CAST(AVG(mps.damage_dealt) AS INTEGER) as avg_damage
-    FROM match_player mp
-    LEFT JOIN match_player_stats mps ON mp.match_player_id = mps.match_player_id
-    WHERE mp.character_id = ?;
+        gamemode,
+        picks as times_played,
+        wins,
+        losses,
+        stat_rows,
+        sum_kills,
+        sum_deaths,
+        sum_assists,
+        sum_damage
+    FROM character_gamemode_rollup
+    WHERE character_id = ? AND picks > 0
+    ORDER BY gamemode;
     """
-    stats = exec_query(stats_query, (character_id,), fetch=True)
+    gamemodes = exec_query(gamemodes_query, (character_id,), fetch=True,
+                           name='get_character_details.gamemodes')
     
     return {
         'character': character[0],
         'abilities': abilities,
-        'stats': stats[0] if stats else {}
+        'stats': _character_stats(gamemodes),
+        'gamemodes': [_character_stats([g], gamemode=g['gamemode']) for g in gamemodes]
     }
 
+
+# ============= STREAMING EXPORT =============
+
+EXPORT_CHUNK_SIZE = 1000
+
+# Joined views that can be exported alongside raw tables.
+EXPORT_VIEWS = {
+    'entitlements': """
+    SELECT 
+        e.entitlement_id,
+        e.player_id,
+        p.display_name,
+        e.item_id,
+        i.name as item_name,
+        e.quantity,
+        e.status,
+        e.acquired_at
+    FROM entitlement e
+    JOIN player p ON e.player_id = p.player_id
+    JOIN item i ON e.item_id = i.item_id
+    ORDER BY e.entitlement_id;
+    """,
+    'match_details': """
+    SELECT 
+        mp.match_player_id,
+        mp.match_id,
+        mg.gamemode,
+        mg.started_at,
+        mg.ended_at,
+        t.team_label,
+        mp.player_id,
+        p.display_name,
+        mp.character_id,
+        gc.name as character_name,
+        mp.result,
+        mps.kills,
+        mps.deaths,
+        mps.assists,
+        mps.damage_dealt,
+        mps.healing_done,
+        mps.abilities_used,
+        mps.mmr_delta
+    FROM match_player mp
+    JOIN match_game mg ON mp.match_id = mg.match_id
+    JOIN team t ON mp.team_id = t.team_id
+    JOIN player p ON mp.player_id = p.player_id
+    JOIN game_character gc ON mp.character_id = gc.character_id
+    LEFT JOIN match_player_stats mps ON mp.match_player_id = mps.match_player_id
+    ORDER BY mp.match_player_id;
+    """,
+}
+
+def iter_query(query, params=(), chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Stream a query straight from the sqlite cursor.
+    Returns a generator that yields the tuple of column names first, then
+    one tuple per row, fetching chunk_size rows at a time. The query runs
+    and its first chunk is fetched before this returns, so a bad query,
+    missing table or lock timeout raises here, while an HTTP caller can
+    still answer with an error status. The pooled connection is held
+    until the generator is exhausted or closed.
+    """
+    with ExitStack() as stack:
+        conn = stack.enter_context(pooled_conn(readonly=True))
+        cur = conn.execute(query, params)
+        stack.callback(cur.close)
+        rows = cur.fetchmany(chunk_size)
+        return _stream_rows(stack.pop_all(), cur, rows, chunk_size)
+
+def _stream_rows(stack, cur, rows, chunk_size):
+    with stack:
+        yield tuple(col[0] for col in cur.description)
+        while rows:
+            for row in rows:
+                yield tuple(row)
+            rows = cur.fetchmany(chunk_size)
+
+def export_rows(name):
+    """
+    Return a row stream (see iter_query) for a joined view or table,
+    or None if the name is unknown.
+    """
+    if name in EXPORT_VIEWS:
+        return iter_query(EXPORT_VIEWS[name])
+    entry = _table_whitelist().get(name)
+    if entry is None:
+        return None
+    key, columns = entry
+    return iter_query(f"SELECT {columns} FROM {name} ORDER BY {', '.join(key)};")
+
+# ============= BULK LOAD =============
+
+# Loading order for the 12 base tables (parents before children).
+LOAD_ORDER = (
+    'game_role', 'player', 'game_character', 'ability', 'character_ability', 'item',
+    'match_game', 'team', 'match_player', 'match_player_stats', 'entitlement', 'txn',
+)
+# Per-connection settings for offline loads: no fsync per commit, a 1 GiB
+# page cache and in-memory temp b-trees. The database stays in WAL mode.
+BULK_LOAD_PRAGMAS = (
+    "PRAGMA synchronous = OFF;",
+    "PRAGMA cache_size = -1048576;",
+    "PRAGMA temp_store = MEMORY;",
+)
+
+# Schema files that define the per-row insert triggers dropped by bulk_load
+# (rollup maintenance, player search); re-applying them is idempotent.
+BULK_LOAD_TRIGGER_FILES = ("rollups_sqlite.sql", "search_sqlite.sql")
+
+@contextmanager
+def bulk_load(foreign_keys=True):
+    """
+    Yield a private connection tuned for loading large amounts of data.
+    Secondary indexes and the per-row insert triggers are dropped up front;
+    afterwards the indexes and triggers are recreated, the rollups and the
+    player search index rebuilt once, and ANALYZE refreshes statistics.
+    The writer thread is paused while the block runs. Not for use while
+    serving traffic. The caller commits as it goes; the block commits on exit.
+    """
+    drop_indexes()
+    triggers = exec_query("""
+    SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'trg_%_insert';
+    """, fetch=True, name='bulk_load.triggers')
+    exec_script("".join(f"DROP TRIGGER IF EXISTS {t['name']};\n" for t in triggers),
+                name='bulk_load.drop_triggers')
+    try:
+        with writer_paused():
+            conn = get_conn()
+            for pragma in BULK_LOAD_PRAGMAS:
+                conn.execute(pragma)
+            conn.execute(f"PRAGMA foreign_keys = {'ON' if foreign_keys else 'OFF'};")
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                conn.close()
+    finally:
+        create_indexes()
+        for name in BULK_LOAD_TRIGGER_FILES:
+            exec_script((Path(__file__).parent / name).read_text(), name='bulk_load.restore')
+        rebuild_rollups()
+        rebuild_search_index()
+        exec_script("PRAGMA analysis_limit = 1000; ANALYZE;", name='bulk_load.analyze')
+
+def table_columns(conn, table):
+    """
+    Column names of a base table, in declaration order (generated columns
+    excluded, since they can't be inserted).
+    """
+    return [row['name'] for row in conn.execute(f"PRAGMA table_info({table});")]
+
+def generated_columns(conn, table):
+    """
+    Names of a table's generated columns (e.g. match_game.started_epoch).
+    """
+    return [row['name'] for row in conn.execute(f"PRAGMA table_xinfo({table});") if row['hidden'] in (2, 3)]
+
+# ============= QUERY PLAN CHECKS =============
+
+# Hot-path functions and sample arguments. Every statement they run is
+# captured and passed through EXPLAIN QUERY PLAN by check_query_plans().
+# Add new request-path queries here so they can't silently regress to a SCAN.
+HOT_PATHS = [
+    (get_all_players, ()),
+    (get_all_matches, ()),
+    (get_all_entitlements, ()),
+    (select_all, ('match_player',)),
+    (select_all, ('character_ability',)),
+    (select_all, ('match_hourly_rollup', encode_key_cursor((1705327200, 'Ranked')))),
+    (get_player_by_id, (1,)),
+    (get_role_by_id, (1,)),
+    (get_match_details, (1,)),
+    (get_match_details_batch, ([1, 2, 3],)),
+    (get_player_profile, (1,)),
+    (get_player_profiles, ([1, 2, 3],)),
+    (get_character_details, (1,)),
+    (get_all_characters, ('Ranked',)),
+    (search_players, ('ali',)),
+    (search_players, ('Al',)),
+    (autocomplete_players, ('Al',)),
+    (get_leaderboard, ()),
+    (get_leaderboard, (encode_cursor((1200, 1)),)),
+    (get_match_timeseries, ()),
+    (get_player_inventory, (1,)),
+    (get_match_timeseries, (None, None, 'hour', 'Ranked')),
+]
+
+# Marks statements that scan a whole table by design (e.g. loading an
+# in-memory index); check_query_plans skips them.
+PLAN_CHECK_EXEMPT = "/* plan-check: full read by design */"
+
+# Small reference tables (and the schema catalog) that are fine to scan.
+# json_each scans iterate the caller's ID list for IN (...) batch lookups.
+SCAN_ALLOWED_TABLES = {'sqlite_master', 'json_each', 'game_role', 'game_character', 'ability', 'item', 'gamemode_rollup',
+                       'match_partition'}
+
+def explain_query_plan(conn, sql, params=()):
+    """
+    Return the EXPLAIN QUERY PLAN detail lines for a statement.
+    """
+    return [row['detail'] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+def _is_plannable(sql):
+    # Statements that virtual table modules (FTS5) run on their shadow
+    # tables are traced too; they address them as 'main'.'<name>'.
+    # One-off loads that read a whole table on purpose carry PLAN_CHECK_EXEMPT.
+    if "'main'." in sql or PLAN_CHECK_EXEMPT in sql:
+        return False
+    return sql.lstrip().split(None, 1)[0].upper() in ('SELECT', 'WITH', 'UPDATE', 'DELETE', 'INSERT')
+
+def _table_aliases(sql):
+    """
+    Map alias -> table name for FROM/JOIN clauses (plans report aliases).
+    """
+    aliases = {}
+    for table, alias in re.findall(r"(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?", sql, re.IGNORECASE):
+        aliases[table] = table
+        if alias and alias.upper() not in ('WHERE', 'JOIN', 'LEFT', 'INNER', 'ON', 'ORDER', 'GROUP', 'LIMIT', 'SET'):
+            aliases[alias] = table
+    return aliases
+
+def _scanned_tables(sql, plan):
+    aliases = _table_aliases(sql)
+    # Scans of materialized subqueries / co-routines are not table scans
+    subqueries = {m.group(1) for m in (re.match(r"(?:MATERIALIZE|CO-ROUTINE) (\w+)", d) for d in plan) if m}
+    scanned = []
+    for detail in plan:
+        match = re.match(r"SCAN (\w+)", detail)
+        # Virtual tables report SCAN even when a constraint (idxStr) is used
+        if re.search(r"VIRTUAL TABLE INDEX \d+:\S", detail):
+            continue
+        if match and match.group(1) not in subqueries:
+            scanned.append(aliases.get(match.group(1), match.group(1)))
+    return scanned
+
+def check_query_plans(hot_paths=None):
+    """
+    Run each hot-path function against the current database, capture the
+    statements it executes and EXPLAIN them. Returns a list of dicts
+    describing any statement whose plan contains a full-table SCAN of a
+    table outside SCAN_ALLOWED_TABLES. An empty list means all plans are OK.
+    """
+    global _trace_hook
+    captured = []
+    failures = []
+    close_pool()
+    clear_cache()
+    _trace_hook = captured.append
+    try:
+        for func, args in (hot_paths or HOT_PATHS):
+            start = len(captured)
+            func(*args)
+            for sql in captured[start:]:
+                if not _is_plannable(sql):
+                    continue
+                with pooled_conn(readonly=True) as conn:
+                    plan = explain_query_plan(conn, sql)
+                scans = [t for t in _scanned_tables(sql, plan) if t not in SCAN_ALLOWED_TABLES]
+                if scans:
+                    failures.append({'function': func.__name__, 'sql': sql.strip(), 'plan': plan})
+    finally:
+        _trace_hook = None
+        close_pool()
+    return failures
@@ -0,0 +1,46 @@
+-- ============================================================
+-- SECONDARY INDEXES
+-- Applied by db.create_all() after schema_sqlite.sql.
+-- Keep names prefixed with idx_ so db.drop_indexes() can find them.
+-- Columns already covered by a UNIQUE constraint are not repeated here:
+--   match_player(match_id, player_id), match_player(team_id, character_id),
+--   team(match_id, team_label), entitlement(player_id, item_id)
+-- ============================================================
+
+-- GAME CHARACTER: role join / FK check on game_role deletes
+CREATE INDEX IF NOT EXISTS idx_game_character_role
+  ON game_character(role_id);
+
+-- CHARACTER_ABILITY: FK check on ability deletes
+CREATE INDEX IF NOT EXISTS idx_character_ability_ability
+  ON character_ability(ability_id);
+
+-- MATCH_PLAYER: player profile / history, character details
+CREATE INDEX IF NOT EXISTS idx_match_player_player
+  ON match_player(player_id, match_id);
+CREATE INDEX IF NOT EXISTS idx_match_player_character
+  ON match_player(character_id, match_id);
+
+-- ENTITLEMENT: item ownership lookups / FK check on item deletes
+CREATE INDEX IF NOT EXISTS idx_entitlement_item
+  ON entitlement(item_id);
+
+-- TXN: per-player history ordered by time, FK checks
+CREATE INDEX IF NOT EXISTS idx_txn_player_created
+  ON txn(player_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_txn_item
+  ON txn(item_id);
+
+-- PLAYER: case-insensitive display name prefix lookups (autocomplete)
+CREATE INDEX IF NOT EXISTS idx_player_display_name_nocase
+  ON player(display_name COLLATE NOCASE);
+
+-- PLAYER: MMR leaderboard (rank_mmr DESC, player_id DESC via the implicit rowid suffix)
+CREATE INDEX IF NOT EXISTS idx_player_rank_mmr
+  ON player(rank_mmr);
+
+-- MATCH_GAME: chronological replay (mmr.recalculate), time-range filters
+CREATE INDEX IF NOT EXISTS idx_match_game_started_at
+  ON match_game(started_at);
+CREATE INDEX IF NOT EXISTS idx_match_game_started_epoch
+  ON match_game(started_epoch);
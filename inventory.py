@@ -0,0 +1,118 @@
+"""
+In-memory item ownership index.
+Each cached player's owned items are one Python int used as a bitset over
+a dense numbering of item_ids, so "does this player own X" is a shift and
+a mask, and a player owning a few hundred items costs a few dozen bytes.
+Players are loaded on demand and evicted least-recently-used beyond
+max_players.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+class OwnershipIndex:
+    """
+    player_id -> owned-item bitset, with an LRU bound on cached players.
+    Bits are assigned to item_ids in first-seen order and never reused.
+    """
+    def __init__(self, max_players):
+        self.max_players = max_players
+        self._lock = threading.Lock()
+        self._players = OrderedDict()  # player_id -> (loaded_at, bitset)
+        self._bit_of = {}  # item_id -> bit
+        self._items = []   # bit -> item_id
+        self._writes = 0
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def _mask(self, item_ids):
+        mask = 0
+        for item_id in item_ids:
+            bit = self._bit_of.get(item_id)
+            if bit is None:
+                bit = self._bit_of[item_id] = len(self._items)
+                self._items.append(item_id)
+            mask |= 1 << bit
+        return mask
+
+    def lookup(self, player_id, ttl):
+        """
+        Return a cached bitset, or None on a miss or an entry older than ttl.
+        """
+        with self._lock:
+            entry = self._players.get(player_id)
+            if entry is not None and entry[0] + ttl > time.monotonic():
+                self._players.move_to_end(player_id)
+                self._stats['hits'] += 1
+                return entry[1]
+            self._stats['misses'] += 1
+            return None
+
+    def write_token(self):
+        """
+        Snapshot of the write counter; pass to store() so a load that raced
+        with a grant or removal isn't cached.
+        """
+        return self._writes
+
+    def store(self, player_id, item_ids, token):
+        """
+        Cache a player's owned items as loaded from the database and return
+        the bitset. Skips caching if the index changed since write_token().
+        """
+        with self._lock:
+            mask = self._mask(item_ids)
+            if token == self._writes:
+                self._players[player_id] = (time.monotonic(), mask)
+                self._players.move_to_end(player_id)
+                while len(self._players) > self.max_players:
+                    self._players.popitem(last=False)
+                    self._stats['evictions'] += 1
+            return mask
+
+    def grant(self, player_ids, item_id):
+        """
+        Mark an item owned for any of these players that are cached.
+        """
+        with self._lock:
+            self._writes += 1
+            mask = self._mask((item_id,))
+            for player_id in player_ids:
+                entry = self._players.get(player_id)
+                if entry is not None:
+                    self._players[player_id] = (entry[0], entry[1] | mask)
+
+    def forget(self, player_id):
+        with self._lock:
+            self._writes += 1
+            self._players.pop(player_id, None)
+
+    def items(self, mask):
+        """
+        Item IDs in a bitset, ascending.
+        """
+        with self._lock:
+            items = self._items
+            owned = []
+            while mask:
+                low = mask & -mask
+                owned.append(items[low.bit_length() - 1])
+                mask ^= low
+        return sorted(owned)
+
+    def owned(self, mask, item_ids):
+        """
+        The subset of item_ids set in a bitset, in the given order.
+        """
+        bit_of = self._bit_of
+        return [i for i in item_ids if i in bit_of and mask >> bit_of[i] & 1]
+
+    def stats(self):
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                'players': len(self._players),
+                'max_players': self.max_players,
+                'items': len(self._items),
+                **self._stats,
+                'hit_rate': round(self._stats['hits'] / lookups, 3) if lookups else None,
+            }
@@ -0,0 +1,103 @@
+"""
+Bounded executor lanes for running request work off the serving threads.
+Quick point lookups and heavy analytics get separate worker pools and
+queues, so a slow aggregate can never make a cheap lookup wait behind it.
+Under asgi.py every request runs on its route's lane; routes without one
+use DEFAULT.
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+_local = threading.local()
+
+def current():
+    """
+    Return the lane the calling thread belongs to, or None.
+    """
+    return getattr(_local, 'lane', None)
+
+class LaneBusy(Exception):
+    """Raised when a lane's queue is full."""
+
+class LaneTimeout(Exception):
+    """Raised when a lane does not finish a call in time."""
+
+class Lane:
+    """
+    A thread pool with a bounded number of queued + running calls.
+    """
+    def __init__(self, name, workers, max_pending, timeout):
+        self.name = name
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f'lane-{name}',
+                                            initializer=self._enter)
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._stats = {'submitted': 0, 'completed': 0, 'rejected': 0, 'timeouts': 0, 'pending': 0}
+
+    def _enter(self):
+        _local.lane = self
+
+    def _count(self, key, delta=1):
+        with self._lock:
+            self._stats[key] += delta
+
+    def _release(self, _future):
+        self._slots.release()
+        self._count('pending', -1)
+        self._count('completed')
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Queue a call and return its Future. Raises LaneBusy if the lane is full.
+        """
+        if not self._slots.acquire(blocking=False):
+            self._count('rejected')
+            raise LaneBusy(f"{self.name} lane is busy, try again shortly")
+        self._count('submitted')
+        self._count('pending')
+        future = self._executor.submit(fn, *args, **kwargs)
+        future.add_done_callback(self._release)
+        return future
+
+    def run(self, fn, *args, **kwargs):
+        """
+        Run a call on the lane and wait for its result (blocking callers).
+        """
+        future = self.submit(fn, *args, **kwargs)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            self._count('timeouts')
+            raise LaneTimeout(f"{self.name} lane call timed out after {self.timeout}s")
+
+    async def run_async(self, fn, *args, **kwargs):
+        """
+        Run a call on the lane and await its result (async callers).
+        """
+        future = self.submit(fn, *args, **kwargs)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            self._count('timeouts')
+            raise LaneTimeout(f"{self.name} lane call timed out after {self.timeout}s")
+
+    def stats(self):
+        with self._lock:
+            return {'workers': self.workers, 'max_pending': self.max_pending, **self._stats}
+
+# Point lookups: profile, match details, search. Many workers, short timeout.
+QUICK = Lane('quick', workers=16, max_pending=512, timeout=5)
+# Aggregates and analytics. Few workers so they can't crowd out the quick lane.
+HEAVY = Lane('heavy', workers=2, max_pending=32, timeout=60)
+# Everything else under asgi.py (admin, CRUD, streamed exports). No timeout.
+DEFAULT = Lane('default', workers=16, max_pending=256, timeout=None)
+
+def stats():
+    """
+    Return counters for every lane.
+    """
+    return {lane.name: lane.stats() for lane in (QUICK, HEAVY, DEFAULT)}
@@ -0,0 +1,113 @@
+"""
+In-memory MMR rank index.
+Counts players per MMR value in a Fenwick (binary indexed) tree over the
+distinct MMR values (coordinate compression), so a player's rank and
+percentile, and incremental MMR changes, all cost O(log D) where D is the
+number of distinct values - independent of the number of players and of
+how far apart the values are.
+"""
+import threading
+from bisect import bisect_left, bisect_right, insort
+
+# MMR values that aren't tree coordinates yet (first seen since the last
+# build) are kept in a sorted overflow list; the tree is rebuilt over all
+# distinct values once the list holds this many entries.
+MAX_OVERFLOW = 1024
+
+class MmrIndex:
+    """
+    player_id -> MMR map plus a Fenwick tree of player counts per distinct
+    MMR value. set() and remove() are idempotent, so replaying a change is
+    harmless.
+    """
+    def __init__(self, players=()):
+        self._lock = threading.Lock()
+        self._mmr = dict(players)
+        self._build()
+
+    def _build(self):
+        self._values = sorted(set(self._mmr.values()))
+        self._position = {mmr: i + 1 for i, mmr in enumerate(self._values)}
+        self._overflow = []
+        size = len(self._values)
+        counts = [0] * (size + 1)
+        for mmr in self._mmr.values():
+            counts[self._position[mmr]] += 1
+        # O(n) Fenwick construction: push each node's total to its parent
+        for i in range(1, size + 1):
+            parent = i + (i & -i)
+            if parent <= size:
+                counts[parent] += counts[i]
+        self._tree = counts
+
+    def _add(self, mmr, delta):
+        i = self._position.get(mmr)
+        if i is None:
+            if delta > 0:
+                insort(self._overflow, mmr)
+            else:
+                del self._overflow[bisect_left(self._overflow, mmr)]
+            return
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _count_at_most(self, mmr):
+        i = bisect_right(self._values, mmr)
+        total = bisect_right(self._overflow, mmr)
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def set(self, player_id, mmr):
+        """
+        Insert a player or move them to a new MMR.
+        """
+        with self._lock:
+            old = self._mmr.get(player_id)
+            if old == mmr:
+                return
+            self._mmr[player_id] = mmr
+            if old is not None:
+                self._add(old, -1)
+            self._add(mmr, 1)
+            if len(self._overflow) > MAX_OVERFLOW:
+                self._build()
+
+    def remove(self, player_id):
+        with self._lock:
+            old = self._mmr.pop(player_id, None)
+            if old is not None:
+                self._add(old, -1)
+
+    def __len__(self):
+        return len(self._mmr)
+
+    def rank_of_mmr(self, mmr):
+        """
+        Standard competition rank ("1224" ranking) for this MMR:
+        1 + the number of players with a strictly higher MMR.
+        """
+        with self._lock:
+            return len(self._mmr) - self._count_at_most(mmr) + 1
+
+    def rank(self, player_id):
+        """
+        Return {'rank_mmr', 'rank', 'total_players', 'percentile'} for a
+        player, or None if unknown. percentile is the share of players
+        with a lower MMR.
+        """
+        with self._lock:
+            mmr = self._mmr.get(player_id)
+            if mmr is None:
+                return None
+            total = len(self._mmr)
+            below = self._count_at_most(mmr - 1)
+            at_most = self._count_at_most(mmr)
+        return {
+            'rank_mmr': mmr,
+            'rank': total - at_most + 1,
+            'total_players': total,
+            'percentile': round(100 * below / total, 2),
+        }
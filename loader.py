@@ -0,0 +1,322 @@
+"""
+Bulk loader: import CSV / NDJSON exports into any of the 12 base tables,
+or generate realistic synthetic players, matches, teams, stats,
+entitlements and transactions at a chosen scale.
+
+Loads run on one private connection (db.bulk_load) with bulk PRAGMAs,
+secondary indexes dropped until the end, rollup triggers bypassed and
+rows written with executemany in large transactions.
+
+Usage:
+    python loader.py generate --players 1000000 --matches 10000000
+    python loader.py import exports/player.csv exports/match_game.ndjson
+    python loader.py --db other.db --reset import txn.csv --table txn
+"""
+import argparse
+import csv
+import json
+import sqlite3
+import sys
+import time
+from itertools import chain, islice
+from pathlib import Path
+
+import numpy as np
+
+import db
+
+COMMIT_ROWS = 500_000
+BATCH_ROWS = 50_000
+MATCH_CHUNK = 20_000
+TEAM_SIZE = 5
+
+GAMEMODES = ('Ranked', 'Ranked', 'Casual', 'Casual', 'Casual', 'ARAM')
+NAME_PARTS = ('Shadow', 'Storm', 'Iron', 'Night', 'Frost', 'Ember', 'Void', 'Sky',
+              'Wolf', 'Blade', 'Fang', 'Rune', 'Hex', 'Nova', 'Drift', 'Echo')
+
+class Progress:
+    """
+    Count rows written, commit every COMMIT_ROWS and report progress on stderr.
+    """
+    def __init__(self, conn, label):
+        self.conn = conn
+        self.label = label
+        self.rows = 0
+        self.uncommitted = 0
+        self.started = time.perf_counter()
+
+    def add(self, rows):
+        self.rows += rows
+        self.uncommitted += rows
+        if self.uncommitted >= COMMIT_ROWS:
+            self.conn.commit()
+            self.uncommitted = 0
+            self.report(end='\r')
+
+    def report(self, end='\n'):
+        elapsed = time.perf_counter() - self.started
+        print(f"  {self.label}: {self.rows:,} rows in {elapsed:.1f}s "
+              f"({self.rows / max(elapsed, 1e-9):,.0f} rows/s)", end=end, file=sys.stderr)
+
+# ============= IMPORT =============
+
+def read_rows(path):
+    """
+    Yield one dict per record from a .csv (header row) or .ndjson / .jsonl file.
+    Empty CSV fields are read as NULL.
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.suffix.lower() == '.csv':
+            for row in csv.DictReader(f):
+                yield {k: (v if v != '' else None) for k, v in row.items()}
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+def import_file(conn, table, path):
+    """
+    Insert every record of a file into `table`, BATCH_ROWS per executemany.
+    Columns are taken from the first record and must exist in the table;
+    generated columns (present in /export output) are skipped.
+    """
+    if table not in db.LOAD_ORDER:
+        raise ValueError(f"Unknown table '{table}' (expected one of {', '.join(db.LOAD_ORDER)})")
+    rows = read_rows(path)
+    first = next(rows, None)
+    if first is None:
+        return 0
+    generated = set(db.generated_columns(conn, table))
+    columns = [c for c in first if c not in generated]
+    unknown = set(columns) - set(db.table_columns(conn, table))
+    if unknown:
+        raise ValueError(f"{path}: unknown columns for {table}: {', '.join(sorted(unknown))}")
+
+    query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))});"
+    progress = Progress(conn, f"{table} <- {path.name}")
+    records = (tuple(r.get(c) for c in columns) for r in chain([first], rows))
+    while True:
+        batch = list(islice(records, BATCH_ROWS))
+        if not batch:
+            break
+        conn.executemany(query, batch)
+        progress.add(len(batch))
+    conn.commit()
+    progress.report()
+    return progress.rows
+
+def import_files(files, table=None, reset=False):
+    """
+    Import files in dependency order. Each file's table is `table` if given,
+    otherwise the file name without extension (e.g. match_player.csv).
+    """
+    targets = [(table or path.stem, path) for path in files]
+    targets.sort(key=lambda t: db.LOAD_ORDER.index(t[0]) if t[0] in db.LOAD_ORDER else -1)
+    if reset:
+        db.drop_all()
+        db.create_all()
+    with db.bulk_load(foreign_keys=True) as conn:
+        return sum(import_file(conn, name, path) for name, path in targets)
+
+# ============= SYNTHETIC DATA =============
+
+def _timestamps(seconds):
+    """
+    Format an array of Unix times as 'YYYY-MM-DD HH:MM:SS' strings.
+    """
+    text = np.datetime_as_string(np.asarray(seconds, dtype='datetime64[s]'), unit='s')
+    return np.char.replace(text, 'T', ' ')
+
+def _rows(*columns):
+    """
+    Turn NumPy columns into a list of row tuples for executemany.
+    """
+    return list(zip(*(column.tolist() for column in columns)))
+
+def generate_players(conn, count, rng):
+    """
+    Insert `count` players with unique names/emails and a normal MMR spread.
+    Returns the (first, last) player_id generated.
+    """
+    first = db.next_id(conn, 'player', 'player_id')
+    progress = Progress(conn, 'player')
+    signup_start = int(np.datetime64('2024-01-01', 's').astype(np.int64))
+    parts = np.array(NAME_PARTS)
+    for start in range(first, first + count, BATCH_ROWS):
+        ids = np.arange(start, min(start + BATCH_ROWS, first + count))
+        n = len(ids)
+        names = np.char.add(np.char.add(parts[rng.integers(0, len(parts), n)],
+                                        parts[rng.integers(0, len(parts), n)]), ids.astype(str))
+        emails = np.char.add(np.char.lower(names), '@example.com')
+        mmr = np.clip(rng.normal(1200, 300, n), 0, None).astype(np.int64)
+        created = _timestamps(signup_start + rng.integers(0, 365 * 86400, n))
+        conn.executemany("""
+        INSERT INTO player (player_id, display_name, email, password_hash, rank_mmr, created_at)
+        VALUES (?, ?, ?, 'synthetic', ?, ?);
+        """, _rows(ids, names, emails, mmr, created))
+        progress.add(n)
+    conn.commit()
+    progress.report()
+    return first, first + count - 1
+
+def generate_matches(conn, count, rng, days=365):
+    """
+    Insert `count` finished 5v5 matches over the last `days` days, with two
+    teams, ten match_player rows and ten match_player_stats rows each.
+    Rows are built a chunk at a time with NumPy. Players in a match and
+    characters on a team are always distinct.
+    """
+    player_ids = np.array([r[0] for r in conn.execute("SELECT player_id FROM player ORDER BY player_id;")])
+    characters = np.array([r[0] for r in conn.execute("SELECT character_id FROM game_character ORDER BY character_id;")])
+    per_match = 2 * TEAM_SIZE
+    if len(player_ids) < per_match or len(characters) < TEAM_SIZE:
+        raise ValueError(f"Need at least {per_match} players and {TEAM_SIZE} characters to generate matches")
+
+    match_id = db.next_id(conn, 'match_game', 'match_id')
+    team_id = db.next_id(conn, 'team', 'team_id')
+    mp_id = db.next_id(conn, 'match_player', 'match_player_id')
+    n_players, n_chars = len(player_ids), len(characters)
+    window_start = int(time.time()) - days * 86400
+    gamemodes = np.array(GAMEMODES)
+    slot = np.tile(np.arange(per_match), MATCH_CHUNK)
+    progress = Progress(conn, 'match_player_stats')
+
+    remaining = count
+    while remaining:
+        m = min(MATCH_CHUNK, remaining)
+        rows = m * per_match
+        match_ids = np.arange(match_id, match_id + m)
+        started = window_start + rng.integers(0, days * 86400, m)
+        ended = started + rng.integers(900, 2700, m)
+        team_ids = np.arange(team_id, team_id + 2 * m)
+
+        # Ten distinct players per match: base + k * stride for k < 10
+        base = np.repeat(rng.integers(0, n_players, m), per_match)
+        stride = np.repeat(rng.integers(1, n_players // per_match + 1, m), per_match)
+        side = slot[:rows] // TEAM_SIZE
+        match_index = np.repeat(np.arange(m), per_match)
+        mp_players = player_ids[(base + slot[:rows] * stride) % n_players]
+        # Five distinct characters per team: consecutive from a random offset
+        offset = np.repeat(rng.integers(0, n_chars, 2 * m), TEAM_SIZE)
+        mp_characters = characters[(offset + slot[:rows] % TEAM_SIZE) % n_chars]
+        won = np.repeat(rng.random(m) < 0.5, per_match) == (side == 0)
+
+        conn.executemany("INSERT INTO match_game (match_id, gamemode, started_at, ended_at) VALUES (?, ?, ?, ?);",
+                         _rows(match_ids, gamemodes[rng.integers(0, len(gamemodes), m)],
+                               _timestamps(started), _timestamps(ended)))
+        conn.executemany("INSERT INTO team (team_id, match_id, team_label) VALUES (?, ?, ?);",
+                         _rows(team_ids, np.repeat(match_ids, 2), np.tile(np.array(['Blue', 'Red']), m)))
+        mp_ids = np.arange(mp_id, mp_id + rows)
+        conn.executemany("""
+        INSERT INTO match_player (match_player_id, match_id, team_id, player_id, character_id, result)
+        VALUES (?, ?, ?, ?, ?, ?);
+        """, _rows(mp_ids, match_ids[match_index], team_ids[2 * match_index + side],
+                   mp_players, mp_characters, np.where(won, 'win', 'loss')))
+        conn.executemany(f"""
+        INSERT INTO match_player_stats (match_player_id, {', '.join(db.STAT_COLUMNS)})
+        VALUES ({', '.join('?' * (len(db.STAT_COLUMNS) + 1))});
+        """, _rows(
+            mp_ids,
+            np.where(won, rng.integers(0, 20, rows), rng.integers(0, 12, rows)),
+            np.where(won, rng.integers(0, 6, rows), rng.integers(0, 14, rows)),
+            rng.integers(0, 25, rows),
+            rng.integers(5000, 45000, rows),
+            rng.integers(0, 12000, rows),
+            rng.integers(40, 320, rows),
+            np.where(won, 1, -1) * rng.integers(10, 30, rows),
+        ))
+        progress.add(rows)
+        match_id += m
+        team_id += 2 * m
+        mp_id += rows
+        remaining -= m
+    conn.commit()
+    progress.report()
+
+def generate_entitlements(conn, player_range, per_player, rng):
+    """
+    Give each player in player_range `per_player` distinct random items,
+    each with a matching store purchase in txn.
+    """
+    items = np.array([r[0] for r in conn.execute("SELECT item_id FROM item ORDER BY item_id;")])
+    per_player = min(per_player, len(items))
+    progress = Progress(conn, 'entitlement + txn')
+    first, last = player_range
+    chunk = max(1, BATCH_ROWS // per_player)
+    for start in range(first, last + 1, chunk):
+        players = np.arange(start, min(start + chunk, last + 1))
+        # The first per_player columns of a random permutation per player
+        picks = np.argsort(rng.random((len(players), len(items))), axis=1)[:, :per_player]
+        player_col = np.repeat(players, per_player)
+        item_col = items[picks.ravel()]
+        quantity = rng.integers(1, 4, len(player_col))
+        amount = np.array([0, 100, 250, 500])[rng.integers(0, 4, len(player_col))]
+        conn.executemany("INSERT INTO entitlement (player_id, item_id, quantity, status) VALUES (?, ?, ?, 'active');",
+                         _rows(player_col, item_col, quantity))
+        conn.executemany("""
+        INSERT INTO txn (player_id, item_id, currency, amount, quantity, source)
+        VALUES (?, ?, 'GC', ?, ?, 'store');
+        """, _rows(player_col, item_col, amount, quantity))
+        progress.add(2 * len(player_col))
+    conn.commit()
+    progress.report()
+
+def generate(players, matches, items_per_player=2, seed=None, reset=False):
+    """
+    Generate synthetic data. Reference tables (roles, characters, abilities,
+    items) come from seed_sqlite.sql and are loaded first if missing.
+    """
+    if reset:
+        db.drop_all()
+        db.create_all()
+    if not db.exec_query("SELECT 1 FROM game_character LIMIT 1;", fetch=True,
+                         name='loader.generate.characters'):
+        db.seed_all()
+
+    rng = np.random.default_rng(seed)
+    # Generated rows are valid by construction, so skip per-row FK checks
+    with db.bulk_load(foreign_keys=False) as conn:
+        if players:
+            player_range = generate_players(conn, players, rng)
+        if matches:
+            generate_matches(conn, matches, rng)
+        if items_per_player and players:
+            generate_entitlements(conn, player_range, items_per_player, rng)
+    print("  indexes, rollups and statistics rebuilt", file=sys.stderr)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--db', default=db.DB_FILE, help=f'database file (default {db.DB_FILE})')
+    parser.add_argument('--reset', action='store_true', help='drop and recreate all tables first')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    gen = commands.add_parser('generate', help='generate synthetic data')
+    gen.add_argument('--players', type=int, default=10_000)
+    gen.add_argument('--matches', type=int, default=100_000, help='each match adds 10 stat rows')
+    gen.add_argument('--items-per-player', type=int, default=2)
+    gen.add_argument('--seed', type=int, help='random seed for reproducible data')
+
+    imp = commands.add_parser('import', help='import CSV / NDJSON files')
+    imp.add_argument('files', nargs='+', type=Path)
+    imp.add_argument('--table', help='target table (default: each file name without extension)')
+
+    args = parser.parse_args(argv)
+    db.DB_FILE = args.db
+    started = time.perf_counter()
+    try:
+        if args.command == 'generate':
+            generate(args.players, args.matches, args.items_per_player, args.seed, args.reset)
+        else:
+            if args.table and len(args.files) > 1:
+                parser.error('--table can only be used with a single file')
+            import_files(args.files, args.table, args.reset)
+    except (ValueError, OSError, sqlite3.Error) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        db.close_pool()
+    print(f"Done in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
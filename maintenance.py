@@ -0,0 +1,250 @@
+"""
+Background database maintenance.
+Keeps planner statistics current and stops the file and WAL growing without
+bound, in small steps so request writes never wait long:
+
+  analyze     ANALYZE one table per write job, sampled with analysis_limit
+  optimize    PRAGMA optimize (re-analyzes whatever the planner flags)
+  checkpoint  passive WAL checkpoint (never blocks readers or writers)
+  vacuum      PRAGMA incremental_vacuum, VACUUM_PAGES_PER_CHUNK pages per write job
+
+Write steps go through the writer queue, so each chunk is one short job in
+a group commit. Chunked steps stop after STEP_BUDGET_SECONDS and the next
+cycle picks up where they left off.
+
+A cycle runs every INTERVAL_SECONDS, or sooner once WRITE_ROWS_TRIGGER rows
+have been written, while the scheduler (start()) is running. Cycles can
+also be run by hand via POST /admin/maintenance/run. vacuum_full (a
+one-off full VACUUM that converts an older database to incremental
+auto-vacuum) is never scheduled.
+"""
+import collections
+import logging
+import threading
+import time
+
+import db
+import metrics
+
+CHECK_SECONDS = 30
+INTERVAL_SECONDS = 3600
+WRITE_ROWS_TRIGGER = 50_000
+ANALYSIS_LIMIT = 1000
+VACUUM_PAGES_PER_CHUNK = 500
+STEP_BUDGET_SECONDS = 10
+HISTORY_SIZE = 20
+
+SCHEDULED_STEPS = ('analyze', 'optimize', 'checkpoint', 'vacuum')
+
+STEP_SECONDS = metrics.Histogram(
+    'db_maintenance_step_seconds', 'Duration of database maintenance steps.', ('step',))
+
+_log = logging.getLogger('db.maintenance')
+_run_lock = threading.Lock()
+_scheduler_lock = threading.Lock()
+_history = collections.deque(maxlen=HISTORY_SIZE)
+_state = {'last_run': time.monotonic(), 'rows_at_last_run': 0, 'running': None}
+_scheduler = None
+_stop = threading.Event()
+
+def _write_chunks(job, args_list):
+    """
+    Submit one write job per args tuple until done or over budget.
+    Returns (chunk seconds, completed).
+    """
+    timings = []
+    started = time.perf_counter()
+    for args in args_list:
+        if time.perf_counter() - started > STEP_BUDGET_SECONDS:
+            return timings, False
+        chunk_started = time.perf_counter()
+        db.submit_write(job, *args)
+        timings.append(time.perf_counter() - chunk_started)
+    return timings, True
+
+def _chunk_detail(timings, completed):
+    return {
+        'chunks': len(timings),
+        'max_chunk_seconds': round(max(timings, default=0), 4),
+        'completed': completed,
+    }
+
+def _analyze_table(conn, table):
+    conn.execute(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT};")
+    conn.execute(f'ANALYZE "{table}";')
+
+def _analyze():
+    tables = [r['name'] for r in db.exec_query("""
+    SELECT name FROM sqlite_master
+    WHERE type = 'table' AND name NOT LIKE 'sqlite_%' AND sql NOT LIKE 'CREATE VIRTUAL TABLE%'
+    ORDER BY name;
+    """, fetch=True, name='maintenance.analyze.tables')]
+    timings, completed = _write_chunks(_analyze_table, [(t,) for t in tables])
+    return {'tables': len(tables), **_chunk_detail(timings, completed)}
+
+def _optimize_job(conn):
+    conn.execute(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT};")
+    conn.execute("PRAGMA optimize;").fetchall()
+
+def _optimize():
+    db.submit_write(_optimize_job)
+    return {}
+
+def _checkpoint():
+    # Can't run inside the writer's transaction; PASSIVE takes no lock
+    with db.pooled_conn() as conn:
+        busy, wal_pages, checkpointed = conn.execute("PRAGMA wal_checkpoint(PASSIVE);").fetchone()
+    return {'wal_pages': wal_pages, 'checkpointed_pages': checkpointed, 'busy': bool(busy)}
+
+def _vacuum_job(conn):
+    # incremental_vacuum frees one page per step, and sqlite3 steps a
+    # statement that returns no rows only once, so step it page by page.
+    freelist = conn.execute("PRAGMA freelist_count;").fetchone()[0]
+    for _ in range(min(freelist, VACUUM_PAGES_PER_CHUNK)):
+        conn.execute("PRAGMA incremental_vacuum(1);")
+    return conn.execute("PRAGMA freelist_count;").fetchone()[0]
+
+def _vacuum():
+    info = database_info()
+    detail = {'freelist_pages_before': info['freelist_pages']}
+    if info['auto_vacuum'] != 'incremental':
+        return {**detail, 'skipped': "auto_vacuum is not incremental (run the vacuum_full step once)"}
+    if not info['freelist_pages']:
+        return {**detail, 'freelist_pages_after': 0, **_chunk_detail([], True)}
+
+    remaining, timings, completed = info['freelist_pages'], [], True
+    started = time.perf_counter()
+    while remaining:
+        if time.perf_counter() - started > STEP_BUDGET_SECONDS:
+            completed = False
+            break
+        chunk_started = time.perf_counter()
+        remaining = db.submit_write(_vacuum_job)
+        timings.append(time.perf_counter() - chunk_started)
+    return {**detail, 'freelist_pages_after': remaining, **_chunk_detail(timings, completed)}
+
+def _vacuum_full():
+    """
+    Rewrite the whole file with auto_vacuum = INCREMENTAL. Holds the write
+    lock (and pauses the writer) for the duration, so only run it by hand.
+    """
+    before = database_info()
+    with db.writer_paused(), db.pooled_conn() as conn:
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL;")
+        conn.execute("VACUUM;")
+    after = database_info()
+    return {'pages_before': before['page_count'], 'pages_after': after['page_count'],
+            'auto_vacuum': after['auto_vacuum']}
+
+STEPS = {
+    'analyze': _analyze,
+    'optimize': _optimize,
+    'checkpoint': _checkpoint,
+    'vacuum': _vacuum,
+    'vacuum_full': _vacuum_full,
+}
+
+def database_info():
+    """
+    Current page count, free pages and auto_vacuum mode of the database.
+    """
+    with db.pooled_conn(readonly=True) as conn:
+        page_count = conn.execute("PRAGMA page_count;").fetchone()[0]
+        page_size = conn.execute("PRAGMA page_size;").fetchone()[0]
+        freelist = conn.execute("PRAGMA freelist_count;").fetchone()[0]
+        auto_vacuum = conn.execute("PRAGMA auto_vacuum;").fetchone()[0]
+    return {
+        'page_count': page_count,
+        'page_size': page_size,
+        'freelist_pages': freelist,
+        'auto_vacuum': {0: 'none', 1: 'full', 2: 'incremental'}.get(auto_vacuum, auto_vacuum),
+    }
+
+def run(steps=SCHEDULED_STEPS, trigger='manual'):
+    """
+    Run maintenance steps in order and return a report:
+        {'trigger', 'started_at', 'seconds', 'steps': [{'step', 'seconds', ...}, ...]}
+    A failing step is reported with its error and the rest still run.
+    Waits for any cycle already in progress. Raises ValueError on an unknown step.
+    """
+    unknown = [step for step in steps if step not in STEPS]
+    if unknown:
+        raise ValueError(f"Unknown maintenance step(s): {', '.join(unknown)} (expected {', '.join(STEPS)})")
+    with _run_lock:
+        _state['running'] = trigger
+        rows_changed = db.writer_stats()['rows_changed']
+        report = {'trigger': trigger, 'started_at': time.time(), 'steps': []}
+        started = time.perf_counter()
+        try:
+            for step in steps:
+                step_started = time.perf_counter()
+                try:
+                    detail = STEPS[step]()
+                except Exception as e:
+                    _log.exception("maintenance step %s failed", step)
+                    detail = {'error': str(e)}
+                seconds = time.perf_counter() - step_started
+                STEP_SECONDS.observe(seconds, step)
+                report['steps'].append({'step': step, 'seconds': round(seconds, 4), **detail})
+        finally:
+            report['seconds'] = round(time.perf_counter() - started, 4)
+            _history.appendleft(report)
+            _state.update(last_run=time.monotonic(), rows_at_last_run=rows_changed, running=None)
+    return report
+
+def due():
+    """
+    Return why a scheduled cycle is due ('interval' or 'writes'), or None.
+    """
+    if time.monotonic() - _state['last_run'] >= INTERVAL_SECONDS:
+        return 'interval'
+    if db.writer_stats()['rows_changed'] - _state['rows_at_last_run'] >= WRITE_ROWS_TRIGGER:
+        return 'writes'
+    return None
+
+def _scheduler_loop():
+    while not _stop.wait(CHECK_SECONDS):
+        trigger = due()
+        if trigger:
+            try:
+                run(SCHEDULED_STEPS, trigger)
+            except Exception:
+                _log.exception("maintenance cycle failed")
+
+def start():
+    """
+    Start the background scheduler thread (idempotent).
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _stop.clear()
+            _scheduler = threading.Thread(target=_scheduler_loop, name='db-maintenance', daemon=True)
+            _scheduler.start()
+
+def stop():
+    """
+    Stop the scheduler thread, waiting for a cycle in progress to finish.
+    """
+    global _scheduler
+    with _scheduler_lock:
+        _stop.set()
+        if _scheduler is not None:
+            _scheduler.join()
+            _scheduler = None
+
+def status():
+    """
+    Scheduler state, thresholds, current database info and recent run reports.
+    """
+    rows_since = db.writer_stats()['rows_changed'] - _state['rows_at_last_run']
+    return {
+        'scheduler_running': _scheduler is not None,
+        'running': _state['running'],
+        'seconds_since_last_run': round(time.monotonic() - _state['last_run'], 1),
+        'rows_since_last_run': rows_since,
+        'interval_seconds': INTERVAL_SECONDS,
+        'write_rows_trigger': WRITE_ROWS_TRIGGER,
+        'database': database_info(),
+        'history': list(_history),
+    }
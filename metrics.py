@@ -0,0 +1,101 @@
+"""
+Minimal in-process metrics in the Prometheus text exposition format.
+Counters and histograms are keyed by label values and are safe to update
+from the request, lane and writer threads.
+"""
+import threading
+
+# Latency buckets in seconds (upper bounds; +Inf is implicit).
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+_registry = []
+
+def _label_text(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _n, v in pairs)
+    return '{' + ','.join(f'{n}="{v}"' for (n, _v), v in zip(pairs, escaped)) + '}'
+
+class Counter:
+    """
+    A monotonically increasing value per label set.
+    """
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for values, total in items:
+            yield f'{self.name}{_label_text(self.labels, values)} {total}'
+
+class Histogram:
+    """
+    A cumulative-bucket histogram per label set.
+    """
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._values = {}  # label values -> [bucket counts..., count, sum]
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            state = self._values.get(label_values)
+            if state is None:
+                state = self._values[label_values] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += 1
+            state[-1] += value
+
+    def samples(self):
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        for values, state in items:
+            for bound, count in zip(self.buckets, state):
+                yield f'{self.name}_bucket{_label_text(self.labels, values, [("le", bound)])} {count}'
+            yield f'{self.name}_bucket{_label_text(self.labels, values, [("le", "+Inf")])} {state[-2]}'
+            yield f'{self.name}_count{_label_text(self.labels, values)} {state[-2]}'
+            yield f'{self.name}_sum{_label_text(self.labels, values)} {state[-1]:.6f}'
+
+def gauge_lines(name, help_text, values):
+    """
+    Format a dict of current values (e.g. pool_stats()) as one gauge
+    with a 'stat' label. Non-numeric values are skipped.
+    """
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} gauge']
+    for stat, value in sorted(values.items()):
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            lines.append(f'{name}{_label_text(("stat",), (stat,))} {value}')
+    return lines
+
+def render(extra_lines=()):
+    """
+    Render every registered metric (plus any extra lines) as Prometheus text.
+    """
+    lines = []
+    for metric in _registry:
+        lines.append(f'# HELP {metric.name} {metric.help}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        lines.extend(metric.samples())
+    lines.extend(extra_lines)
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,208 @@
+"""
+Batch MMR recalculation.
+Replays match history in chronological order with a team Elo formula
+and writes the resulting match_player_stats.mmr_delta and player.rank_mmr
+back in bulk. Used for season resets and rating-formula changes.
+
+History is streamed in chunks of whole matches. Within a chunk, matches
+are grouped into "waves" in which no player appears twice (each match
+goes one wave after the latest wave containing any of its players), so
+every player's games are still applied in order while a whole wave is
+rated at once with NumPy. Waves depend on the ratings left by the one
+before, so they are applied one after another; the wave assignment itself
+is a single Python pass over the chunk's matches.
+
+Changed deltas are staged in memory until the replay ends, then written
+together with the new ratings in one transaction, so readers never see
+new deltas next to the old ratings (or a half-written replay).
+
+Matches moved to partition files (partitions.py) are not replayed, so
+once any exist a replay needs --since after the newest partitioned month.
+
+Usage: flask --app app recalculate-mmr [--dry-run] [--since 2025-01-01]
+"""
+import time
+
+import numpy as np
+
+import db
+
+BASE_MMR = 1000
+K_FACTOR = 32
+CHUNK_ROWS = 500_000
+DIFF_TOP = 20
+
+def _history(since):
+    """
+    Stream (match_player_id, match_id, team_id, player_id, won, old_delta, has_stats)
+    in chronological order. Rows of one match are contiguous.
+    """
+    rows = db.iter_query("""
+    SELECT mp.match_player_id, mp.match_id, mp.team_id, mp.player_id,
+           mp.result = 'win' AS won,
+           COALESCE(s.mmr_delta, 0) AS old_delta,
+           s.match_player_id IS NOT NULL AS has_stats
+    FROM match_game mg
+    JOIN match_player mp ON mp.match_id = mg.match_id
+    LEFT JOIN match_player_stats s ON s.match_player_id = mp.match_player_id
+    WHERE mg.started_at >= ?
+    ORDER BY mg.started_at, mg.match_id;
+    """, (since or '',))
+    next(rows)  # column names
+    return rows
+
+def _chunks(rows):
+    """
+    Group the history stream into NumPy column arrays of about CHUNK_ROWS
+    rows, never splitting a match across chunks.
+    """
+    buf = []
+    for row in rows:
+        if len(buf) >= CHUNK_ROWS and row[1] != buf[-1][1]:
+            yield np.array(buf, dtype=np.int64).T
+            buf = []
+        buf.append(row)
+    if buf:
+        yield np.array(buf, dtype=np.int64).T
+
+def _waves(match_ids, players):
+    """
+    Assign each row the wave of its match: one more than the latest wave
+    already holding one of the match's players.
+    """
+    starts = np.flatnonzero(np.r_[True, match_ids[1:] != match_ids[:-1]])
+    ends = np.r_[starts[1:], len(match_ids)]
+    last_wave = {}
+    match_wave = np.empty(len(starts), dtype=np.int64)
+    player_list = players.tolist()
+    for m, (start, end) in enumerate(zip(starts.tolist(), ends.tolist())):
+        match_players = player_list[start:end]
+        wave = max([last_wave.get(p, -1) for p in match_players]) + 1
+        for p in match_players:
+            last_wave[p] = wave
+        match_wave[m] = wave
+    return np.repeat(match_wave, ends - starts)
+
+def _expected(team_avg, opp_avg):
+    return 1.0 / (1.0 + 10.0 ** ((opp_avg - team_avg) / 400.0))
+
+def _rate_wave(ratings, players, teams, match_ids, won, k_factor):
+    """
+    Elo update for one wave (no player twice): each player scores against
+    the average rating of the other team(s) in their match. Applies the
+    integer deltas to `ratings` and returns them.
+    """
+    _teams, team_index = np.unique(teams, return_inverse=True)
+    _matches, match_index = np.unique(match_ids, return_inverse=True)
+    current = ratings[players].astype(np.float64)
+    team_sum = np.bincount(team_index, weights=current)[team_index]
+    team_size = np.bincount(team_index)[team_index]
+    match_sum = np.bincount(match_index, weights=current)[match_index]
+    opp_size = np.bincount(match_index)[match_index] - team_size
+    # A match with a single team has no opponent to score against
+    rated = opp_size > 0
+    opp_avg = (match_sum - team_sum) / np.maximum(opp_size, 1)
+    delta = np.rint(k_factor * (won - _expected(team_sum / team_size, opp_avg))).astype(np.int64)
+    delta[~rated] = 0
+    ratings[players] += delta
+    return delta
+
+def recalculate(since=None, dry_run=False, k_factor=K_FACTOR, base_mmr=BASE_MMR):
+    """
+    Replay matches started at or after `since`. A full replay (since=None)
+    starts every player at base_mmr; a partial one starts each player at
+    their current rank_mmr minus the stored deltas being replayed, i.e.
+    their rating just before `since`. Unless dry_run, writes changed
+    mmr_delta values and every changed rank_mmr in one transaction.
+    Raises ValueError if `since` reaches into partitioned months.
+    Returns a diff summary:
+        {'matches', 'rows', 'waves', 'deltas_changed', 'players_changed',
+         'mean_abs_change', 'largest_changes': [{player_id, old, new, change}, ...]}
+    """
+    partitions = db.get_partitions()
+    if partitions:
+        # Partitioned months are frozen, so a replay can't rewrite their deltas
+        replayable = time.strftime('%Y-%m-%d', time.gmtime(db.month_bounds(partitions[0]['month'])[1]))
+        if since is None or db.parse_timestamp(since) < db.parse_timestamp(replayable):
+            raise ValueError(f"Matches up to {db.format_month(partitions[0]['month'])} are in partition files; "
+                             f"replay with --since {replayable} or later")
+    max_player = db.exec_query("SELECT COALESCE(MAX(player_id), 0) AS n FROM player;", fetch=True,
+                               name='mmr.max_player')[0]['n']
+    ratings = np.full(max_player + 1, base_mmr, dtype=np.int64)
+    if since is not None:
+        for row in db.exec_query("""
+        SELECT p.player_id, p.rank_mmr - COALESCE((
+            SELECT SUM(s.mmr_delta)
+            FROM match_player mp
+            JOIN match_game mg ON mg.match_id = mp.match_id
+            JOIN match_player_stats s ON s.match_player_id = mp.match_player_id
+            WHERE mp.player_id = p.player_id AND mg.started_at >= ?
+        ), 0) AS start_mmr
+        FROM player p;
+        """, (since,), fetch=True, name='mmr.start_ratings'):
+            ratings[row['player_id']] = row['start_mmr']
+    summary = {'matches': 0, 'rows': 0, 'waves': 0, 'deltas_changed': 0}
+    staged = []  # (match_player_ids, deltas) per chunk
+
+    for mp_ids, match_ids, teams, players, won, old_delta, has_stats in _chunks(_history(since)):
+        waves = _waves(match_ids, players)
+        deltas = np.zeros(len(mp_ids), dtype=np.int64)
+        order = np.argsort(waves, kind='stable')
+        bounds = np.flatnonzero(np.r_[True, np.diff(waves[order]) != 0, True])
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            rows = order[start:end]
+            deltas[rows] = _rate_wave(ratings, players[rows], teams[rows], match_ids[rows], won[rows], k_factor)
+
+        summary['matches'] += len(np.unique(match_ids))
+        summary['rows'] += len(mp_ids)
+        summary['waves'] += int(waves.max()) + 1
+        changed = (deltas != old_delta) & (has_stats == 1)
+        summary['deltas_changed'] += int(changed.sum())
+        if not dry_run:
+            staged.append((mp_ids[changed], deltas[changed]))
+
+    if dry_run:
+        with db.pooled_conn(readonly=True) as conn:
+            _diff_ratings(conn, ratings, summary)
+    else:
+        with db.write_transaction() as conn:
+            player_ids, new_mmr = _diff_ratings(conn, ratings, summary)
+            _write_deltas(conn, staged)
+            _write_ratings(conn, player_ids, new_mmr)
+        db.bump_generation('match_player_stats', 'player')
+        db.refresh_player_ranks()
+    summary['dry_run'] = dry_run
+    return summary
+
+def _diff_ratings(conn, ratings, summary):
+    """
+    Compare replayed ratings with the stored ones, add the rating fields to
+    the summary and return (player_ids, new_mmr) for the changed players.
+    """
+    current = db.fetch_all(conn, "SELECT player_id, rank_mmr FROM player;", name='mmr.ratings')
+    player_ids = np.array([r['player_id'] for r in current], dtype=np.int64)
+    old_mmr = np.array([r['rank_mmr'] for r in current], dtype=np.int64)
+    # Players created after the replay started have no replayed games
+    replayed = player_ids < len(ratings)
+    new_mmr = np.where(replayed, ratings[np.where(replayed, player_ids, 0)], old_mmr)
+    changed = new_mmr != old_mmr
+    change = new_mmr - old_mmr
+    largest = np.argsort(-np.abs(change), kind='stable')[:DIFF_TOP]
+    summary.update({
+        'players_changed': int(changed.sum()),
+        'mean_abs_change': round(float(np.abs(change).mean()), 2) if len(change) else 0.0,
+        'largest_changes': [
+            {'player_id': int(player_ids[i]), 'old': int(old_mmr[i]), 'new': int(new_mmr[i]), 'change': int(change[i])}
+            for i in largest if change[i]
+        ],
+    })
+    return player_ids[changed], new_mmr[changed]
+
+def _write_deltas(conn, staged):
+    for mp_ids, deltas in staged:
+        conn.executemany("UPDATE match_player_stats SET mmr_delta = ? WHERE match_player_id = ?;",
+                         zip(deltas.tolist(), mp_ids.tolist()))
+
+def _write_ratings(conn, player_ids, ratings):
+    conn.executemany("UPDATE player SET rank_mmr = ? WHERE player_id = ?;",
+                     zip(ratings.tolist(), player_ids.tolist()))
@@ -0,0 +1,57 @@
+-- ============================================================
+-- MATCH PARTITION FILE
+-- Schema of one per-month partition file (<db>.partitions/matches_YYYY_MM.db),
+-- applied by partitions.py when the file is created. The match tables
+-- match schema_sqlite.sql, minus the foreign keys into player and
+-- game_character, which live in the main file.
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS match_game (
+  match_id   INTEGER PRIMARY KEY,
+  gamemode   TEXT NOT NULL,
+  started_at TEXT NOT NULL,
+  ended_at   TEXT,
+  started_epoch INTEGER GENERATED ALWAYS AS (unixepoch(started_at)) VIRTUAL,
+  ended_epoch   INTEGER GENERATED ALWAYS AS (unixepoch(ended_at)) VIRTUAL
+);
+
+CREATE TABLE IF NOT EXISTS team (
+  team_id    INTEGER PRIMARY KEY,
+  match_id   INTEGER NOT NULL,
+  team_label TEXT NOT NULL,
+  CONSTRAINT fk_team_match FOREIGN KEY (match_id)
+    REFERENCES match_game(match_id) ON DELETE CASCADE,
+  CONSTRAINT uq_team_label_per_match UNIQUE (match_id, team_label)
+);
+
+CREATE TABLE IF NOT EXISTS match_player (
+  match_player_id INTEGER PRIMARY KEY,
+  match_id        INTEGER NOT NULL,
+  team_id         INTEGER NOT NULL,
+  player_id       INTEGER NOT NULL,
+  character_id    INTEGER NOT NULL,
+  result          TEXT NOT NULL CHECK (result IN ('win','loss')),
+  CONSTRAINT fk_mp_match FOREIGN KEY (match_id)
+    REFERENCES match_game(match_id) ON DELETE CASCADE,
+  CONSTRAINT fk_mp_team FOREIGN KEY (team_id)
+    REFERENCES team(team_id) ON DELETE CASCADE,
+  CONSTRAINT uq_player_per_match UNIQUE (match_id, player_id),
+  CONSTRAINT uq_character_per_team UNIQUE (team_id, character_id)
+);
+
+CREATE TABLE IF NOT EXISTS match_player_stats (
+  match_player_id INTEGER PRIMARY KEY,
+  kills           INTEGER NOT NULL DEFAULT 0,
+  deaths          INTEGER NOT NULL DEFAULT 0,
+  assists         INTEGER NOT NULL DEFAULT 0,
+  damage_dealt    INTEGER NOT NULL DEFAULT 0,
+  healing_done    INTEGER NOT NULL DEFAULT 0,
+  abilities_used  INTEGER NOT NULL DEFAULT 0,
+  mmr_delta       INTEGER NOT NULL DEFAULT 0,
+  CONSTRAINT fk_mps_mp FOREIGN KEY (match_player_id)
+    REFERENCES match_player(match_player_id) ON DELETE CASCADE
+);
+
+-- Player history (most recent matches per player)
+CREATE INDEX IF NOT EXISTS idx_match_player_player
+  ON match_player(player_id, match_id);
@@ -0,0 +1,233 @@
+"""
+Time-partitioned match storage.
+Moves whole months of match history (match_game, team, match_player,
+match_player_stats) out of the main database into one SQLite file per
+month, <db>.partitions/matches_YYYY_MM.db, and freezes old partitions as
+read-only archives. db.py routes match details, the match list and player
+history to the partitions they need (MATCH PARTITIONS there). Players,
+rollups and everything else stay in the main file, and moved matches stay
+counted in the rollups.
+
+A month moves MOVE_CHUNK_MATCHES matches per write job. Each job reads the
+chunk from the main file, writes it to the partition and commits that
+(synchronous = FULL), then deletes it from the main file with the rollup
+triggers bypassed and updates the catalog in the same transaction. A crash
+in between leaves the chunk in both files: reads keep the main file's
+copy, and moving the month again overwrites the partition's.
+
+Archiving VACUUMs a partition, removes write permission on the file and
+marks it archived; readers then attach it immutable, skipping file locks.
+Matches that arrive later for an archived month stay in the main file.
+
+Usage: flask --app app partition-matches --before 2025-01 [--archive-before 2024-07]
+"""
+import json
+import os
+import sqlite3
+import stat
+import time
+from pathlib import Path
+
+import db
+
+MOVE_CHUNK_MATCHES = 50
+PARTITION_TABLES = ('match_game', 'team', 'match_player', 'match_player_stats')
+
+# Rows of one chunk, per table
+_CHUNK_WHERE = {
+    'match_game': "match_id IN (SELECT value FROM json_each(?))",
+    'team': "match_id IN (SELECT value FROM json_each(?))",
+    'match_player': "match_id IN (SELECT value FROM json_each(?))",
+    'match_player_stats': """match_player_id IN (
+        SELECT match_player_id FROM match_player WHERE match_id IN (SELECT value FROM json_each(?)))""",
+}
+
+def _open_partition(month):
+    """
+    Open a partition file for writing, creating it if needed. Partitions use
+    a rollback journal, so read-only opens never need a -wal or -shm file.
+    """
+    path = db.partition_file(month)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode = DELETE;")
+    conn.execute("PRAGMA synchronous = FULL;")
+    conn.executescript((Path(__file__).parent / "partition_sqlite.sql").read_text())
+    return conn
+
+def _catalog_row(month):
+    rows = db.exec_query("SELECT * FROM match_partition WHERE month = ?;", (month,), fetch=True,
+                         name='partitions.catalog_row')
+    return rows[0] if rows else None
+
+def _move_chunk(conn, partition_conn, month, match_ids):
+    """
+    Write job: copy one chunk of matches to the partition, then remove it
+    from the main file and record it in the catalog.
+    Returns (matches, player_rows).
+    """
+    ids = json.dumps(match_ids)
+    rows = {}
+    for table in PARTITION_TABLES:
+        columns = db.table_columns(conn, table)
+        rows[table] = (columns, [tuple(r) for r in conn.execute(
+            f"SELECT {', '.join(columns)} FROM {table} WHERE {_CHUNK_WHERE[table]};", (ids,))])
+
+    with partition_conn:
+        for table, (columns, table_rows) in rows.items():
+            partition_conn.executemany(f"""
+            INSERT OR REPLACE INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))});
+            """, table_rows)
+
+    games, teams, players = rows['match_game'][1], rows['team'][1], rows['match_player'][1]
+    conn.execute("""
+    INSERT INTO match_partition (
+        month, min_match_id, max_match_id, max_team_id, max_match_player_id, matches, player_rows)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(month) DO UPDATE SET
+        min_match_id = MIN(min_match_id, excluded.min_match_id),
+        max_match_id = MAX(max_match_id, excluded.max_match_id),
+        max_team_id = MAX(max_team_id, excluded.max_team_id),
+        max_match_player_id = MAX(max_match_player_id, excluded.max_match_player_id),
+        matches = matches + excluded.matches,
+        player_rows = player_rows + excluded.player_rows,
+        updated_at = CURRENT_TIMESTAMP;
+    """, (month, min(match_ids), max(match_ids), max((t[0] for t in teams), default=0),
+          max((p[0] for p in players), default=0), len(games), len(players)))
+    conn.execute("""
+    INSERT INTO match_partition_player (player_id, month, matches)
+    SELECT player_id, ?, COUNT(*) FROM match_player
+    WHERE match_id IN (SELECT value FROM json_each(?))
+    GROUP BY player_id
+    ON CONFLICT(player_id, month) DO UPDATE SET matches = matches + excluded.matches;
+    """, (month, ids))
+    conn.executemany("INSERT OR REPLACE INTO match_partition_match (match_id, month) VALUES (?, ?);",
+                     [(g[0], month) for g in games])
+
+    # The matches stay counted in the rollups
+    conn.execute("UPDATE rollup_control SET bypass = 1;")
+    for table in reversed(PARTITION_TABLES):
+        conn.execute(f"DELETE FROM {table} WHERE {_CHUNK_WHERE[table]};", (ids,))
+    conn.execute("UPDATE rollup_control SET bypass = 0;")
+    return len(games), len(players)
+
+def move_month(month):
+    """
+    Move every match that started in `month` (YYYYMM, UTC) from the main
+    file to its partition. Returns
+        {'month', 'matches', 'player_rows', 'chunks', 'max_chunk_seconds', 'seconds'}.
+    Raises ValueError if the month isn't over yet or is already archived.
+    """
+    start, end = db.month_bounds(month)
+    label = db.format_month(month)
+    if end > time.time():
+        raise ValueError(f"Month {label} isn't over yet")
+    report = {'month': label, 'matches': 0, 'player_rows': 0, 'chunks': 0, 'max_chunk_seconds': 0.0}
+    started = time.perf_counter()
+    with db.partition_lock:
+        catalog = _catalog_row(month)
+        if catalog is not None and catalog['archived']:
+            raise ValueError(f"Partition {label} is archived (read-only)")
+        path = db.partition_file(month)
+        if catalog is None and path.exists():
+            # Left by an interrupted first move; nothing reads it
+            path.unlink()
+        match_ids = [r['match_id'] for r in db.exec_query("""
+        SELECT match_id FROM match_game
+        WHERE started_epoch >= ? AND started_epoch < ?
+        ORDER BY match_id;
+        """, (start, end), fetch=True, name='partitions.month_matches')]
+        if match_ids:
+            partition_conn = _open_partition(month)
+            try:
+                for i in range(0, len(match_ids), MOVE_CHUNK_MATCHES):
+                    chunk_started = time.perf_counter()
+                    matches, player_rows = db.submit_write(
+                        _move_chunk, partition_conn, month, match_ids[i:i + MOVE_CHUNK_MATCHES])
+                    report['matches'] += matches
+                    report['player_rows'] += player_rows
+                    report['chunks'] += 1
+                    report['max_chunk_seconds'] = max(report['max_chunk_seconds'],
+                                                      round(time.perf_counter() - chunk_started, 4))
+            finally:
+                partition_conn.close()
+                db.bump_generation(*db.MATCH_TABLES, 'match_partition', 'match_partition_player',
+                                   'match_partition_match')
+    report['seconds'] = round(time.perf_counter() - started, 2)
+    return report
+
+def archive(month):
+    """
+    Freeze a partition as a read-only archive (idempotent): VACUUM it,
+    remove write permission on the file and mark it archived.
+    Returns its status entry, or None if the month has no partition.
+    """
+    with db.partition_lock:
+        catalog = _catalog_row(month)
+        if catalog is None:
+            return None
+        if not catalog['archived']:
+            path = db.partition_file(month)
+            conn = sqlite3.connect(path)
+            try:
+                conn.execute("VACUUM;")
+            finally:
+                conn.close()
+            os.chmod(path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+            db.exec_query("""
+            UPDATE match_partition SET archived = 1, updated_at = CURRENT_TIMESTAMP WHERE month = ?;
+            """, (month,), name='partitions.archive')
+            db.bump_generation('match_partition')
+            catalog = _catalog_row(month)
+    return _describe(catalog)
+
+def run(before, archive_before=None):
+    """
+    Move every month before `before` (YYYYMM) that still has matches in the
+    main file, skipping archived months, then archive every partition
+    before `archive_before`.
+    Returns {'moved': [move_month reports], 'archived': [status entries]}.
+    """
+    if db.month_bounds(before)[0] > time.time():
+        raise ValueError(f"Can't partition months after the current one ({db.format_month(before)})")
+    if archive_before is not None and archive_before > before:
+        raise ValueError("archive_before can't be later than before")
+    archived_months = {p['month'] for p in db.get_partitions() if p['archived']}
+    first = db.exec_query("SELECT MIN(started_epoch) AS first FROM match_game;", fetch=True,
+                          name='partitions.first_match')[0]['first']
+    moved = []
+    if first is not None:
+        month = int(time.strftime('%Y%m', time.gmtime(first)))
+        while month < before:
+            if month not in archived_months:
+                report = move_month(month)
+                if report['matches']:
+                    moved.append(report)
+            month = month + 89 if month % 100 == 12 else month + 1
+    archived = []
+    if archive_before is not None:
+        for row in reversed(db.get_partitions()):
+            if row['month'] < archive_before and not row['archived']:
+                archived.append(archive(row['month']))
+    return {'moved': moved, 'archived': archived}
+
+def _describe(row):
+    path = db.partition_file(row['month'])
+    return {
+        **row,
+        'month': db.format_month(row['month']),
+        'file': str(path),
+        'bytes': path.stat().st_size if path.exists() else None,
+    }
+
+def status():
+    """
+    Every partition (oldest first) with its file and size.
+    """
+    partitions = [_describe(row) for row in reversed(db.get_partitions())]
+    return {
+        'dir': str(db.partition_dir()),
+        'partitions': partitions,
+        'matches': sum(p['matches'] for p in partitions),
+        'archived': sum(p['archived'] for p in partitions),
+    }
@@ -0,0 +1,584 @@
+-- ============================================================
+-- ROLLUP TABLES
+-- Applied by db.create_all() after schema_sqlite.sql.
+-- Kept current by the triggers below; db.rebuild_rollups() recomputes
+-- them from match history (for backfills or after loading with
+-- triggers missing).
+-- ============================================================
+
+-- PLAYER_STATS_ROLLUP: one row per player, read by get_player_profile.
+-- Averages are sum_* / stat_rows (matches that have a stats row).
+CREATE TABLE IF NOT EXISTS player_stats_rollup (
+  player_id     INTEGER PRIMARY KEY,
+  total_matches INTEGER NOT NULL DEFAULT 0,
+  wins          INTEGER NOT NULL DEFAULT 0,
+  losses        INTEGER NOT NULL DEFAULT 0,
+  stat_rows     INTEGER NOT NULL DEFAULT 0,
+  sum_kills     INTEGER NOT NULL DEFAULT 0,
+  sum_deaths    INTEGER NOT NULL DEFAULT 0,
+  sum_assists   INTEGER NOT NULL DEFAULT 0,
+  sum_damage    INTEGER NOT NULL DEFAULT 0,
+  sum_healing   INTEGER NOT NULL DEFAULT 0,
+  CONSTRAINT fk_psr_player FOREIGN KEY (player_id)
+    REFERENCES player(player_id) ON DELETE CASCADE
+);
+
+-- PLAYER_CHARACTER_ROLLUP: per player/character play counts (favorite characters).
+CREATE TABLE IF NOT EXISTS player_character_rollup (
+  player_id    INTEGER NOT NULL,
+  character_id INTEGER NOT NULL,
+  times_played INTEGER NOT NULL DEFAULT 0,
+  wins         INTEGER NOT NULL DEFAULT 0,
+  CONSTRAINT pk_player_character_rollup PRIMARY KEY (player_id, character_id),
+  CONSTRAINT fk_pcr_player FOREIGN KEY (player_id)
+    REFERENCES player(player_id) ON DELETE CASCADE,
+  CONSTRAINT fk_pcr_character FOREIGN KEY (character_id)
+    REFERENCES game_character(character_id) ON DELETE CASCADE
+);
+
+-- ROLLUP_CONTROL: single row. A writer that maintains the rollups itself
+-- sets bypass = 1 inside its write transaction so the per-row insert and
+-- delete triggers skip: db.ingest_matches applies aggregated deltas, and
+-- partitions.py moves matches out to partition files while they stay
+-- counted. It is reset before commit, so other connections never see it set.
+CREATE TABLE IF NOT EXISTS rollup_control (
+  id     INTEGER PRIMARY KEY CHECK (id = 1),
+  bypass INTEGER NOT NULL DEFAULT 0
+);
+INSERT OR IGNORE INTO rollup_control (id, bypass) VALUES (1, 0);
+
+-- ============================================================
+-- TRIGGERS: MATCH_PLAYER
+-- Removal uses BEFORE DELETE so the stats row is still visible when
+-- the delete cascades from match_game/team; the stats delete trigger
+-- then finds no match_player row and does nothing.
+-- ============================================================
+
+CREATE TRIGGER IF NOT EXISTS trg_mp_rollup_insert
+AFTER INSERT ON match_player
+WHEN (SELECT bypass FROM rollup_control) = 0
+BEGIN
+  INSERT INTO player_stats_rollup (player_id, total_matches, wins, losses)
+  VALUES (NEW.player_id, 1, NEW.result = 'win', NEW.result = 'loss')
+  ON CONFLICT(player_id) DO UPDATE SET
+    total_matches = total_matches + 1,
+    wins = wins + excluded.wins,
+    losses = losses + excluded.losses;
+
+  INSERT INTO player_character_rollup (player_id, character_id, times_played, wins)
+  VALUES (NEW.player_id, NEW.character_id, 1, NEW.result = 'win')
+  ON CONFLICT(player_id, character_id) DO UPDATE SET
+    times_played = times_played + 1,
+    wins = wins + excluded.wins;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_mp_rollup_delete
+BEFORE DELETE ON match_player
+WHEN (SELECT bypass FROM rollup_control) = 0
+BEGIN
+  UPDATE player_stats_rollup SET
+    total_matches = total_matches - 1,
+    wins = wins - (OLD.result = 'win'),
+    losses = losses - (OLD.result = 'loss')
+  WHERE player_id = OLD.player_id;
+
+  UPDATE player_stats_rollup SET
+    stat_rows = stat_rows - 1,
+    sum_kills = sum_kills - s.kills,
+    sum_deaths = sum_deaths - s.deaths,
+    sum_assists = sum_assists - s.assists,
+    sum_damage = sum_damage - s.damage_dealt,
+    sum_healing = sum_healing - s.healing_done
+  FROM (SELECT * FROM match_player_stats WHERE match_player_id = OLD.match_player_id) AS s
+  WHERE player_id = OLD.player_id;
+
+  UPDATE player_character_rollup SET
+    times_played = times_played - 1,
+    wins = wins - (OLD.result = 'win')
+  WHERE player_id = OLD.player_id AND character_id = OLD.character_id;
+END;
+
+-- Moving a row between players/characters or changing its result:
+-- take the old contribution out, put the new one in.
+CREATE TRIGGER IF NOT EXISTS trg_mp_rollup_update
+AFTER UPDATE OF player_id, character_id, result ON match_player
+BEGIN
+  UPDATE player_stats_rollup SET
+    total_matches = total_matches - 1,
+    wins = wins - (OLD.result = 'win'),
+    losses = losses - (OLD.result = 'loss')
+  WHERE player_id = OLD.player_id;
+
+  INSERT INTO player_stats_rollup (player_id, total_matches, wins, losses)
+  VALUES (NEW.player_id, 1, NEW.result = 'win', NEW.result = 'loss')
+  ON CONFLICT(player_id) DO UPDATE SET
+    total_matches = total_matches + 1,
+    wins = wins + excluded.wins,
+    losses = losses + excluded.losses;
+
+  UPDATE player_stats_rollup SET
+    stat_rows = stat_rows - 1,
+    sum_kills = sum_kills - s.kills,
+    sum_deaths = sum_deaths - s.deaths,
+    sum_assists = sum_assists - s.assists,
+    sum_damage = sum_damage - s.damage_dealt,
+    sum_healing = sum_healing - s.healing_done
+  FROM (SELECT * FROM match_player_stats WHERE match_player_id = OLD.match_player_id) AS s
+  WHERE player_id = OLD.player_id;
+
+  UPDATE player_stats_rollup SET
+    stat_rows = stat_rows + 1,
+    sum_kills = sum_kills + s.kills,
+    sum_deaths = sum_deaths + s.deaths,
+    sum_assists = sum_assists + s.assists,
+    sum_damage = sum_damage + s.damage_dealt,
+    sum_healing = sum_healing + s.healing_done
+  FROM (SELECT * FROM match_player_stats WHERE match_player_id = NEW.match_player_id) AS s
+  WHERE player_id = NEW.player_id;
+
+  UPDATE player_character_rollup SET
+    times_played = times_played - 1,
+    wins = wins - (OLD.result = 'win')
+  WHERE player_id = OLD.player_id AND character_id = OLD.character_id;
+
+  INSERT INTO player_character_rollup (player_id, character_id, times_played, wins)
+  VALUES (NEW.player_id, NEW.character_id, 1, NEW.result = 'win')
+  ON CONFLICT(player_id, character_id) DO UPDATE SET
+    times_played = times_played + 1,
+    wins = wins + excluded.wins;
+END;
+
+-- ============================================================
+-- TRIGGERS: MATCH_PLAYER_STATS
+-- ============================================================
+
+CREATE TRIGGER IF NOT EXISTS trg_mps_rollup_insert
+AFTER INSERT ON match_player_stats
+WHEN (SELECT bypass FROM rollup_control) = 0
+BEGIN
+  UPDATE player_stats_rollup SET
+    stat_rows = stat_rows + 1,
+    sum_kills = sum_kills + NEW.kills,
+    sum_deaths = sum_deaths + NEW.deaths,
+    sum_assists = sum_assists + NEW.assists,
+    sum_damage = sum_damage + NEW.damage_dealt,
+    sum_healing = sum_healing + NEW.healing_done
+  WHERE player_id = (SELECT player_id FROM match_player WHERE match_player_id = NEW.match_player_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_mps_rollup_delete
+AFTER DELETE ON match_player_stats
+WHEN (SELECT bypass FROM rollup_control) = 0
+BEGIN
+  UPDATE player_stats_rollup SET
+    stat_rows = stat_rows - 1,
+    sum_kills = sum_kills - OLD.kills,
+    sum_deaths = sum_deaths - OLD.deaths,
+    sum_assists = sum_assists - OLD.assists,
+    sum_damage = sum_damage - OLD.damage_dealt,
+    sum_healing = sum_healing - OLD.healing_done
+  WHERE player_id = (SELECT player_id FROM match_player WHERE match_player_id = OLD.match_player_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_mps_rollup_update
+AFTER UPDATE OF kills, deaths, assists, damage_dealt, healing_done ON match_player_stats
+BEGIN
+  UPDATE player_stats_rollup SET
+    sum_kills = sum_kills + NEW.kills - OLD.kills,
+    sum_deaths = sum_deaths + NEW.deaths - OLD.deaths,
+    sum_assists = sum_assists + NEW.assists - OLD.assists,
+    sum_damage = sum_damage + NEW.damage_dealt - OLD.damage_dealt,
+    sum_healing = sum_healing + NEW.healing_done - OLD.healing_done
+  WHERE player_id = (SELECT player_id FROM match_player WHERE match_player_id = NEW.match_player_id);
+END;
+
+-- ============================================================
+-- CHARACTER ROLLUPS
+-- CHARACTER_GAMEMODE_ROLLUP: picks, results and stat sums per
+-- character and gamemode (per-character totals sum over gamemodes).
+-- GAMEMODE_ROLLUP: match count per gamemode (pick rate denominator).
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS character_gamemode_rollup (
+  character_id INTEGER NOT NULL,
+  gamemode     TEXT NOT NULL,
+  picks        INTEGER NOT NULL DEFAULT 0,
+  wins         INTEGER NOT NULL DEFAULT 0,
+  losses       INTEGER NOT NULL DEFAULT 0,
+  stat_rows    INTEGER NOT NULL DEFAULT 0,
+  sum_kills    INTEGER NOT NULL DEFAULT 0,
+  sum_deaths   INTEGER NOT NULL DEFAULT 0,
+  sum_assists  INTEGER NOT NULL DEFAULT 0,
+  sum_damage   INTEGER NOT NULL DEFAULT 0,
+  CONSTRAINT pk_character_gamemode_rollup PRIMARY KEY (character_id, gamemode),
+  CONSTRAINT fk_cgr_character FOREIGN KEY (character_id)
+    REFERENCES game_character(character_id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS gamemode_rollup (
+  gamemode TEXT PRIMARY KEY,
+  matches  INTEGER NOT NULL DEFAULT 0
+);
+
+-- ============================================================
+-- TRIGGERS: MATCH_GAME
+-- Deleting a match takes its whole contribution out of the character
+-- rollups up front; the cascaded match_player deletes then no longer
+-- find the match_game row and leave the character rollups alone.
+-- ============================================================
+
+CREATE TRIGGER IF NOT EXISTS trg_mg_rollup_insert
+AFTER INSERT ON match_game
+WHEN (SELECT bypass FROM rollup_control) = 0
+BEGIN
+  INSERT INTO gamemode_rollup (gamemode, matches) VALUES (NEW.gamemode, 1)
+  ON CONFLICT(gamemode) DO UPDATE SET matches = matches + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_mg_rollup_delete
+BEFORE DELETE ON match_game
+WHEN (SELECT bypass FROM rollup_control) = 0
+BEGIN
+  UPDATE gamemode_rollup SET matches = matches - 1 WHERE gamemode = OLD.gamemode;
+
+  UPDATE character_gamemode_rollup SET
+    picks = character_gamemode_rollup.picks - s.picks,
+    wins = character_gamemode_rollup.wins - s.wins,
+    losses = character_gamemode_rollup.losses - s.losses,
+    stat_rows = character_gamemode_rollup.stat_rows - s.stat_rows,
+    sum_kills = character_gamemode_rollup.sum_kills - s.sum_kills,
+    sum_deaths = character_gamemode_rollup.sum_deaths - s.sum_deaths,
+    sum_assists = character_gamemode_rollup.sum_assists - s.sum_assists,
+    sum_damage = character_gamemode_rollup.sum_damage - s.sum_damage
+  FROM (
+    SELECT 
+      mp.character_id,
+      COUNT(*) AS picks,
+      SUM(mp.result = 'win') AS wins,
+      SUM(mp.result = 'loss') AS losses,
+      COUNT(mps.match_player_id) AS stat_rows,
+      COALESCE(SUM(mps.kills), 0) AS sum_kills,
+      COALESCE(SUM(mps.deaths), 0) AS sum_deaths,
+      COALESCE(SUM(mps.assists), 0) AS sum_assists,
+      COALESCE(SUM(mps.damage_dealt), 0) AS sum_damage
+    FROM match_player mp
+    LEFT JOIN match_player_stats mps ON mp.match_player_id = mps.match_player_id
+    WHERE mp.match_id = OLD.match_id
+    GROUP BY mp.character_id
+  ) AS s
+  WHERE character_gamemode_rollup.character_id = s.character_id
+    AND character_gamemode_rollup.gamemode = OLD.gamemode;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_mg_rollup_update
+AFTER UPDATE OF gamemode ON match_game
+BEGIN
+  UPDATE gamemode_rollup SET matches = matches - 1 WHERE gamemode = OLD.gamemode;
+  INSERT INTO gamemode_rollup (gamemode, matches) VALUES (NEW.gamemode, 1)
+  ON CONFLICT(gamemode) DO UPDATE SET matches = matches + 1;
+
+  UPDATE character_gamemode_rollup SET
+    picks = character_gamemode_rollup.picks - s.picks,
+    wins = character_gamemode_rollup.wins - s.wins,
+    losses = character_gamemode_rollup.losses - s.losses,
+    stat_rows = character_gamemode_rollup.stat_rows - s.stat_rows,
+    sum_kills = character_gamemode_rollup.sum_kills - s.sum_kills,
+    sum_deaths = character_gamemode_rollup.sum_deaths - s.sum_deaths,
+    sum_assists = character_gamemode_rollup.sum_assists - s.sum_assists,
+    sum_damage = character_gamemode_rollup.sum_damage - s.sum_damage
+  FROM (
+    SELECT 
+      mp.character_id,
+      COUNT(*) AS picks,
+      SUM(mp.result = 'win') AS wins,
+      SUM(mp.result = 'loss') AS losses,
+      COUNT(mps.match_player_id) AS stat_rows,
+      COALESCE(SUM(mps.kills), 0) AS sum_kills,
+      COALESCE(SUM(mps.deaths), 0) AS sum_deaths,
+      COALESCE(SUM(mps.assists), 0) AS sum_assists,
+      COALESCE(SUM(mps.damage_dealt), 0) AS sum_damage
+    FROM match_player mp
+    LEFT JOIN match_player_stats mps ON mp.match_player_id = mps.match_player_id
+    WHERE mp.match_id = NEW.match_id
+    GROUP BY mp.character_id
+  ) AS s
+  WHERE character_gamemode_rollup.character_id = s.character_id
+    AND character_gamemode_rollup.gamemode = OLD.gamemode;
+
+  INSERT INTO character_gamemode_rollup (
+    character_id, gamemode, picks, wins, losses, stat_rows,
+    sum_kills, sum_deaths, sum_assists, sum_damage)
+  SELECT 
+    mp.character_id,
+    NEW.gamemode,
+    COUNT(*),
+    SUM(mp.result = 'win'),
+    SUM(mp.result = 'loss'),
+    COUNT(mps.match_player_id),
+    COALESCE(SUM(mps.kills), 0),
+    COALESCE(SUM(mps.deaths), 0),
+    COALESCE(SUM(mps.assists), 0),
+    COALESCE(SUM(mps.damage_dealt), 0)
+  FROM match_player mp
+  LEFT JOIN match_player_stats mps ON mp.match_player_id = mps.match_player_id
+  WHERE mp.match_id = NEW.match_id
+  GROUP BY mp.character_id
+  ON CONFLICT(character_id, gamemode) DO UPDATE SET
+    picks = picks + excluded.picks,
+    wins = wins + excluded.wins,
+    losses = losses + excluded.losses,
+    stat_rows = stat_rows + excluded.stat_rows,
+    sum_kills = sum_kills + excluded.sum_kills,
+    sum_deaths = sum_deaths + excluded.sum_deaths,
+    sum_assists = sum_assists + excluded.sum_assists,
+    sum_damage = sum_damage + excluded.sum_damage;
+END;
+
+-- ============================================================
+-- TRIGGERS: MATCH_PLAYER / MATCH_PLAYER_STATS -> CHARACTER ROLLUP
+-- ============================================================
+
+CREATE TRIGGER IF NOT EXISTS trg_mp_char_rollup_insert
+AFTER INSERT ON match_player
+WHEN (SELECT bypass FROM rollup_control) = 0
+BEGIN
+  INSERT INTO character_gamemode_rollup (character_id, gamemode, picks, wins, losses)
+  SELECT NEW.character_id, gamemode, 1, NEW.result = 'win', NEW.result = 'loss'
+  FROM match_game WHERE match_id = NEW.match_id
+  ON CONFLICT(character_id, gamemode) DO UPDATE SET
+    picks = picks + 1,
+    wins = wins + excluded.wins,
+    losses = losses + excluded.losses;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_mp_char_rollup_delete
+BEFORE DELETE ON match_player
+WHEN (SELECT bypass FROM rollup_control) = 0
+BEGIN
+  UPDATE character_gamemode_rollup SET
+    picks = picks - 1,
+    wins = wins - (OLD.result = 'win'),
+    losses = losses - (OLD.result = 'loss')
+  WHERE character_id = OLD.character_id
+    AND gamemode = (SELECT gamemode FROM match_game WHERE match_id = OLD.match_id);
+
+  UPDATE character_gamemode_rollup SET
+    stat_rows = stat_rows - 1,
+    sum_kills = sum_kills - s.kills,
+    sum_deaths = sum_deaths - s.deaths,
+    sum_assists = sum_assists - s.assists,
+    sum_damage = sum_damage - s.damage_dealt
+  FROM (SELECT * FROM match_player_stats WHERE match_player_id = OLD.match_player_id) AS s
+  WHERE character_id = OLD.character_id
+    AND gamemode = (SELECT gamemode FROM match_game WHERE match_id = OLD.match_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_mp_char_rollup_update
+AFTER UPDATE OF character_id, result, match_id ON match_player
+BEGIN
+  UPDATE character_gamemode_rollup SET
+    picks = picks - 1,
+    wins = wins - (OLD.result = 'win'),
+    losses = losses - (OLD.result = 'loss')
+  WHERE character_id = OLD.character_id
+    AND gamemode = (SELECT gamemode FROM match_game WHERE match_id = OLD.match_id);
+
+  INSERT INTO character_gamemode_rollup (character_id, gamemode, picks, wins, losses)
+  SELECT NEW.character_id, gamemode, 1, NEW.result = 'win', NEW.result = 'loss'
+  FROM match_game WHERE match_id = NEW.match_id
+  ON CONFLICT(character_id, gamemode) DO UPDATE SET
+    picks = picks + 1,
+    wins = wins + excluded.wins,
+    losses = losses + excluded.losses;
+
+  UPDATE character_gamemode_rollup SET
+    stat_rows = stat_rows - 1,
+    sum_kills = sum_kills - s.kills,
+    sum_deaths = sum_deaths - s.deaths,
+    sum_assists = sum_assists - s.assists,
+    sum_damage = sum_damage - s.damage_dealt
+  FROM (SELECT * FROM match_player_stats WHERE match_player_id = OLD.match_player_id) AS s
+  WHERE character_id = OLD.character_id
+    AND gamemode = (SELECT gamemode FROM match_game WHERE match_id = OLD.match_id);
+
+  UPDATE character_gamemode_rollup SET
+    stat_rows = stat_rows + 1,
+    sum_kills = sum_kills + s.kills,
+    sum_deaths = sum_deaths + s.deaths,
+    sum_assists = sum_assists + s.assists,
+    sum_damage = sum_damage + s.damage_dealt
+  FROM (SELECT * FROM match_player_stats WHERE match_player_id = NEW.match_player_id) AS s
+  WHERE character_id = NEW.character_id
+    AND gamemode = (SELECT gamemode FROM match_game WHERE match_id = NEW.match_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_mps_char_rollup_insert
+AFTER INSERT ON match_player_stats
+WHEN (SELECT bypass FROM rollup_control) = 0
+BEGIN
+  UPDATE character_gamemode_rollup SET
+    stat_rows = stat_rows + 1,
+    sum_kills = sum_kills + NEW.kills,
+    sum_deaths = sum_deaths + NEW.deaths,
+    sum_assists = sum_assists + NEW.assists,
+    sum_damage = sum_damage + NEW.damage_dealt
+  FROM (
+    SELECT mp.character_id, mg.gamemode
+    FROM match_player mp
+    JOIN match_game mg ON mp.match_id = mg.match_id
+    WHERE mp.match_player_id = NEW.match_player_id
+  ) AS k
+  WHERE character_gamemode_rollup.character_id = k.character_id
+    AND character_gamemode_rollup.gamemode = k.gamemode;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_mps_char_rollup_delete
+AFTER DELETE ON match_player_stats
+WHEN (SELECT bypass FROM rollup_control) = 0
+BEGIN
+  UPDATE character_gamemode_rollup SET
+    stat_rows = stat_rows - 1,
+    sum_kills = sum_kills - OLD.kills,
+    sum_deaths = sum_deaths - OLD.deaths,
+    sum_assists = sum_assists - OLD.assists,
+    sum_damage = sum_damage - OLD.damage_dealt
+  FROM (
+    SELECT mp.character_id, mg.gamemode
+    FROM match_player mp
+    JOIN match_game mg ON mp.match_id = mg.match_id
+    WHERE mp.match_player_id = OLD.match_player_id
+  ) AS k
+  WHERE character_gamemode_rollup.character_id = k.character_id
+    AND character_gamemode_rollup.gamemode = k.gamemode;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_mps_char_rollup_update
+AFTER UPDATE OF kills, deaths, assists, damage_dealt ON match_player_stats
+BEGIN
+  UPDATE character_gamemode_rollup SET
+    sum_kills = sum_kills + NEW.kills - OLD.kills,
+    sum_deaths = sum_deaths + NEW.deaths - OLD.deaths,
+    sum_assists = sum_assists + NEW.assists - OLD.assists,
+    sum_damage = sum_damage + NEW.damage_dealt - OLD.damage_dealt
+  FROM (
+    SELECT mp.character_id, mg.gamemode
+    FROM match_player mp
+    JOIN match_game mg ON mp.match_id = mg.match_id
+    WHERE mp.match_player_id = NEW.match_player_id
+  ) AS k
+  WHERE character_gamemode_rollup.character_id = k.character_id
+    AND character_gamemode_rollup.gamemode = k.gamemode;
+END;
+
+-- ============================================================
+-- MATCH_HOURLY_ROLLUP
+-- Matches, durations and player results per UTC hour and gamemode,
+-- read by get_match_timeseries. hour_start is the epoch second the
+-- hour starts at; matches whose started_at doesn't parse are left out.
+-- Deleting a match takes its player rows out up front, like the
+-- character rollups above.
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS match_hourly_rollup (
+  hour_start    INTEGER NOT NULL,
+  gamemode      TEXT NOT NULL,
+  matches       INTEGER NOT NULL DEFAULT 0,
+  ended_matches INTEGER NOT NULL DEFAULT 0,
+  sum_duration  INTEGER NOT NULL DEFAULT 0,
+  player_rows   INTEGER NOT NULL DEFAULT 0,
+  wins          INTEGER NOT NULL DEFAULT 0,
+  CONSTRAINT pk_match_hourly_rollup PRIMARY KEY (hour_start, gamemode)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS trg_mg_hourly_insert
+AFTER INSERT ON match_game
+WHEN (SELECT bypass FROM rollup_control) = 0 AND NEW.started_epoch IS NOT NULL
+BEGIN
+  INSERT INTO match_hourly_rollup (hour_start, gamemode, matches, ended_matches, sum_duration)
+  VALUES (
+    NEW.started_epoch - NEW.started_epoch % 3600, NEW.gamemode, 1,
+    NEW.ended_epoch IS NOT NULL, COALESCE(NEW.ended_epoch - NEW.started_epoch, 0))
+  ON CONFLICT(hour_start, gamemode) DO UPDATE SET
+    matches = matches + 1,
+    ended_matches = ended_matches + excluded.ended_matches,
+    sum_duration = sum_duration + excluded.sum_duration;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_mg_hourly_delete
+BEFORE DELETE ON match_game
+WHEN (SELECT bypass FROM rollup_control) = 0 AND OLD.started_epoch IS NOT NULL
+BEGIN
+  UPDATE match_hourly_rollup SET
+    matches = matches - 1,
+    ended_matches = ended_matches - (OLD.ended_epoch IS NOT NULL),
+    sum_duration = sum_duration - COALESCE(OLD.ended_epoch - OLD.started_epoch, 0),
+    player_rows = player_rows - (SELECT COUNT(*) FROM match_player WHERE match_id = OLD.match_id),
+    wins = wins - (SELECT COUNT(*) FROM match_player WHERE match_id = OLD.match_id AND result = 'win')
+  WHERE hour_start = OLD.started_epoch - OLD.started_epoch % 3600 AND gamemode = OLD.gamemode;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_mg_hourly_update
+AFTER UPDATE OF gamemode, started_at, ended_at ON match_game
+BEGIN
+  UPDATE match_hourly_rollup SET
+    matches = matches - 1,
+    ended_matches = ended_matches - (OLD.ended_epoch IS NOT NULL),
+    sum_duration = sum_duration - COALESCE(OLD.ended_epoch - OLD.started_epoch, 0),
+    player_rows = player_rows - (SELECT COUNT(*) FROM match_player WHERE match_id = OLD.match_id),
+    wins = wins - (SELECT COUNT(*) FROM match_player WHERE match_id = OLD.match_id AND result = 'win')
+  WHERE OLD.started_epoch IS NOT NULL
+    AND hour_start = OLD.started_epoch - OLD.started_epoch % 3600 AND gamemode = OLD.gamemode;
+
+  INSERT INTO match_hourly_rollup (hour_start, gamemode, matches, ended_matches, sum_duration, player_rows, wins)
+  SELECT
+    NEW.started_epoch - NEW.started_epoch % 3600, NEW.gamemode, 1,
+    NEW.ended_epoch IS NOT NULL, COALESCE(NEW.ended_epoch - NEW.started_epoch, 0),
+    COUNT(*), COALESCE(SUM(result = 'win'), 0)
+  FROM match_player
+  WHERE match_id = NEW.match_id
+  HAVING NEW.started_epoch IS NOT NULL
+  ON CONFLICT(hour_start, gamemode) DO UPDATE SET
+    matches = matches + 1,
+    ended_matches = ended_matches + excluded.ended_matches,
+    sum_duration = sum_duration + excluded.sum_duration,
+    player_rows = player_rows + excluded.player_rows,
+    wins = wins + excluded.wins;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_mp_hourly_insert
+AFTER INSERT ON match_player
+WHEN (SELECT bypass FROM rollup_control) = 0
+BEGIN
+  UPDATE match_hourly_rollup SET
+    player_rows = player_rows + 1,
+    wins = wins + (NEW.result = 'win')
+  FROM (SELECT started_epoch, gamemode FROM match_game WHERE match_id = NEW.match_id) AS k
+  WHERE hour_start = k.started_epoch - k.started_epoch % 3600 AND match_hourly_rollup.gamemode = k.gamemode;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_mp_hourly_delete
+BEFORE DELETE ON match_player
+WHEN (SELECT bypass FROM rollup_control) = 0
+BEGIN
+  UPDATE match_hourly_rollup SET
+    player_rows = player_rows - 1,
+    wins = wins - (OLD.result = 'win')
+  FROM (SELECT started_epoch, gamemode FROM match_game WHERE match_id = OLD.match_id) AS k
+  WHERE hour_start = k.started_epoch - k.started_epoch % 3600 AND match_hourly_rollup.gamemode = k.gamemode;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_mp_hourly_update
+AFTER UPDATE OF result, match_id ON match_player
+BEGIN
+  UPDATE match_hourly_rollup SET
+    player_rows = player_rows - 1,
+    wins = wins - (OLD.result = 'win')
+  FROM (SELECT started_epoch, gamemode FROM match_game WHERE match_id = OLD.match_id) AS k
+  WHERE hour_start = k.started_epoch - k.started_epoch % 3600 AND match_hourly_rollup.gamemode = k.gamemode;
+
+  UPDATE match_hourly_rollup SET
+    player_rows = player_rows + 1,
+    wins = wins + (NEW.result = 'win')
+  FROM (SELECT started_epoch, gamemode FROM match_game WHERE match_id = NEW.match_id) AS k
+  WHERE hour_start = k.started_epoch - k.started_epoch % 3600 AND match_hourly_rollup.gamemode = k.gamemode;
+END;
@@ -56,7 +56,11 @@ CREATE TABLE IF NOT EXISTS match_game (
   match_id   INTEGER PRIMARY KEY,
   gamemode   TEXT NOT NULL,
   started_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
-  ended_at   TEXT
+  ended_at   TEXT,
+  -- Unix seconds (UTC) derived from the timestamps; NULL if unparseable.
+  -- Virtual, so never written directly; indexed in indexes_sqlite.sql.
+  started_epoch INTEGER GENERATED ALWAYS AS (unixepoch(started_at)) VIRTUAL,
+  ended_epoch   INTEGER GENERATED ALWAYS AS (unixepoch(ended_at)) VIRTUAL
 );
 
 -- TEAM
@@ -142,3 +146,35 @@ CREATE TABLE IF NOT EXISTS txn (
     REFERENCES item(item_id)
 );
 
+
+-- MATCH_PARTITION: months of match history moved out of this file into
+-- per-month partition files (partitions.py). month is YYYYMM; the max_*
+-- ids keep new IDs in this file above everything partitioned.
+CREATE TABLE IF NOT EXISTS match_partition (
+  month               INTEGER PRIMARY KEY,
+  min_match_id        INTEGER NOT NULL,
+  max_match_id        INTEGER NOT NULL,
+  max_team_id         INTEGER NOT NULL,
+  max_match_player_id INTEGER NOT NULL,
+  matches             INTEGER NOT NULL DEFAULT 0,
+  player_rows         INTEGER NOT NULL DEFAULT 0,
+  archived            INTEGER NOT NULL DEFAULT 0 CHECK (archived IN (0, 1)),
+  updated_at          TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- MATCH_PARTITION_PLAYER: which partitions hold a player's matches, so
+-- player history only opens the months it needs.
+CREATE TABLE IF NOT EXISTS match_partition_player (
+  player_id INTEGER NOT NULL,
+  month     INTEGER NOT NULL,
+  matches   INTEGER NOT NULL,
+  CONSTRAINT pk_match_partition_player PRIMARY KEY (player_id, month)
+) WITHOUT ROWID;
+
+-- MATCH_PARTITION_MATCH: the partition each moved match is in, so match
+-- lookups open one file even when months' match_id ranges overlap
+-- (matches ingested late for an earlier month).
+CREATE TABLE IF NOT EXISTS match_partition_match (
+  match_id INTEGER PRIMARY KEY,
+  month    INTEGER NOT NULL
+);
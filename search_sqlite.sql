@@ -0,0 +1,39 @@
+-- ============================================================
+-- PLAYER SEARCH
+-- Applied by db.create_all() after schema_sqlite.sql.
+-- PLAYER_FTS: external-content FTS5 index over player names/emails
+-- with the trigram tokenizer, so substring search (search_players)
+-- uses the index instead of LIKE '%term%'. Kept in sync by triggers;
+-- db.rebuild_search_index() indexes players that predate the table.
+-- ============================================================
+
+CREATE VIRTUAL TABLE IF NOT EXISTS player_fts USING fts5(
+  display_name,
+  email,
+  content='player',
+  content_rowid='player_id',
+  tokenize='trigram'
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_player_fts_insert
+AFTER INSERT ON player
+BEGIN
+  INSERT INTO player_fts (rowid, display_name, email)
+  VALUES (NEW.player_id, NEW.display_name, NEW.email);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_player_fts_delete
+AFTER DELETE ON player
+BEGIN
+  INSERT INTO player_fts (player_fts, rowid, display_name, email)
+  VALUES ('delete', OLD.player_id, OLD.display_name, OLD.email);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_player_fts_update
+AFTER UPDATE OF display_name, email ON player
+BEGIN
+  INSERT INTO player_fts (player_fts, rowid, display_name, email)
+  VALUES ('delete', OLD.player_id, OLD.display_name, OLD.email);
+  INSERT INTO player_fts (rowid, display_name, email)
+  VALUES (NEW.player_id, NEW.display_name, NEW.email);
+END;
@@ -0,0 +1,200 @@
+"""
+Columnar snapshot of match_player joined with match_player_stats.
+Each column is a flat file of fixed-width values (<db>.snapshot/<column>.bin)
+that analytics.py memory-maps for NumPy aggregates, so ad-hoc questions
+never scan the SQLite tables.
+
+refresh() appends only rows with a match_player_id above the last one
+exported. Columns are appended first and manifest.json (row count, dtypes,
+gamemode codes) is replaced last, so a crashed refresh leaves trailing
+bytes that readers ignore and the next refresh overwrites. Changes to rows
+already exported (edits, deletes, MMR recalculation) need rebuild=True.
+Matches moved to partition files (partitions.py) are read from there.
+
+Column files live in a generation directory (<db>.snapshot/gen<N>/) named
+by the manifest. Appends only grow the current generation's files; a
+rebuild writes a new generation, switches the manifest to it and then
+unlinks the old one. Files are never shrunk below what a manifest covers,
+so readers that still map an older generation keep valid pages.
+
+Usage: flask --app app export-snapshot [--rebuild]
+"""
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+
+import numpy as np
+
+import db
+
+FETCH_ROWS = 200_000
+MANIFEST = 'manifest.json'
+
+# Column name -> dtype. gamemode is stored as a code into manifest['gamemodes'];
+# started_epoch is -1 when started_at doesn't parse.
+COLUMNS = {
+    'match_player_id': 'int64',
+    'match_id': 'int64',
+    'player_id': 'int32',
+    'character_id': 'int32',
+    'gamemode': 'uint16',
+    'started_epoch': 'int64',
+    'won': 'uint8',
+    'kills': 'int32',
+    'deaths': 'int32',
+    'assists': 'int32',
+    'damage_dealt': 'int32',
+    'healing_done': 'int32',
+    'abilities_used': 'int32',
+    'mmr_delta': 'int32',
+}
+
+def snapshot_dir(db_file=None):
+    """
+    Directory holding the snapshot of a database file (default db.DB_FILE).
+    """
+    return Path(db_file or db.DB_FILE).with_suffix('.snapshot')
+
+def read_manifest(path=None):
+    """
+    Return the snapshot manifest, or None if no snapshot exists yet.
+    """
+    manifest_path = Path(path or snapshot_dir()) / MANIFEST
+    try:
+        with open(manifest_path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def generation_dir(path, manifest):
+    """
+    Directory holding a manifest's column files. Snapshots written before
+    generations existed keep them at the top level.
+    """
+    generation = manifest.get('generation')
+    return Path(path) if generation is None else Path(path) / f'gen{generation}'
+
+def _remove_stale_generations(path, manifest):
+    """
+    Unlink column files no manifest points at any more. Unlinking (unlike
+    truncating) leaves existing memory maps of them intact.
+    """
+    current = generation_dir(path, manifest)
+    for entry in path.iterdir():
+        if entry.is_dir() and entry.name.startswith('gen') and entry != current:
+            shutil.rmtree(entry, ignore_errors=True)
+        elif entry.suffix == '.bin' and current != path:
+            entry.unlink(missing_ok=True)
+
+def _write_manifest(path, manifest):
+    tmp = path / (MANIFEST + '.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path / MANIFEST)
+
+# Rows past a match_player_id from one schema's match tables (main or a partition)
+EXPORT_QUERY = """
+SELECT
+    mp.match_player_id, mp.match_id, mp.player_id, mp.character_id,
+    mg.gamemode, COALESCE(mg.started_epoch, -1), mp.result = 'win',
+    s.kills, s.deaths, s.assists, s.damage_dealt, s.healing_done,
+    s.abilities_used, s.mmr_delta
+FROM {schema}.match_player_stats s
+JOIN {schema}.match_player mp ON mp.match_player_id = s.match_player_id
+JOIN {schema}.match_game mg ON mg.match_id = mp.match_id
+WHERE s.match_player_id > ?
+ORDER BY s.match_player_id;
+"""
+
+def _empty_manifest(generation):
+    return {'rows': 0, 'last_match_player_id': 0, 'columns': COLUMNS, 'gamemodes': [],
+            'generation': generation, 'refreshed_at': None}
+
+def refresh(rebuild=False, path=None):
+    """
+    Append rows newer than the snapshot (or rewrite it from scratch if
+    rebuild, if it was written with a different column layout, or if the
+    database now ends below the last exported id, e.g. after a reset).
+    Returns {'rows', 'appended', 'rebuilt', 'seconds'}.
+    """
+    path = Path(path or snapshot_dir())
+    path.mkdir(parents=True, exist_ok=True)
+    started = time.perf_counter()
+    # No partition moves mid-refresh, or rows could be missed between files
+    with db.partition_lock:
+        manifest = read_manifest(path)
+        partitions = db.get_partitions()
+        max_id = max([db.exec_query("SELECT COALESCE(MAX(match_player_id), 0) AS n FROM match_player_stats;",
+                                    fetch=True, name='snapshot.max_match_player_id')[0]['n']]
+                     + [p['max_match_player_id'] for p in partitions])
+        if (rebuild or manifest is None or manifest['columns'] != COLUMNS
+                or manifest.get('generation') is None or max_id < manifest['last_match_player_id']):
+            manifest = _empty_manifest((manifest or {}).get('generation', 0) + 1)
+            rebuild = True
+            # Readers may still map the current generation; write a new one
+            shutil.rmtree(generation_dir(path, manifest), ignore_errors=True)
+        columns_dir = generation_dir(path, manifest)
+        columns_dir.mkdir(exist_ok=True)
+        after = manifest['last_match_player_id']
+        # Oldest partitions first, then the main file
+        sources = [(db.partition_schema(p['month']), p) for p in reversed(partitions)
+                   if p['max_match_player_id'] > after] + [('main', None)]
+
+        gamemode_codes = {name: code for code, name in enumerate(manifest['gamemodes'])}
+        files = {}
+        try:
+            for name, dtype in COLUMNS.items():
+                column_file = columns_dir / f'{name}.bin'
+                f = files[name] = open(column_file, 'r+b' if column_file.exists() else 'w+b')
+                # Drop anything past the committed row count (a crashed
+                # refresh); readers never map beyond it
+                f.truncate(manifest['rows'] * np.dtype(dtype).itemsize)
+                f.seek(0, os.SEEK_END)
+
+            appended = 0
+            for schema, partition in sources:
+                source = db.partition_read([partition]) if partition else db.pooled_conn(readonly=True)
+                with source as conn:
+                    cur = conn.cursor()
+                    cur.row_factory = None
+                    cur.execute(EXPORT_QUERY.format(schema=schema), (after,))
+                    try:
+                        while True:
+                            rows = cur.fetchmany(FETCH_ROWS)
+                            if not rows:
+                                break
+                            values = list(zip(*rows))
+                            for mode in set(values[4]) - gamemode_codes.keys():
+                                gamemode_codes[mode] = len(gamemode_codes)
+                            values[4] = [gamemode_codes[mode] for mode in values[4]]
+                            for (name, dtype), column in zip(COLUMNS.items(), values):
+                                files[name].write(np.array(column, dtype=dtype).tobytes())
+                            appended += len(rows)
+                            manifest['last_match_player_id'] = max(manifest['last_match_player_id'], rows[-1][0])
+                    finally:
+                        cur.close()
+            for f in files.values():
+                f.flush()
+                os.fsync(f.fileno())
+        finally:
+            for f in files.values():
+                f.close()
+
+        # Publish while still holding the lock, so a concurrent refresh
+        # can't read the old manifest and append over these rows
+        manifest['rows'] += appended
+        manifest['gamemodes'] = sorted(gamemode_codes, key=gamemode_codes.get)
+        manifest['refreshed_at'] = time.time()
+        _write_manifest(path, manifest)
+        if rebuild:
+            _remove_stale_generations(path, manifest)
+    return {
+        'rows': manifest['rows'],
+        'appended': appended,
+        'rebuilt': rebuild,
+        'seconds': round(time.perf_counter() - started, 2),
+    }
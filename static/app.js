@@ -70,6 +70,29 @@ async function apiGet(url) {
     }
 }
 
+/**
+ * Add a cursor to a paginated API URL
+ */
+function pageUrl(url, cursor) {
+    if (!cursor) return url;
+    return `${url}${url.includes('?') ? '&' : '?'}cursor=${encodeURIComponent(cursor)}`;
+}
+
+/**
+ * Show a "Load more" button at the end of a list while more pages exist
+ */
+function renderLoadMore(container, nextCursor, loader) {
+    const existing = container.querySelector('.load-more');
+    if (existing) existing.remove();
+    if (!nextCursor) return;
+    
+    const button = document.createElement('button');
+    button.className = 'btn btn-secondary btn-small load-more';
+    button.textContent = 'Load more';
+    button.addEventListener('click', () => loader(nextCursor));
+    container.appendChild(button);
+}
+
 // ============= NAVIGATION =============
 
 /**
@@ -161,9 +184,9 @@ async function loadTables() {
 }
 
 /**
- * Query and display a table
+ * Query and display a table (pass a cursor to append the next page)
  */
-async function queryTable() {
+async function queryTable(cursor = null) {
     const select = document.getElementById('tableSelect');
     const tableName = select.value;
     
@@ -172,18 +195,33 @@ async function queryTable() {
         return;
     }
     
-    const result = await apiGet(`/query/${tableName}`);
+    const result = await apiGet(pageUrl(`/query/${tableName}`, cursor));
     if (!result) return;
     
-    displayTable(result.rows);
+    displayTable(result.rows, Boolean(cursor));
+    renderLoadMore(document.getElementById('tableResults'), result.next_cursor, queryTable);
 }
 
 /**
  * Display table data
  */
-function displayTable(rows) {
+function displayTable(rows, append = false) {
     const container = document.getElementById('tableResults');
     
+    if (append) {
+        const tbody = container.querySelector('tbody');
+        const columns = Array.from(container.querySelectorAll('th')).map(th => th.textContent);
+        rows.forEach(row => {
+            let rowHtml = '<tr>';
+            columns.forEach(col => {
+                rowHtml += `<td>${row[col] !== null ? row[col] : 'NULL'}</td>`;
+            });
+            rowHtml += '</tr>';
+            tbody.insertAdjacentHTML('beforeend', rowHtml);
+        });
+        return;
+    }
+    
     if (!rows || rows.length === 0) {
         container.innerHTML = '<div class="empty-state">No data found</div>';
         return;
@@ -213,22 +251,26 @@ function displayTable(rows) {
 
 // ============= PLAYER CRUD =============
 
+// Players loaded so far, by ID (used to populate the edit form)
+const loadedPlayers = {};
+
 /**
- * Load and display all players
+ * Load and display players (pass a cursor to append the next page)
  */
-async function loadPlayers() {
-    const result = await apiGet('/players');
+async function loadPlayers(cursor = null) {
+    const result = await apiGet(pageUrl('/players', cursor));
     if (!result) return;
     
     const container = document.getElementById('playerList');
     
-    if (!result.players || result.players.length === 0) {
+    if (!cursor && (!result.players || result.players.length === 0)) {
         container.innerHTML = '<div class="empty-state">No players found. Click "Populate Sample Data" to add some.</div>';
         return;
     }
     
     let html = '';
     result.players.forEach(player => {
+        loadedPlayers[player.player_id] = player;
         html += `
             <div class="data-item">
                 <div class="data-item-info">
@@ -245,7 +287,12 @@ async function loadPlayers() {
         `;
     });
     
-    container.innerHTML = html;
+    if (cursor) {
+        container.insertAdjacentHTML('beforeend', html);
+    } else {
+        container.innerHTML = html;
+    }
+    renderLoadMore(container, result.next_cursor, loadPlayers);
 }
 
 /**
@@ -285,10 +332,7 @@ async function savePlayer() {
  * Edit a player (populate form)
  */
 async function editPlayer(playerId) {
-    const result = await apiGet('/players');
-    if (!result) return;
-    
-    const player = result.players.find(p => p.player_id === playerId);
+    const player = loadedPlayers[playerId];
     if (!player) return;
     
     document.getElementById('playerIdEdit').value = player.player_id;
@@ -328,15 +372,15 @@ function clearPlayerForm() {
 // ============= MATCHES =============
 
 /**
- * Load and display all matches
+ * Load and display matches (pass a cursor to append the next page)
  */
-async function loadMatches() {
-    const result = await apiGet('/matches');
+async function loadMatches(cursor = null) {
+    const result = await apiGet(pageUrl('/matches', cursor));
     if (!result) return;
     
     const container = document.getElementById('matchList');
     
-    if (!result.matches || result.matches.length === 0) {
+    if (!cursor && (!result.matches || result.matches.length === 0)) {
         container.innerHTML = '<div class="empty-state">No matches found. Click "Populate Sample Data" to add some.</div>';
         return;
     }
@@ -358,7 +402,12 @@ async function loadMatches() {
         `;
     });
     
-    container.innerHTML = html;
+    if (cursor) {
+        container.insertAdjacentHTML('beforeend', html);
+    } else {
+        container.innerHTML = html;
+    }
+    renderLoadMore(container, result.next_cursor, loadMatches);
 }
 
 /**
@@ -438,15 +487,15 @@ async function loadItems() {
 }
 
 /**
- * Load and display entitlements
+ * Load and display entitlements (pass a cursor to append the next page)
  */
-async function loadEntitlements() {
-    const result = await apiGet('/entitlements');
+async function loadEntitlements(cursor = null) {
+    const result = await apiGet(pageUrl('/entitlements', cursor));
     if (!result) return;
     
     const container = document.getElementById('entitlementList');
     
-    if (!result.entitlements || result.entitlements.length === 0) {
+    if (!cursor && (!result.entitlements || result.entitlements.length === 0)) {
         container.innerHTML = '<div class="empty-state">No entitlements found.</div>';
         return;
     }
@@ -466,14 +515,19 @@ async function loadEntitlements() {
         `;
     });
     
-    container.innerHTML = html;
+    if (cursor) {
+        container.insertAdjacentHTML('beforeend', html);
+    } else {
+        container.innerHTML = html;
+    }
+    renderLoadMore(container, result.next_cursor, loadEntitlements);
 }
 
 /**
  * Load players into grant dropdown
  */
 async function loadPlayerDropdown() {
-    const result = await apiGet('/players');
+    const result = await apiGet('/players?limit=1000');
     if (!result) return;
     
     const select = document.getElementById('grantPlayerId');
@@ -553,7 +607,7 @@ document.addEventListener('DOMContentLoaded', function() {
     document.getElementById('btnSeed').addEventListener('click', seedDatabase);
     
     // Table browser
-    document.getElementById('btnQuery').addEventListener('click', queryTable);
+    document.getElementById('btnQuery').addEventListener('click', () => queryTable());
     
     // Player CRUD
     document.getElementById('btnSavePlayer').addEventListener('click', savePlayer);
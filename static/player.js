@@ -47,6 +47,26 @@ async function searchPlayers() {
     displaySearchResults(result.players);
 }
 
+let autocompleteTimer = null;
+
+async function autocompletePlayers() {
+    const prefix = document.getElementById('playerSearch').value.trim();
+    const list = document.getElementById('playerSuggestions');
+    
+    if (!prefix) {
+        list.innerHTML = '';
+        return;
+    }
+    
+    const response = await fetch(`/player/autocomplete?prefix=${encodeURIComponent(prefix)}`);
+    const result = await response.json();
+    if (!result.ok) return;
+    
+    list.innerHTML = result.players
+        .map(p => `<option value="${p.display_name}"></option>`)
+        .join('');
+}
+
 function displaySearchResults(players) {
     const resultsSection = document.getElementById('searchResultsSection');
     const container = document.getElementById('searchResults');
@@ -87,6 +107,7 @@ async function viewPlayerProfile(playerId) {
     if (!result) return;
     
     displayPlayerProfile(result);
+    prefetchMatchDetails(result.matches.map(m => m.match_id));
     
     const profileSection = document.getElementById('profileSection');
     profileSection.style.display = 'block';
@@ -213,11 +234,29 @@ function displayPlayerProfile(data) {
 
 // ============= MATCH DETAILS =============
 
-async function viewMatchDetails(matchId) {
-    const result = await apiGet(`/match/${matchId}/details`);
+// Match details fetched in one batch for the match history being shown
+const matchDetailsCache = {};
+
+async function prefetchMatchDetails(matchIds) {
+    const missing = matchIds.filter(id => !(id in matchDetailsCache));
+    if (missing.length === 0) return;
+    
+    const result = await apiGet(`/matches/details?ids=${missing.join(',')}`);
     if (!result) return;
     
-    displayMatchModal(result);
+    result.matches.forEach(details => {
+        matchDetailsCache[details.match.match_id] = details;
+    });
+}
+
+async function viewMatchDetails(matchId) {
+    let details = matchDetailsCache[matchId];
+    if (!details) {
+        details = await apiGet(`/match/${matchId}/details`);
+        if (!details) return;
+    }
+    
+    displayMatchModal(details);
 }
 
 function displayMatchModal(data) {
@@ -374,6 +413,10 @@ function displayCharacters(characters) {
                         <span class="character-stat-label">Attack Speed:</span>
                         <span class="character-stat-value">${char.attack_speed}</span>
                     </div>
+                    <div class="character-stat-row">
+                        <span class="character-stat-label">Win / Pick Rate:</span>
+                        <span class="character-stat-value">${char.win_rate ?? 0}% / ${char.pick_rate ?? 0}%</span>
+                    </div>
                 </div>
             </div>
         `;
@@ -521,6 +564,12 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     });
     
+    // Name suggestions while typing (debounced)
+    document.getElementById('playerSearch').addEventListener('input', function() {
+        clearTimeout(autocompleteTimer);
+        autocompleteTimer = setTimeout(autocompletePlayers, 150);
+    });
+    
     // Close match modal when clicking outside
     document.getElementById('matchModal').addEventListener('click', function(e) {
         if (e.target === this) {
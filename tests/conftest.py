@@ -0,0 +1,40 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import db
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """
+    A fresh database with the schema and seed data, as DB_FILE.
+    """
+    monkeypatch.setattr(db, 'DB_FILE', str(tmp_path / 'test.db'))
+    db.create_all()
+    db.seed_all()
+    yield db.DB_FILE
+    db.close_pool()
+
+def make_match(player_ids, character_id=1, gamemode='Ranked', started_at='2026-03-01 12:00:00',
+               ended_at='2026-03-01 12:40:00'):
+    """
+    An ingest_matches() payload: the first half of player_ids on the winning
+    team. Each team picks characters character_id, character_id + 1, ...
+    """
+    half = len(player_ids) // 2
+    return {
+        'gamemode': gamemode,
+        'started_at': started_at,
+        'ended_at': ended_at,
+        'teams': [
+            {'team_label': label, 'result': result,
+             'players': [{'player_id': pid, 'character_id': character_id + i,
+                          'stats': {'kills': pid, 'deaths': 1, 'damage_dealt': 100 * pid}}
+                         for i, pid in enumerate(ids)]}
+            for label, result, ids in (('Blue', 'win', player_ids[:half]),
+                                       ('Red', 'loss', player_ids[half:]))
+        ],
+    }
@@ -0,0 +1,53 @@
+import json
+
+import pytest
+
+import app
+import db
+
+@pytest.fixture
+def item(database):
+    """Item 20, with its seeded grants removed."""
+    db.exec_query("DELETE FROM txn WHERE item_id = 20;")
+    db.exec_query("DELETE FROM entitlement WHERE item_id = 20;")
+    return 20
+
+def grants(item_id):
+    entitlements = {r['player_id']: r['quantity'] for r in db.exec_query(
+        "SELECT player_id, quantity FROM entitlement WHERE item_id = ?;", (item_id,), fetch=True)}
+    txns = db.exec_query("SELECT COUNT(*) AS n FROM txn WHERE item_id = ? AND source = 'event_reward';",
+                         (item_id,), fetch=True)[0]['n']
+    return entitlements, txns
+
+def test_rank_range_grant_reaches_every_player_in_range(item):
+    in_range = {r['player_id'] for r in db.exec_query(
+        "SELECT player_id FROM player WHERE rank_mmr BETWEEN 1200 AND 1300;", fetch=True)}
+    progress = list(db.grant_entitlement_bulk(item, min_mmr=1200, max_mmr=1300, chunk_size=3))
+    assert len(progress) == -(-len(in_range) // 3)
+    assert progress[-1]['processed'] == progress[-1]['total'] == len(in_range)
+    entitlements, txns = grants(item)
+    assert set(entitlements) == in_range and txns == len(in_range)
+
+def test_interrupted_grant_resumes_from_its_cursor(item):
+    players = list(range(1, 11))
+    first = db.grant_entitlement_bulk(item, player_ids=players, chunk_size=4)
+    cursor = next(first)['next_cursor']
+    first.close()  # interrupted after one committed chunk
+    assert grants(item) == ({pid: 1 for pid in players[:4]}, 4)
+    list(db.grant_entitlement_bulk(item, player_ids=players, cursor=cursor, chunk_size=4))
+    assert grants(item) == ({pid: 1 for pid in players}, 10)
+
+def test_invalid_requests_are_rejected_before_writing(item):
+    with pytest.raises(ValueError):
+        db.grant_entitlement_bulk(item)
+    with pytest.raises(ValueError):
+        db.grant_entitlement_bulk(999, player_ids=[1])
+    assert grants(item) == ({}, 0)
+
+def test_route_streams_progress_lines(item):
+    client = app.app.test_client()
+    response = client.post('/entitlement/grant/bulk', json={'item_id': item, 'player_ids': [1, 2, 3]})
+    assert response.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert lines[-1]['ok'] and lines[-1]['done'] and lines[-1]['granted'] == 3
+    assert client.post('/entitlement/grant/bulk', json={'item_id': item}).status_code == 400
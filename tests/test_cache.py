@@ -0,0 +1,53 @@
+import db
+
+def test_reads_are_reused_until_a_write(database):
+    roles = db.get_all_roles()
+    hits = db.cache_stats()['hits']
+    assert db.get_all_roles() is roles
+    assert db.cache_stats()['hits'] == hits + 1
+    db.insert_role('Scout', 'fast')
+    fresh = db.get_all_roles()
+    assert fresh is not roles
+    assert [r['name'] for r in fresh][-1] == 'Scout'
+
+def test_writes_to_other_tables_keep_entries(database):
+    roles = db.get_all_roles()
+    db.bump_generation('item')
+    assert db.get_all_roles() is roles
+    db.bump_generation()  # schema-wide
+    assert db.get_all_roles() is not roles
+
+def test_expired_entries_are_reloaded(database):
+    calls = []
+    @db.cached('game_role', ttl=0)
+    def count_roles():
+        calls.append(1)
+        return len(db.exec_query("SELECT * FROM game_role;", fetch=True))
+    count_roles()
+    count_roles()
+    assert len(calls) == 2
+
+def test_least_recently_used_entries_are_evicted(database, monkeypatch):
+    monkeypatch.setattr(db, 'CACHE_MAX_ENTRIES', 2)
+    db.clear_cache()
+    calls = []
+    @db.cached('game_role')
+    def square(n):
+        calls.append(n)
+        return n * n
+    square(1), square(2), square(1), square(3)  # evicts 2
+    square(1)
+    square(2)
+    assert calls == [1, 2, 3, 2]
+    assert db.cache_stats()['entries'] == 2
+
+def test_result_read_during_a_write_is_not_stored(database):
+    calls = []
+    @db.cached('game_role')
+    def racing_read():
+        calls.append(1)
+        db.bump_generation('game_role')  # a write lands mid-read
+        return len(calls)
+    racing_read()
+    racing_read()
+    assert len(calls) == 2
@@ -0,0 +1,57 @@
+import csv
+import io
+import json
+import sqlite3
+
+import pytest
+
+import app
+import db
+
+@pytest.fixture
+def client(database):
+    return app.app.test_client()
+
+def test_ndjson_export_streams_every_row(client):
+    response = client.get('/export/player')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    assert response.headers['Content-Disposition'] == 'attachment; filename=player.ndjson'
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert rows == db.exec_query("SELECT * FROM player ORDER BY player_id;", fetch=True)
+
+def test_csv_export_has_header_and_rows(client):
+    response = client.get('/export/match_details?format=csv')
+    assert response.status_code == 200
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    count = db.exec_query("SELECT COUNT(*) AS n FROM match_player;", fetch=True)[0]['n']
+    assert 'match_id' in rows[0]
+    assert len(rows) == count + 1
+
+def test_row_stream_spans_several_fetch_chunks(database):
+    rows = db.iter_query("SELECT match_player_id FROM match_player_stats ORDER BY match_player_id;",
+                         chunk_size=4)
+    assert next(rows) == ('match_player_id',)
+    assert [r[0] for r in rows] == [r['match_player_id'] for r in db.exec_query(
+        "SELECT match_player_id FROM match_player_stats ORDER BY match_player_id;", fetch=True)]
+
+def test_export_releases_its_connection(client):
+    in_use = db.pool_stats()['in_use']
+    client.get('/export/match_details').get_data()
+    assert db.pool_stats()['in_use'] == in_use
+
+def test_failing_export_returns_an_error_status(client):
+    db.get_tables()  # whitelist cached while txn still exists
+    conn = sqlite3.connect(db.DB_FILE)
+    conn.execute("DROP TABLE txn;")
+    conn.commit()
+    conn.close()
+    in_use = db.pool_stats()['in_use']
+    response = client.get('/export/txn?format=csv')
+    assert response.status_code == 500
+    assert response.get_json() == {'ok': False, 'message': 'no such table: txn'}
+    assert db.pool_stats()['in_use'] == in_use
+
+def test_unknown_export_and_format(client):
+    assert client.get('/export/nope').status_code == 404
+    assert client.get('/export/player?format=xml').status_code == 400
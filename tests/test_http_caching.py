@@ -0,0 +1,39 @@
+import gzip
+
+import pytest
+
+import app
+import db
+
+@pytest.fixture
+def client(database):
+    return app.app.test_client()
+
+def test_conditional_get_returns_304(client):
+    first = client.get('/roles')
+    assert first.status_code == 200
+    assert first.headers['Cache-Control'] == app.REFERENCE_CACHE_CONTROL
+    etag = first.headers['ETag']
+    again = client.get('/roles', headers={'If-None-Match': etag})
+    assert again.status_code == 304 and again.get_data() == b''
+    db.insert_role('Scout', 'fast')
+    changed = client.get('/roles', headers={'If-None-Match': etag})
+    assert changed.status_code == 200 and changed.headers['ETag'] != etag
+
+def test_large_bodies_are_compressed_per_encoding(client):
+    plain = client.get('/items/all', headers={'Accept-Encoding': 'identity'})
+    assert 'Content-Encoding' not in plain.headers
+    assert len(plain.get_data()) >= app.COMPRESS_MIN_BYTES
+    zipped = client.get('/items/all', headers={'Accept-Encoding': 'gzip'})
+    assert zipped.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in zipped.headers['Vary']
+    assert gzip.decompress(zipped.get_data()) == plain.get_data()
+    assert zipped.headers['ETag'] != plain.headers['ETag']
+    assert client.get('/items/all', headers={'Accept-Encoding': 'gzip',
+                                             'If-None-Match': zipped.headers['ETag']}).status_code == 304
+
+def test_uncached_routes_must_revalidate(client):
+    response = client.get('/leaderboard?limit=5')
+    assert response.headers['Cache-Control'] == app.DEFAULT_CACHE_CONTROL
+    assert 'ETag' in response.headers
+    assert 'ETag' not in client.post('/role/upsert', json={'name': 'x', 'description': ''}).headers
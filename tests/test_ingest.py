@@ -0,0 +1,50 @@
+import pytest
+
+import db
+from conftest import make_match
+from test_rollups import assert_rollups_exact
+
+def triggers():
+    return db.exec_query("SELECT name, sql FROM sqlite_master WHERE type = 'trigger' ORDER BY name;",
+                         fetch=True)
+
+def test_ingest_writes_every_row(database):
+    before = db.exec_query("SELECT COUNT(*) AS n FROM match_player_stats;", fetch=True)[0]['n']
+    ids = db.ingest_matches([make_match([1, 2, 3, 4]), make_match([5, 6])])
+    assert ids == [ids[0], ids[0] + 1]
+    details = db.get_match_details(ids[0])
+    assert [t['team_label'] for t in details['teams']] == ['Blue', 'Red']
+    assert {p['player_id']: p['result'] for p in details['players']} == {
+        1: 'win', 2: 'win', 3: 'loss', 4: 'loss'}
+    after = db.exec_query("SELECT COUNT(*) AS n FROM match_player_stats;", fetch=True)[0]['n']
+    assert after == before + 6
+
+@pytest.mark.parametrize('drop_triggers_rows', [1, 10 ** 9])
+def test_large_and_small_batches_keep_rollups_exact(database, monkeypatch, drop_triggers_rows):
+    monkeypatch.setattr(db, 'INGEST_DROP_TRIGGERS_ROWS', drop_triggers_rows)
+    before = triggers()
+    db.ingest_matches([make_match([1, 2, 3, 4], started_at=f'2026-03-01 {hour:02d}:10:00',
+                                  ended_at=f'2026-03-01 {hour:02d}:50:00') for hour in range(24)]
+                      + [make_match([5, 6], gamemode='Casual', ended_at=None)])
+    assert triggers() == before
+    assert_rollups_exact()
+    # Later single-row writes are maintained by the restored triggers
+    db.exec_query("DELETE FROM match_game WHERE match_id = 1;")
+    assert_rollups_exact()
+
+def test_failed_batch_restores_triggers_and_writes_nothing(database, monkeypatch):
+    monkeypatch.setattr(db, 'INGEST_DROP_TRIGGERS_ROWS', 1)
+    before = triggers()
+    matches = db.exec_query("SELECT COUNT(*) AS n FROM match_game;", fetch=True)[0]['n']
+    with pytest.raises(Exception):
+        db.ingest_matches([make_match([1, 2]), make_match([1, 999_999])])  # unknown player
+    assert triggers() == before
+    assert db.exec_query("SELECT COUNT(*) AS n FROM match_game;", fetch=True)[0]['n'] == matches
+    assert_rollups_exact()
+
+def test_malformed_match_is_rejected(database):
+    with pytest.raises(ValueError):
+        db.ingest_matches([{'gamemode': 'Ranked', 'teams': [{'team_label': 'Blue', 'players': [
+            {'player_id': 1, 'character_id': 1, 'result': 'draw'}]}]}])
+    with pytest.raises(ValueError):
+        db.ingest_matches([make_match([1, 2])] * (db.MAX_INGEST_BATCH + 1))
@@ -0,0 +1,43 @@
+import pytest
+
+import app
+import db
+
+def owned(player_id, item_id):
+    return item_id in db.check_item_ownership(player_id, [item_id])['owned']
+
+@pytest.mark.parametrize('warm', [True, False])
+def test_zero_quantity_grant_is_not_owned(database, warm):
+    if warm:
+        db.get_player_inventory(4)  # cache the player before the grant
+    db.grant_entitlement(4, 20, quantity=0)
+    assert db.exec_query("SELECT quantity FROM entitlement WHERE player_id = 4 AND item_id = 20;",
+                         fetch=True) == [{'quantity': 0}]
+    assert not owned(4, 20)
+    assert 20 not in db.get_player_inventory(4)['item_ids']
+
+@pytest.mark.parametrize('warm', [True, False])
+def test_positive_grant_is_owned(database, warm):
+    if warm:
+        db.get_player_inventory(4)
+    db.grant_entitlement(4, 19, quantity=2)
+    assert owned(4, 19)
+    assert 19 in db.get_player_inventory(4)['item_ids']
+
+def test_negative_grant_is_rejected(database):
+    client = app.app.test_client()
+    response = client.post('/entitlement/grant', json={'player_id': 4, 'item_id': 19, 'quantity': -1})
+    assert response.status_code == 400
+    assert not owned(4, 19)
+
+def test_bulk_grant_tops_up_and_marks_owned(database):
+    db.get_player_inventory(1)
+    progress = list(db.grant_entitlement_bulk(1, quantity=2, player_ids=[1, 2, 999_999], chunk_size=1))
+    assert progress[-1]['processed'] == progress[-1]['total'] == 3
+    assert progress[-1]['granted'] == 2  # unknown player skipped
+    quantities = {r['player_id']: r['quantity'] for r in db.exec_query(
+        "SELECT player_id, quantity FROM entitlement WHERE item_id = 1 AND player_id IN (1, 2);", fetch=True)}
+    assert quantities == {1: 7, 2: 5}
+    assert owned(1, 1) and owned(2, 1)
+    with pytest.raises(ValueError):
+        db.grant_entitlement_bulk(1, quantity=0, player_ids=[1])
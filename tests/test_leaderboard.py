@@ -0,0 +1,69 @@
+import random
+
+import app
+import db
+import leaderboard
+from leaderboard import MmrIndex
+
+def expected_rank(mmrs, mmr):
+    """Competition rank: 1 + players strictly above."""
+    return 1 + sum(other > mmr for other in mmrs)
+
+def test_ties_share_a_competition_rank():
+    index = MmrIndex({1: 1500, 2: 1400, 3: 1400, 4: 1400, 5: 1200}.items())
+    assert [index.rank(pid)['rank'] for pid in (1, 2, 3, 4, 5)] == [1, 2, 2, 2, 5]
+    assert index.rank(3)['percentile'] == 20.0
+    assert index.rank_of_mmr(1300) == 5
+    assert index.rank(99) is None
+
+def test_updates_match_a_brute_force_ranking(monkeypatch):
+    monkeypatch.setattr(leaderboard, 'MAX_OVERFLOW', 8)  # exercise overflow and rebuilds
+    rng = random.Random(7)
+    mmrs = {pid: rng.choice([900, 1000, 1000, 1100, 2_000_000_000]) for pid in range(200)}
+    index = MmrIndex(mmrs.items())
+    for _ in range(500):
+        pid = rng.randrange(250)
+        if rng.random() < 0.1:
+            index.remove(pid)
+            mmrs.pop(pid, None)
+        else:
+            mmrs[pid] = rng.randrange(-50, 50) * 10 + rng.choice([0, 10 ** 9])
+            index.set(pid, mmrs[pid])
+    assert len(index) == len(mmrs)
+    for pid, mmr in mmrs.items():
+        rank = index.rank(pid)
+        assert rank['rank'] == expected_rank(mmrs.values(), mmr)
+        assert rank['percentile'] == round(100 * sum(m < mmr for m in mmrs.values()) / len(mmrs), 2)
+
+def test_leaderboard_pages_keep_ties_together(database):
+    mmrs = {p['player_id']: p['rank_mmr']
+            for p in db.exec_query("SELECT player_id, rank_mmr FROM player;", fetch=True)}
+    rows, cursor = [], None
+    while True:
+        page = db.get_leaderboard(cursor, limit=7)
+        rows += page['players']
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+    assert page['total_players'] == len(mmrs)
+    assert [(r['rank_mmr'], r['player_id']) for r in rows] == sorted(
+        ((mmr, pid) for pid, mmr in mmrs.items()), reverse=True)
+    for row in rows:
+        assert row['rank'] == expected_rank(mmrs.values(), row['rank_mmr'])
+        assert db.get_player_rank(row['player_id'])['rank'] == row['rank']
+
+def test_rank_follows_player_updates(database):
+    db.get_player_rank(1)  # load the index before the writes
+    top = db.get_leaderboard(limit=1)['players'][0]
+    player = db.get_player_by_id(4)
+    db.update_player(4, player['display_name'], player['email'], player['password_hash'], top['rank_mmr'])
+    assert db.get_player_rank(4)['rank'] == db.get_player_rank(top['player_id'])['rank'] == 1
+    new_id = db.insert_player('Newcomer', 'newcomer@example.com', 'x', rank_mmr=top['rank_mmr'] + 1)
+    assert db.get_player_rank(new_id)['rank'] == 1
+    assert db.get_player_rank(4)['rank'] == 2
+
+def test_rank_route(database):
+    client = app.app.test_client()
+    body = client.get('/player/1/rank').get_json()
+    assert body == {'ok': True, **db.get_player_rank(1)}
+    assert client.get('/player/999999/rank').status_code == 404
@@ -0,0 +1,67 @@
+import time
+
+import pytest
+
+import app
+import db
+import maintenance
+from conftest import make_match
+
+@pytest.fixture
+def fresh_state(database, monkeypatch):
+    monkeypatch.setattr(maintenance, '_state', {
+        'last_run': time.monotonic(), 'rows_at_last_run': db.writer_stats()['rows_changed'], 'running': None})
+    monkeypatch.setattr(maintenance, '_history', maintenance.collections.deque(maxlen=maintenance.HISTORY_SIZE))
+
+def test_cycle_runs_every_step_and_is_reported(fresh_state):
+    report = maintenance.run()
+    assert [s['step'] for s in report['steps']] == list(maintenance.SCHEDULED_STEPS)
+    assert not any('error' in s for s in report['steps'])
+    analyze = report['steps'][0]
+    assert analyze['completed'] and analyze['chunks'] == analyze['tables'] > 0
+    assert maintenance.status()['history'][0] == report
+    assert db.exec_query("SELECT COUNT(*) AS n FROM sqlite_stat1;", fetch=True)[0]['n'] > 0
+
+def test_vacuum_frees_pages_in_chunks(fresh_state, monkeypatch):
+    assert maintenance.database_info()['auto_vacuum'] == 'incremental'
+    db.ingest_matches([make_match(list(range(1, 11))) for _ in range(300)])
+    db.exec_query("DELETE FROM match_game WHERE started_at >= '2026-01-01';")
+    freed = maintenance.database_info()['freelist_pages']
+    assert freed > 4
+    monkeypatch.setattr(maintenance, 'VACUUM_PAGES_PER_CHUNK', 2)
+    step = maintenance.run(['vacuum'])['steps'][0]
+    assert step['freelist_pages_before'] == freed
+    assert step['freelist_pages_after'] == 0 and step['completed']
+    assert step['chunks'] == -(-freed // 2)
+
+def test_failing_step_does_not_stop_the_cycle(fresh_state, monkeypatch):
+    def broken():
+        raise RuntimeError('boom')
+    monkeypatch.setitem(maintenance.STEPS, 'optimize', broken)
+    steps = maintenance.run()['steps']
+    assert steps[1] == {'step': 'optimize', 'seconds': steps[1]['seconds'], 'error': 'boom'}
+    assert [s['step'] for s in steps] == list(maintenance.SCHEDULED_STEPS)
+
+def test_cycle_is_due_after_enough_writes(fresh_state, monkeypatch):
+    assert maintenance.due() is None
+    monkeypatch.setattr(maintenance, 'WRITE_ROWS_TRIGGER', 5)
+    db.ingest_matches([make_match([1, 2, 3, 4])])
+    assert maintenance.due() == 'writes'
+    maintenance.run(['checkpoint'], trigger='writes')
+    assert maintenance.due() is None
+    monkeypatch.setattr(maintenance, 'INTERVAL_SECONDS', 0)
+    assert maintenance.due() == 'interval'
+
+def test_scheduler_start_and_stop_are_idempotent(fresh_state):
+    maintenance.start()
+    thread = maintenance._scheduler
+    maintenance.start()
+    assert maintenance._scheduler is thread and maintenance.status()['scheduler_running']
+    maintenance.stop()
+    maintenance.stop()
+    assert not thread.is_alive() and not maintenance.status()['scheduler_running']
+
+def test_unknown_step_is_rejected(fresh_state):
+    client = app.app.test_client()
+    assert client.post('/admin/maintenance/run?steps=analyze,defrag').status_code == 400
+    assert client.post('/admin/maintenance/run?steps=checkpoint').get_json()['ok']
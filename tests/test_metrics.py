@@ -0,0 +1,48 @@
+import logging
+import threading
+
+import pytest
+
+import app
+import db
+
+@pytest.fixture
+def slow_log(database, tmp_path, monkeypatch):
+    """Log every query as slow, to a fresh file."""
+    path = tmp_path / 'slow.log'
+    monkeypatch.setattr(db, 'SLOW_QUERY_LOG', str(path))
+    monkeypatch.setattr(db, 'SLOW_QUERY_SECONDS', 0)
+    saved = db._slow_log.handlers[:]
+    for handler in saved:
+        db._slow_log.removeHandler(handler)
+    yield path
+    for handler in db._slow_log.handlers[:]:
+        db._slow_log.removeHandler(handler)
+        handler.close()
+    for handler in saved:
+        db._slow_log.addHandler(handler)
+
+def test_named_queries_are_exported(database):
+    db.get_leaderboard(limit=5)
+    body = app.app.test_client().get('/metrics').get_data(as_text=True)
+    assert 'db_query_duration_seconds_count{query="get_leaderboard"}' in body
+    assert 'db_query_rows_total{query="get_leaderboard"}' in body
+
+def test_slow_queries_are_logged_with_their_plan(slow_log):
+    db.exec_query("SELECT player_id FROM player WHERE player_id = ?;", (1,), fetch=True, name='probe')
+    text = slow_log.read_text()
+    assert 'probe rows=1 sql=SELECT player_id FROM player WHERE player_id = ?; params=(1,)' in text
+    assert 'SEARCH player USING INTEGER PRIMARY KEY' in text
+
+def test_concurrent_slow_queries_attach_one_handler(slow_log):
+    start = threading.Barrier(8)
+    def query():
+        start.wait()
+        db.exec_query("SELECT 1;", fetch=True, name='probe')
+    threads = [threading.Thread(target=query) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len([h for h in db._slow_log.handlers if isinstance(h, logging.FileHandler)]) == 1
+    assert slow_log.read_text().count(' probe ') == 8
@@ -0,0 +1,85 @@
+import pytest
+
+import db
+import mmr
+from conftest import make_match
+
+def replay_reference(start=None, since='', k_factor=mmr.K_FACTOR):
+    """
+    Match-by-match team Elo in plain Python. Returns
+    ({player_id: rating}, {match_player_id: delta}).
+    """
+    ratings = dict(start or {})
+    deltas = {}
+    rows = db.exec_query("""
+    SELECT mp.match_player_id, mp.match_id, mp.team_id, mp.player_id, mp.result = 'win' AS won
+    FROM match_game mg JOIN match_player mp ON mp.match_id = mg.match_id
+    WHERE mg.started_at >= ?
+    ORDER BY mg.started_at, mg.match_id;
+    """, (since,), fetch=True)
+    matches = {}
+    for row in rows:
+        matches.setdefault(row['match_id'], []).append(row)
+    for players in matches.values():
+        before = {r['player_id']: ratings.get(r['player_id'], mmr.BASE_MMR) for r in players}
+        teams = {}
+        for r in players:
+            teams.setdefault(r['team_id'], []).append(before[r['player_id']])
+        for r in players:
+            team = teams[r['team_id']]
+            opponents = [v for t, values in teams.items() if t != r['team_id'] for v in values]
+            if not opponents:
+                deltas[r['match_player_id']] = 0
+                continue
+            expected = mmr._expected(sum(team) / len(team), sum(opponents) / len(opponents))
+            deltas[r['match_player_id']] = round(k_factor * (r['won'] - expected))
+        for r in players:
+            ratings[r['player_id']] = before[r['player_id']] + deltas[r['match_player_id']]
+    return ratings, deltas
+
+def stored():
+    ratings = {r['player_id']: r['rank_mmr']
+               for r in db.exec_query("SELECT player_id, rank_mmr FROM player;", fetch=True)}
+    deltas = {r['match_player_id']: r['mmr_delta']
+              for r in db.exec_query("SELECT match_player_id, mmr_delta FROM match_player_stats;", fetch=True)}
+    return ratings, deltas
+
+@pytest.fixture
+def history(database):
+    # Back-to-back matches for the same players, so replay order matters
+    db.ingest_matches([make_match([1, 2, 3, 4], started_at=f'2026-03-01 {h:02d}:00:00') for h in range(10)]
+                      + [make_match([5, 6, 1, 7], started_at='2026-03-01 05:30:00'),
+                         make_match([8, 9], started_at='2026-03-01 05:30:00')])
+
+def test_full_replay_matches_sequential_elo(history):
+    summary = mmr.recalculate()
+    ratings, deltas = replay_reference()
+    stored_ratings, stored_deltas = stored()
+    assert all(stored_ratings[pid] == ratings.get(pid, mmr.BASE_MMR) for pid in stored_ratings)
+    assert all(stored_deltas[mp_id] == deltas[mp_id] for mp_id in stored_deltas)
+    assert summary['rows'] == len(deltas) and not summary['dry_run']
+    assert db.get_player_rank(1)['rank_mmr'] == stored_ratings[1]
+
+def test_dry_run_writes_nothing(history):
+    before = stored()
+    summary = mmr.recalculate(dry_run=True)
+    assert summary['dry_run'] and summary['players_changed'] > 0
+    assert stored() == before
+
+def test_replay_is_idempotent_and_partial_replay_agrees(history):
+    mmr.recalculate()
+    after = stored()
+    again = mmr.recalculate()
+    assert again['deltas_changed'] == again['players_changed'] == 0
+    partial = mmr.recalculate(since='2026-03-01 05:00:00')
+    assert partial['deltas_changed'] == partial['players_changed'] == 0
+    assert stored() == after
+
+def test_failed_write_leaves_deltas_and_ratings_untouched(history, monkeypatch):
+    before = stored()
+    def fail(conn, player_ids, ratings):
+        raise RuntimeError('disk full')
+    monkeypatch.setattr(mmr, '_write_ratings', fail)
+    with pytest.raises(RuntimeError):
+        mmr.recalculate()
+    assert stored() == before
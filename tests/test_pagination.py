@@ -0,0 +1,65 @@
+import db
+from conftest import make_match
+
+def page_through(fetch, key, insert, limit=3):
+    """
+    Read every page of fetch(cursor, limit) -> (rows, next_cursor), calling
+    insert() between pages. Returns the keys in the order they were read.
+    """
+    seen, cursor = [], None
+    while True:
+        rows, cursor = fetch(cursor, limit)
+        seen += [row[key] for row in rows]
+        if cursor is None:
+            return seen
+        insert()
+
+def test_player_pages_stable_across_inserts(database):
+    original = [p['player_id'] for p in db.get_all_players(limit=1000)['players']]
+    counter = iter(range(1000))
+
+    def insert():
+        n = next(counter)
+        db.insert_player(f'new-{n}', f'new-{n}@example.com', 'hash')
+
+    def fetch(cursor, limit):
+        page = db.get_all_players(cursor=cursor, limit=limit)
+        return page['players'], page['next_cursor']
+
+    seen = page_through(fetch, 'player_id', insert)
+    assert len(seen) == len(set(seen))
+    assert seen == sorted(seen)
+    # Ascending pages pick up rows appended past the cursor, never lose old ones
+    assert seen[:len(original)] == original
+
+def test_match_pages_stable_across_inserts(database):
+    original = [m['match_id'] for m in db.get_all_matches(limit=1000)['matches']]
+
+    def insert():
+        db.ingest_matches([make_match([1, 2]), make_match([3, 4])])
+
+    def fetch(cursor, limit):
+        page = db.get_all_matches(cursor=cursor, limit=limit)
+        return page['matches'], page['next_cursor']
+
+    # Newest first: matches added after the first page never show up
+    assert page_through(fetch, 'match_id', insert) == original
+
+def test_table_pages_stable_across_deletes_and_inserts(database):
+    original = [r['match_player_id'] for r in db.select_all('match_player_stats', limit=1000)['rows']]
+    deleted = []
+
+    def insert():
+        # Drop a row that was already read and add new ones at the end
+        victim = original[len(deleted)]
+        deleted.append(victim)
+        db.exec_query("DELETE FROM match_player_stats WHERE match_player_id = ?;", (victim,))
+        db.ingest_matches([make_match([5, 6])])
+
+    def fetch(cursor, limit):
+        page = db.select_all('match_player_stats', cursor=cursor, limit=limit)
+        return page['rows'], page['next_cursor']
+
+    seen = page_through(fetch, 'match_player_id', insert, limit=4)
+    assert len(seen) == len(set(seen))
+    assert seen[:len(original)] == original
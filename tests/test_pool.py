@@ -0,0 +1,46 @@
+import sqlite3
+
+import pytest
+
+import db
+
+def test_connections_use_wal_and_pragmas(database):
+    with db.pooled_conn() as conn:
+        assert conn.execute("PRAGMA journal_mode;").fetchone()[0] == 'wal'
+        assert conn.execute("PRAGMA foreign_keys;").fetchone()[0] == 1
+        assert conn.execute("PRAGMA busy_timeout;").fetchone()[0] == 5000
+
+def test_pooled_connections_are_reused(database):
+    with db.pooled_conn(readonly=True) as conn:
+        first = conn
+    before = db.pool_stats()
+    with db.pooled_conn(readonly=True) as conn:
+        assert conn is first
+    after = db.pool_stats()
+    assert after['hits'] == before['hits'] + 1
+    assert after['misses'] == before['misses']
+    assert after['in_use'] == before['in_use']
+
+def test_nested_borrows_get_separate_connections(database):
+    with db.pooled_conn(readonly=True) as outer, db.pooled_conn(readonly=True) as inner:
+        assert outer is not inner
+        assert db.pool_stats()['in_use'] >= 2
+
+def test_readonly_connections_cannot_write(database):
+    with pytest.raises(sqlite3.OperationalError, match='readonly'):
+        with db.pooled_conn(readonly=True) as conn:
+            conn.execute("DELETE FROM game_role;")
+
+def test_error_rolls_back_borrowed_connection(database):
+    with pytest.raises(RuntimeError):
+        with db.pooled_conn() as conn:
+            conn.execute("INSERT INTO game_role (name, description) VALUES ('rolled-back', '');")
+            raise RuntimeError
+    assert not db.exec_query("SELECT 1 FROM game_role WHERE name = 'rolled-back';", fetch=True)
+
+def test_close_pool_drops_idle_connections(database):
+    with db.pooled_conn(readonly=True):
+        pass
+    assert db.pool_stats()['idle'] >= 1
+    db.close_pool()
+    assert db.pool_stats()['idle'] == 0
@@ -0,0 +1,57 @@
+import pytest
+
+import db
+from conftest import make_match
+
+def rollup_rows(table):
+    """
+    (rollup table contents, the same aggregate computed from the base tables).
+    Rows a delete has counted down to zero are equivalent to missing ones.
+    """
+    keys, values, select = db.ROLLUP_SOURCES[table]
+    columns = ', '.join(keys + values)
+    with db.pooled_conn(readonly=True) as conn:
+        stored = {tuple(r) for r in conn.execute(f"SELECT {columns} FROM {table};")
+                  if any(r[len(keys):])}
+        expected = {tuple(r) for r in conn.execute(select.format(schema='main'))}
+    return stored, expected
+
+def assert_rollups_exact():
+    for table in db.ROLLUP_SOURCES:
+        stored, expected = rollup_rows(table)
+        assert stored == expected, table
+
+def test_seeded_rollups_match_base_tables(database):
+    assert_rollups_exact()
+
+def test_ingest_keeps_rollups_exact(database):
+    db.ingest_matches([make_match([1, 2, 3, 4]), make_match([2, 3], character_id=2, gamemode='Casual'),
+                       make_match([1, 4], started_at='2026-03-02 08:00:00', ended_at=None)])
+    assert_rollups_exact()
+
+def test_deletes_keep_rollups_exact(database):
+    db.ingest_matches([make_match([1, 2, 3, 4])])
+    db.exec_query("DELETE FROM match_game WHERE match_id = 1;")
+    db.exec_query("DELETE FROM match_player_stats WHERE match_player_id IN "
+                  "(SELECT match_player_id FROM match_player WHERE match_id = 2);")
+    db.exec_query("DELETE FROM match_player WHERE match_id = 3 AND result = 'win';")
+    assert_rollups_exact()
+
+def test_rebuild_matches_trigger_maintained_rollups(database):
+    db.ingest_matches([make_match([1, 2, 3, 4])])
+    before = {table: rollup_rows(table)[0] for table in db.ROLLUP_SOURCES}
+    with db.write_transaction() as conn:
+        for table in db.ROLLUP_SOURCES:
+            conn.execute(f"DELETE FROM {table};")
+    db.rebuild_rollups()
+    assert {table: rollup_rows(table)[0] for table in db.ROLLUP_SOURCES} == before
+    assert_rollups_exact()
+
+@pytest.mark.parametrize('gamemode', ['Ranked', 'Casual'])
+def test_gamemode_rollup_counts_matches(database, gamemode):
+    db.ingest_matches([make_match([1, 2], gamemode=gamemode)] * 3)
+    expected = db.exec_query("SELECT COUNT(*) AS n FROM match_game WHERE gamemode = ?;",
+                             (gamemode,), fetch=True)[0]['n']
+    stored = db.exec_query("SELECT matches FROM gamemode_rollup WHERE gamemode = ?;",
+                           (gamemode,), fetch=True)[0]['matches']
+    assert stored == expected
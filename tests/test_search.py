@@ -0,0 +1,54 @@
+import sqlite3
+
+import db
+
+def like_search(term):
+    """Reference answer: substring match in Python, in search order."""
+    players = db.exec_query("SELECT player_id, display_name, email, rank_mmr FROM player;", fetch=True)
+    term = term.lower()
+    hits = [p for p in players if term in p['display_name'].lower() or term in p['email'].lower()]
+    return [p['player_id'] for p in sorted(hits, key=lambda p: -p['rank_mmr'])][:20]
+
+def ids(players):
+    return [p['player_id'] for p in players]
+
+def test_substring_search_uses_the_index(database):
+    for term in ('ara', 'ARA', 'example.com', 'ick', 'nobody'):
+        assert ids(db.search_players(term)) == like_search(term), term
+
+def test_short_terms_fall_back_to_like(database):
+    for term in ('ia', 'z'):
+        assert ids(db.search_players(term)) == like_search(term), term
+    assert db.search_players('%') == []
+    assert db.search_players('"') == []
+
+def test_index_follows_player_changes(database):
+    player_id = db.insert_player('Zephyrine', 'zeph@example.com', 'x')
+    assert ids(db.search_players('phyr')) == [player_id]
+    db.update_player(player_id, 'Marigold', 'zeph@example.com', 'x', 1000)
+    assert db.search_players('phyr') == []
+    assert ids(db.search_players('rigol')) == [player_id]
+
+def test_create_all_indexes_players_only_when_the_index_is_new(database):
+    conn = sqlite3.connect(db.DB_FILE)
+    conn.execute("INSERT INTO player_fts (player_fts, rowid, display_name, email) "
+                 "VALUES ('delete', 1, 'Alice', 'alice@example.com');")
+    conn.commit()
+    db.create_all()  # populated index: left alone
+    assert 1 not in ids(db.search_players('alice'))
+    conn.execute("DROP TABLE player_fts;")
+    conn.commit()
+    conn.close()
+    db.create_all()  # new index: every existing player indexed
+    assert ids(db.search_players('alice')) == [1]
+    assert ids(db.search_players('ara')) == like_search('ara')
+
+def test_autocomplete_matches_name_prefix(database):
+    names = [p['display_name'] for p in db.autocomplete_players('a')]
+    assert names == sorted(names, key=str.lower)
+    assert set(names) == {'Alice', 'Anna'}
+    assert [p['display_name'] for p in db.autocomplete_players('Qui', limit=1)] == ['Quincy']
+    assert db.autocomplete_players('%') == []
+    assert db.autocomplete_players('') == []
+    assert set(db.autocomplete_players('mia', details=True)[0]) == {
+        'player_id', 'display_name', 'email', 'rank_mmr', 'created_at'}
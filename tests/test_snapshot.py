@@ -0,0 +1,62 @@
+import threading
+
+import pytest
+
+import analytics
+import db
+import snapshot
+from conftest import make_match
+
+@pytest.fixture
+def snapshot_path(database, tmp_path):
+    return tmp_path / 'test.snapshot'
+
+def stats_rows():
+    return db.exec_query("SELECT COUNT(*) AS n FROM match_player_stats;", fetch=True)[0]['n']
+
+def kills_total():
+    return db.exec_query("SELECT SUM(kills) AS n FROM match_player_stats;", fetch=True)[0]['n']
+
+def test_first_refresh_exports_every_row(snapshot_path):
+    result = snapshot.refresh(path=snapshot_path)
+    assert result['rebuilt'] and result['rows'] == result['appended'] == stats_rows()
+    snap = analytics.load(snapshot_path)
+    assert len(snap) == stats_rows()
+    assert snap.aggregate('kills')[0]['sum'] == kills_total()
+
+def test_refresh_appends_only_new_rows(snapshot_path):
+    snapshot.refresh(path=snapshot_path)
+    generation = snapshot.read_manifest(snapshot_path)['generation']
+    db.ingest_matches([make_match([1, 2, 3, 4], gamemode='Arcade')])
+    result = snapshot.refresh(path=snapshot_path)
+    assert not result['rebuilt'] and result['appended'] == 4
+    manifest = snapshot.read_manifest(snapshot_path)
+    assert manifest['generation'] == generation and manifest['rows'] == stats_rows()
+    snap = analytics.load(snapshot_path)
+    assert 'Arcade' in snap.gamemodes
+    assert snap.aggregate('kills', gamemode='Arcade')[0]['count'] == 4
+    assert snapshot.refresh(path=snapshot_path)['appended'] == 0
+
+def test_rebuild_writes_a_new_generation(snapshot_path):
+    snapshot.refresh(path=snapshot_path)
+    old = analytics.load(snapshot_path)
+    old_dir = snapshot.generation_dir(snapshot_path, old.manifest)
+    db.exec_query("UPDATE match_player_stats SET kills = kills + 1;")
+    result = snapshot.refresh(rebuild=True, path=snapshot_path)
+    assert result['rebuilt'] and result['rows'] == stats_rows()
+    assert not old_dir.exists()
+    assert old.aggregate('kills')[0]['sum'] == kills_total() - stats_rows()  # old maps stay valid
+    assert analytics.load(snapshot_path).aggregate('kills')[0]['sum'] == kills_total()
+
+def test_concurrent_refreshes_export_each_row_once(snapshot_path):
+    snapshot.refresh(path=snapshot_path)
+    db.ingest_matches([make_match([1, 2, 3, 4]) for _ in range(20)])
+    threads = [threading.Thread(target=snapshot.refresh, kwargs={'path': snapshot_path}) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    snap = analytics.load(snapshot_path)
+    assert len(snap) == stats_rows()
+    ids = snap.column('match_player_id')
+    assert len(set(ids.tolist())) == len(ids)
@@ -0,0 +1,81 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import db
+
+def insert_role(conn, name):
+    conn.execute("INSERT INTO game_role (name, description) VALUES (?, '');", (name,))
+    return name
+
+def failing_insert(conn, name):
+    insert_role(conn, name)
+    raise ValueError(f"{name} failed")
+
+def run_grouped(jobs):
+    """
+    Submit (fn, *args) jobs from separate threads while the writer is held
+    by a blocking job, so they are all drained into the next group.
+    Returns one Future per job, resolved once that group has committed.
+    """
+    release = threading.Event()
+    pool = ThreadPoolExecutor(max_workers=len(jobs) + 1)
+    blocker = pool.submit(db.submit_write, lambda conn: release.wait(10))
+    while db.writer_stats()['queued']:
+        time.sleep(0.001)
+    futures = [pool.submit(db.submit_write, *job) for job in jobs]
+    deadline = time.monotonic() + 10
+    while db.writer_stats()['queued'] < len(jobs) and time.monotonic() < deadline:
+        time.sleep(0.001)
+    release.set()
+    blocker.result()
+    pool.shutdown(wait=True)
+    return futures
+
+def role_names():
+    return {r['name'] for r in db.exec_query("SELECT name FROM game_role;", fetch=True)}
+
+def test_queued_writes_share_one_commit(database):
+    before = db.writer_stats()
+    futures = run_grouped([(insert_role, f'role-{i}') for i in range(20)])
+    assert [f.result() for f in futures] == [f'role-{i}' for i in range(20)]
+    after = db.writer_stats()
+    # The blocking job's group, then every queued job in one more
+    assert after['commits'] - before['commits'] == 2
+    assert after['max_batch'] >= 20
+    assert {f'role-{i}' for i in range(20)} <= role_names()
+
+def test_failing_job_rolls_back_alone(database):
+    before = db.writer_stats()
+    futures = run_grouped([
+        (insert_role, 'kept-1'),
+        (failing_insert, 'dropped'),
+        (insert_role, 'kept-2'),
+    ])
+    assert futures[0].result() == 'kept-1'
+    with pytest.raises(ValueError, match='dropped failed'):
+        futures[1].result()
+    assert futures[2].result() == 'kept-2'
+    assert db.writer_stats()['commits'] - before['commits'] == 2
+    names = role_names()
+    assert {'kept-1', 'kept-2'} <= names
+    assert 'dropped' not in names
+
+def test_submit_write_refuses_while_paused(database):
+    with db.writer_paused():
+        with pytest.raises(RuntimeError):
+            db.submit_write(insert_role, 'never')
+    assert 'never' not in role_names()
+
+def test_writes_wait_for_paused_writer(database):
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        with db.writer_paused(), db.pooled_conn() as conn:
+            future = pool.submit(db.submit_write, insert_role, 'queued')
+            conn.execute("INSERT INTO game_role (name, description) VALUES ('direct', '');")
+            conn.commit()
+            time.sleep(0.05)
+            assert not future.done()
+        assert future.result(timeout=10) == 'queued'
+    assert {'direct', 'queued'} <= role_names()